@@ -0,0 +1,479 @@
+"""Benchmarks do renderizador sem janela, áudio ou porta serial.
+
+Uso:
+ python benchmark.py render --res 120x100,240x200 --json resultado.json [--compare base.json] [--mipmaps on,off]
+ python benchmark.py render --walls pista,cheia     também com parede em toda célula fora da pista
+ python benchmark.py render --layouts linear,tiled   chão em ordem linear e em blocos de 8 x 8
+ python benchmark.py render --engine serial,scanline --compare base.json
+ python benchmark.py equivalence --engine scanline   compara os frames do motor com os do serial
+ python benchmark.py threads --threads 1,2,4,8 --res 120x100,240x200
+ python benchmark.py startup --engine serial
+ python benchmark.py make-paths
+ python benchmark.py serial --samples 20000
+ python benchmark.py karts --karts 1,100,1000,10000
+ python benchmark.py restart --runs 5
+ python benchmark.py objects --coins 0,1000,5000
+ python benchmark.py plot --rates 50,500,2000
+
+O comando render reproduz os caminhos de câmera gravados em camera_paths.json (posx, posy, rot por frame
+sobre a pista de assets/MarioKart.png) e reporta tempo médio, p50, p99 e fps por caminho e resolução.
+"""
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import numba
+import numpy as np
+import pygame as pg
+import serial
+import protocolo
+from main import (AssetManager, Game, Kart, KartArray, ObjectStore, Renderer, SCREEN_WIDTH, SCREEN_HEIGHT,
+                  TRACK_PATH)
+from pista import load_track
+from simulacao import TRACK_WAYPOINTS
+
+CAMERA_PATHS_FILE = 'camera_paths.json'
+
+def init_headless():
+    """Inicializa o pygame com o driver de vídeo dummy (necessário para convert() nos assets)."""
+    pg.display.init()
+    pg.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+
+def parse_resolutions(text):
+    """Converte '120x100,240x200' em [(120, 100), (240, 200)] (hres x halfvres)."""
+    return [tuple(int(v) for v in item.split('x')) for item in text.split(',')]
+
+def lap_path(step=0.15, turn_smoothing=0.2):
+    """Percorre os pontos da linha central em velocidade constante, suavizando a rotação como um kart faria."""
+    points = np.array(TRACK_WAYPOINTS + TRACK_WAYPOINTS[:1])
+    poses = []
+    rot = None
+    for start, end in zip(points[:-1], points[1:]):
+        delta = end - start
+        heading = np.arctan2(delta[1], delta[0])
+        for t in np.arange(0, 1, step / np.hypot(*delta)):
+            if rot is None:
+                rot = heading
+            # Menor diferença angular para não girar pelo lado errado
+            rot += turn_smoothing * ((heading - rot + np.pi) % (2 * np.pi) - np.pi)
+            x, y = start + delta * t
+            poses.append((x, y, rot))
+    return poses
+
+def build_camera_paths():
+    """Gera os caminhos de câmera usados pelo benchmark.
+    Retorna:
+     dict: Nome do caminho -> lista de (posx, posy, rot)."""
+    spin = [(27.0, 18.5, 4.7 + 2 * np.pi * f / 360) for f in range(360)]
+    # Câmera junto à borda esquerda olhando para a parede, o caso com mais colunas de parede
+    wall = [(1.5, 12 + 8 * f / 300, np.pi + 0.6 * np.sin(f / 20)) for f in range(300)]
+    return {'volta': lap_path(), 'giro': spin, 'parede': wall}
+
+def save_camera_paths(path=CAMERA_PATHS_FILE):
+    paths = build_camera_paths()
+    with open(path, 'w') as f:
+        json.dump({name: [[round(float(v), 4) for v in pose] for pose in poses] for name, poses in paths.items()}, f)
+    for name, poses in paths.items():
+        print(f"{name}: {len(poses)} frames")
+
+def load_camera_paths(path=CAMERA_PATHS_FILE):
+    with open(path) as f:
+        return {name: [tuple(pose) for pose in poses] for name, poses in json.load(f).items()}
+
+def frame_times(renderer, poses, warmup=10):
+    """ Renderiza cada pose do caminho e mede o tempo de render_frame.
+    Retorna:
+     np.ndarray: Tempo de cada frame em milissegundos."""
+    for pose in poses[:warmup]:
+        renderer.render_frame(*pose)
+    times = np.empty(len(poses))
+    for f, pose in enumerate(poses):
+        start = time.perf_counter()
+        renderer.render_frame(*pose)
+        times[f] = (time.perf_counter() - start) * 1000
+    return times
+
+def summarize(times):
+    return {
+        'frames': len(times),
+        'mean_ms': float(times.mean()),
+        'p50_ms': float(np.percentile(times, 50)),
+        'p99_ms': float(np.percentile(times, 99)),
+        'fps': float(1000 / times.mean()),
+    }
+
+def full_wall_map(track):
+    """Grade de paredes da pista com parede também em toda célula sem nenhum ponto de pista, o pior caso
+    para o traçado das paredes."""
+    cells = track.size * track.resolution
+    on_track = np.unpackbits(track.on_track, axis=1)[:, :cells]
+    inside = on_track.reshape(track.size, track.resolution, track.size, track.resolution).any(axis=(1, 3))
+    return (np.asarray(track.walls) | ~inside).astype(np.uint8)
+
+def render_suite(resolutions, engines, path_names, repeat, mipmaps=(True,), walls=('pista',), layouts=('linear',)):
+    """ Roda cada caminho de câmera em cada resolução, motor, modo de mipmap e layout do chão e grade de paredes.
+    Retorna:
+     list: Um dicionário de métricas por combinação (caminho, resolução, motor, mipmaps, layout, paredes)."""
+    paths = load_camera_paths()
+    results = []
+    print(f"{'caminho':>8} {'resolução':>10} {'motor':>9} {'mip':>4} {'layout':>6} {'paredes':>7} {'média ms':>9} "
+          f"{'p50 ms':>8} {'p99 ms':>8} {'fps':>8}")
+    for hres, halfvres in resolutions:
+        for engine in engines:
+            for mipmap in mipmaps:
+                for layout in layouts:
+                    renderer = Renderer(hres, halfvres, engine=engine, mipmaps=mipmap, floor_layout=layout)
+                    wall_maps = {'pista': renderer.maph, 'cheia': full_wall_map(renderer.track)}
+                    for wall in walls:
+                        renderer.maph = wall_maps[wall]
+                        for name in path_names or paths:
+                            times = np.concatenate([frame_times(renderer, paths[name]) for _ in range(repeat)])
+                            result = {'path': name, 'hres': hres, 'halfvres': halfvres, 'engine': engine,
+                                      'mipmaps': mipmap, 'layout': layout, 'walls': wall, **summarize(times)}
+                            results.append(result)
+                            print(f"{name:>8} {hres}x{halfvres * 2:<6} {engine:>9} {'sim' if mipmap else 'não':>4} "
+                                  f"{layout:>6} {wall:>7} {result['mean_ms']:>9.3f} {result['p50_ms']:>8.3f} "
+                                  f"{result['p99_ms']:>8.3f} {result['fps']:>8.1f}")
+    return results
+
+def result_key(result):
+    # Resultados gravados antes das opções de mipmaps, paredes e layout contam como a configuração padrão
+    return (result['path'], result['hres'], result['halfvres'], result['engine'], result.get('mipmaps', True),
+            result.get('layout', 'linear'), result.get('walls', 'pista'))
+
+def compare(results, baseline_file):
+    """Imprime a variação percentual de média e p99 em relação a um JSON gerado anteriormente."""
+    with open(baseline_file) as f:
+        baseline = {result_key(r): r for r in json.load(f)['results']}
+    print(f"\nComparação com {baseline_file} (negativo = mais rápido)")
+    for result in results:
+        base = baseline.get(result_key(result))
+        if base is None:
+            continue
+        mean = 100 * (result['mean_ms'] / base['mean_ms'] - 1)
+        p99 = 100 * (result['p99_ms'] / base['p99_ms'] - 1)
+        print(f"{result['path']:>8} {result['hres']}x{result['halfvres'] * 2:<6} {result['engine']:>9} "
+              f"{'sim' if result.get('mipmaps', True) else 'não':>4} {result.get('layout', 'linear'):>6} "
+              f"{result.get('walls', 'pista'):>7} média {mean:+6.1f}%  p99 {p99:+6.1f}%")
+
+def write_results(results, output):
+    meta = {
+        'python': platform.python_version(),
+        'numba': numba.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpus': os.cpu_count(),
+        'numba_threads': numba.config.NUMBA_NUM_THREADS,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    with open(output, 'w') as f:
+        json.dump({'meta': meta, 'results': results}, f, indent=1)
+
+def engine_equivalence(resolutions, engine, reference='serial', tolerance=2, max_fraction=0.005,
+                       walls=('pista',)):
+    """ Renderiza todas as poses dos caminhos de câmera com os dois motores e compara os frames pixel a pixel.
+    Um pixel difere quando algum canal difere em mais de tolerance.
+    Retorna:
+     bool: Se em todas as combinações a fração de pixels diferentes ficou abaixo de max_fraction."""
+    paths = load_camera_paths()
+    ok = True
+    print(f"{'caminho':>8} {'resolução':>10} {'paredes':>7} {'pixels diferentes':>18} {'pior frame':>11} "
+          f"{'maior diferença':>16}")
+    for hres, halfvres in resolutions:
+        renderers = [Renderer(hres, halfvres, engine=name) for name in (reference, engine)]
+        wall_maps = {'pista': renderers[0].maph, 'cheia': full_wall_map(renderers[0].track)}
+        for wall in walls:
+            for renderer in renderers:
+                renderer.maph = wall_maps[wall]
+            for name, poses in paths.items():
+                fractions = np.empty(len(poses))
+                largest = 0
+                for f, pose in enumerate(poses):
+                    expected, actual = (pg.surfarray.array3d(r.render_frame(*pose)).astype(np.int16)
+                                        for r in renderers)
+                    difference = np.abs(expected - actual).max(axis=2)
+                    fractions[f] = (difference > tolerance).mean()
+                    largest = max(largest, int(difference.max()))
+                ok &= fractions.mean() < max_fraction
+                print(f"{name:>8} {hres}x{halfvres * 2:<6} {wall:>7} {100 * fractions.mean():>17.3f}% "
+                      f"{100 * fractions.max():>10.3f}% {largest:>16}")
+    print(f"{engine} {'equivale' if ok else 'NÃO equivale'} a {reference} "
+          f"(tolerância {tolerance}, até {100 * max_fraction:.1f}% dos pixels)")
+    return ok
+
+def thread_scaling(resolutions, thread_counts, path_name):
+    """Mede frames por segundo do motor paralelo para cada resolução e número de threads."""
+    poses = load_camera_paths()[path_name]
+    print(f"Núcleos disponíveis para o Numba: {numba.config.NUMBA_NUM_THREADS}")
+    print(f"{'resolução':>10} {'motor':>9} {'threads':>7} {'ms/frame':>9} {'fps':>8} {'speedup':>8}")
+    # Contagens acima do número de núcleos são limitadas pelo Renderer; evita medir a mesma configuração duas vezes
+    thread_counts = sorted({min(t, numba.config.NUMBA_NUM_THREADS) for t in thread_counts})
+    for hres, halfvres in resolutions:
+        label = f"{hres}x{halfvres * 2}"
+        baseline = frame_times(Renderer(hres, halfvres), poses).mean() / 1000
+        print(f"{label:>10} {'serial':>9} {1:>7} {baseline * 1000:>9.3f} {1 / baseline:>8.1f} {1:>8.2f}")
+        for threads in thread_counts:
+            renderer = Renderer(hres, halfvres, engine='parallel', threads=threads)
+            elapsed = frame_times(renderer, poses).mean() / 1000
+            print(f"{label:>10} {'parallel':>9} {renderer.threads:>7} {elapsed * 1000:>9.3f} "
+                  f"{1 / elapsed:>8.1f} {baseline / elapsed:>8.2f}")
+
+def startup_probe(engine):
+    """Executado em um subprocesso: cria o renderizador e aquece o kernel, imprimindo os tempos em JSON."""
+    start = time.perf_counter()
+    renderer = Renderer(120, 100, engine=engine)
+    load = time.perf_counter() - start
+    warm_up = renderer.warm_up()
+    print(json.dumps({'load_s': load, 'warm_up_s': warm_up}))
+
+def startup(engine, runs):
+    """Mede o tempo até o primeiro frame com o cache de kernels vazio (frio) e já preenchido (quente).
+    Cada medição roda em um processo novo, com um diretório de cache do Numba exclusivo."""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = dict(os.environ, NUMBA_CACHE_DIR=cache_dir)
+        command = [sys.executable, os.path.abspath(__file__), 'startup', '--engine', engine, '--probe']
+        print(f"{'execução':>10} {'processo s':>11} {'assets s':>9} {'warm-up s':>10}")
+        for run in range(runs + 1):
+            start = time.perf_counter()
+            output = subprocess.run(command, env=env, capture_output=True, text=True, check=True).stdout
+            wall = time.perf_counter() - start
+            result = json.loads(output.strip().splitlines()[-1])
+            label = 'frio' if run == 0 else f'quente {run}'
+            print(f"{label:>10} {wall:>11.3f} {result['load_s']:>9.3f} {result['warm_up_s']:>10.3f}")
+
+def serial_stream(fmt, samples):
+    """Gera o fluxo de bytes de samples leituras sintéticas do volante no formato pedido."""
+    ay = (15600 * np.sin(np.arange(samples) / 50)).astype(np.int16)
+    buttons = (np.arange(samples) // 25) % 16
+    if fmt == 'binary':
+        return protocolo.encode_packets(np.arange(samples), np.arange(samples) * 20, ay, buttons)
+    return protocolo.encode_text(ay, buttons)
+
+def decode_stream(port, data, chunk, decoder):
+    """ Escreve o fluxo na porta em blocos e decodifica o que volta, como a thread de leitura faria.
+    Retorna:
+     tuple: (amostras decodificadas, segundos no total, segundos só decodificando)."""
+    decoded = 0
+    decoding = 0.0
+    start = time.perf_counter()
+    for offset in range(0, len(data), chunk):
+        port.write(data[offset:offset + chunk])
+        received = port.read(port.in_waiting)
+        decode_start = time.perf_counter()
+        decoded += len(decoder.feed(received))
+        decoding += time.perf_counter() - decode_start
+    return decoded, time.perf_counter() - start, decoding
+
+def serial_throughput(samples, chunk):
+    """Compara a vazão de decodificação dos formatos de texto e binário por uma porta loopback.
+    A coluna 'porta' inclui o custo do próprio loop:// do pyserial; 'decodificação' mede só o analisador."""
+    print(f"{'formato':>8} {'bytes/amostra':>14} {'amostras':>9} {'porta amostras/s':>17} "
+          f"{'decodificação amostras/s':>25} {'MB/s':>7}")
+    for fmt in ('text', 'binary'):
+        data = serial_stream(fmt, samples)
+        port = serial.serial_for_url('loop://', 115200, timeout=0)
+        decoded, elapsed, decoding = decode_stream(port, data, chunk, protocolo.SensorDecoder())
+        port.close()
+        print(f"{fmt:>8} {len(data) / samples:>14.1f} {decoded:>9} {decoded / elapsed:>17.0f} "
+              f"{decoded / decoding:>25.0f} {len(data) / decoding / 1e6:>7.2f}")
+
+def kart_throughput(counts, steps, dt=1000 / 120):
+    """ Mede o passo de física de N karts pelo kernel em lote (KartArray.step) e, para comparação,
+    um kart por vez pela interface do Kart, como o jogo faz com o jogador."""
+    track = load_track(TRACK_PATH)
+    rng = np.random.default_rng(0)
+    KartArray.warm_up(track)
+    print(f"{'karts':>7} {'lote ms/passo':>14} {'karts/ms':>10} {'Kart ms/passo':>14} {'karts/ms':>10}")
+    for count in counts:
+        karts = KartArray(count)
+        waypoints = np.array(TRACK_WAYPOINTS)[rng.integers(len(TRACK_WAYPOINTS), size=count)]
+        for posx, posy in waypoints:
+            karts.add(posx=posx, posy=posy, rot=rng.uniform(0, 2 * np.pi))
+        karts.controls[0] = rng.uniform(-1, 1, count)
+        karts.controls[1] = 1.0
+        start = time.perf_counter()
+        for _ in range(steps):
+            karts.step(dt, track)
+        batch = (time.perf_counter() - start) * 1000 / steps
+        # Interface escalar: um Kart por posição, com is_on_track da pista
+        views = [Kart(karts, k) for k in range(min(count, 1000))]
+        start = time.perf_counter()
+        for _ in range(steps):
+            for kart in views:
+                kart.handle_movement(0.1, 1.0, 0.0, dt * 60 / 1000)
+                kart.update(dt, track.is_on_track(kart.posx, kart.posy), track.walls, track.size)
+        single = (time.perf_counter() - start) * 1000 / steps * count / len(views)
+        print(f"{count:>7} {batch:>14.4f} {count / batch:>10.0f} {single:>14.4f} {count / single:>10.0f}")
+
+def plot_rates(rates, seconds, window, interval):
+    """ Quadros por segundo e atraso de leitura do gráfico do teste.py com uma fonte sintética em loop://.
+    O matplotlib só é importado aqui, com o backend Agg (sem janela)."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import teste
+    print(f"{'amostras/s':>10} {'quadros/s':>10} {'na porta média':>15} {'máx':>6} {'atraso máx ms':>14} "
+          f"{'não plotadas':>13}")
+    for rate in rates:
+        result = teste.measure(rate, seconds, window, interval)
+        print(f"{rate:>10} {result['fps']:>10.1f} {result['backlog_mean']:>15.1f} {result['backlog_max']:>6.0f} "
+              f"{result['lag_ms']:>14.1f} {result['behind']:>13}")
+
+def race_ready_time(start_race):
+    """ Tempo de start_race() mais a espera até a contagem regressiva (tela de carregamento e aquecimento).
+    Retorna:
+     tuple: (Game pronto para a contagem, segundos)."""
+    start = time.perf_counter()
+    game = start_race()
+    if not game.warmed_up:
+        game.show_loading_screen()
+        game.wait_for_warm_up()
+        game.warmed_up = True
+    return game, time.perf_counter() - start
+
+def restart_latency(runs):
+    """ Tempo do clique em jogar até a contagem regressiva em uma nova partida: criando outro Game, como o menu
+    fazia, ou reiniciando o mesmo com Game.reset. Kernels e assets já estão quentes nas duas formas."""
+    assets = AssetManager()
+    game, first = race_ready_time(lambda: Game(assets=assets))
+    print(f"primeira partida: {first * 1000:.1f} ms")
+    print(f"{'partida':>8} {'Game() ms':>10} {'reset() ms':>11}")
+    for run in range(runs):
+        fresh, rebuild = race_ready_time(lambda: Game(assets=assets))
+        fresh.close()
+        _, reset = race_ready_time(lambda: (game.reset(), game)[1])
+        print(f"{run + 2:>8} {rebuild * 1000:>10.1f} {reset * 1000:>11.2f}")
+    game.close()
+
+def object_cost(coin_counts, path_name='volta', seed=0):
+    """ Tempo por frame de desenhar os objetos e testar as colisões do kart, com moedas extras espalhadas ao acaso
+    pelo mapa além das da pista.
+    Parâmetros:
+     coin_counts (list): Números de moedas extras.
+     path_name (str): Caminho de câmera percorrido.
+     seed (int): Semente das posições das moedas extras."""
+    game, _ = race_ready_time(lambda: Game(assets=AssetManager()))
+    poses = load_camera_paths()[path_name]
+    rng = np.random.default_rng(seed)
+    print(f"{'moedas':>7} {'no cone':>9} {'desenhadas':>11} {'média ms':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for count in coin_counts:
+        game.initialize_game_objects()
+        game.objects.add(ObjectStore.COIN, rng.uniform(0, game.track.size, (count, 2)))
+        visible = drawn = 0
+        times = np.empty(len(poses))
+        for f, (posx, posy, rot) in enumerate(poses):
+            frame_surface = game.renderer.render_frame(posx, posy, rot)
+            start = time.perf_counter()
+            game.draw_objects(frame_surface, posx, posy, rot)
+            game.objects.query_radius(posx, posy, 0.3, ObjectStore.COIN)
+            game.objects.query_radius(posx, posy, 0.3, ObjectStore.ITEM_BOX)
+            times[f] = (time.perf_counter() - start) * 1000
+            # Objetos no campo de visão, antes do corte por distância e do limite de sprites
+            visible += len(game.objects.visible(posx, posy, rot, np.deg2rad(30))[0])
+            drawn += game.objects_drawn
+        stats = summarize(times)
+        print(f"{count:>7} {visible / len(poses):>9.1f} {drawn / len(poses):>11.1f} {stats['mean_ms']:>9.3f} "
+              f"{stats['p50_ms']:>8.3f} {stats['p99_ms']:>8.3f}")
+    game.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    threads = sub.add_parser('threads', help='fps do motor paralelo em função do número de threads')
+    threads.add_argument('--threads', default='1,2,4,8', help='lista de números de threads')
+    threads.add_argument('--res', default='120x100,240x200,480x400', help='resoluções hres x halfvres')
+    threads.add_argument('--path', default='volta', help='caminho de câmera usado na medição')
+    start = sub.add_parser('startup', help='tempo de inicialização com cache de kernels frio e quente')
+    start.add_argument('--engine', default='serial', choices=['serial', 'parallel', 'scanline'])
+    start.add_argument('--runs', type=int, default=3, help='número de execuções com o cache quente')
+    start.add_argument('--probe', action='store_true', help=argparse.SUPPRESS)
+    render = sub.add_parser('render', help='tempos de frame sobre os caminhos de câmera gravados')
+    render.add_argument('--res', default='120x100,180x150,240x200', help='resoluções hres x halfvres')
+    render.add_argument('--engine', default='serial', help='motores separados por vírgula')
+    render.add_argument('--paths', default=None, help='caminhos separados por vírgula (padrão: todos)')
+    render.add_argument('--mipmaps', default='on', help="mipmaps do chão: 'on', 'off' ou 'on,off'")
+    render.add_argument('--walls', default='pista',
+                        help="paredes: 'pista' (as da pista), 'cheia' (toda célula fora da pista) ou 'pista,cheia'")
+    render.add_argument('--layouts', default='linear',
+                        help="layout dos texels do chão: 'linear', 'tiled' (blocos de 8 x 8) ou 'linear,tiled'")
+    render.add_argument('--repeat', type=int, default=1, help='repetições de cada caminho')
+    render.add_argument('--json', default=None, help='arquivo de saída com os resultados')
+    render.add_argument('--compare', default=None, help='JSON de uma execução anterior para comparar')
+    serial_cmd = sub.add_parser('serial', help='vazão dos analisadores do protocolo do volante via loop://')
+    serial_cmd.add_argument('--samples', type=int, default=20000)
+    serial_cmd.add_argument('--chunk', type=int, default=4096, help='bytes escritos por vez na porta')
+    karts_cmd = sub.add_parser('karts', help='passos de física por milissegundo em função do número de karts')
+    karts_cmd.add_argument('--karts', default='1,100,1000,10000', help='números de karts separados por vírgula')
+    karts_cmd.add_argument('--steps', type=int, default=200, help='passos medidos por contagem')
+    restart = sub.add_parser('restart', help='latência de uma nova partida: Game novo contra Game.reset')
+    restart.add_argument('--runs', type=int, default=5)
+    objects = sub.add_parser('objects', help='custo por frame dos objetos da pista em função do número de moedas')
+    objects.add_argument('--coins', default='0,1000,5000', help='moedas extras separadas por vírgula')
+    objects.add_argument('--path', default='volta', help='caminho de câmera percorrido')
+    plot = sub.add_parser('plot', help='quadros/s e atraso do gráfico do teste.py com fonte sintética')
+    plot.add_argument('--rates', default='50,500,2000', help='amostras/s da fonte, separadas por vírgula')
+    plot.add_argument('--seconds', type=float, default=3.0)
+    plot.add_argument('--window', type=int, default=100, help='amostras visíveis')
+    plot.add_argument('--interval', type=float, default=0, help='ms entre quadros (0 = o mais rápido possível)')
+    equivalence = sub.add_parser('equivalence', help='diferença pixel a pixel entre os frames de dois motores')
+    equivalence.add_argument('--engine', default='scanline', help='motor verificado')
+    equivalence.add_argument('--reference', default='serial', help='motor de referência')
+    equivalence.add_argument('--res', default='120x100,180x150,240x200', help='resoluções hres x halfvres')
+    equivalence.add_argument('--walls', default='pista,cheia', help="paredes: 'pista', 'cheia' ou as duas")
+    equivalence.add_argument('--tolerance', type=int, default=2, help='diferença aceita por canal')
+    sub.add_parser('make-paths', help=f'regera {CAMERA_PATHS_FILE} a partir da linha central da pista')
+    args = parser.parse_args()
+    # Os arquivos de resultados são relativos ao diretório de chamada; os caminhos dos assets, à raiz do projeto
+    for name in ('json', 'compare'):
+        if getattr(args, name, None):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    if args.command == 'make-paths':
+        save_camera_paths()
+        return
+    if args.command == 'serial':
+        serial_throughput(args.samples, args.chunk)
+        return
+    if args.command == 'plot':
+        plot_rates([int(v) for v in args.rates.split(',')], args.seconds, args.window, args.interval)
+        return
+    if args.command == 'restart':
+        restart_latency(args.runs)
+        return
+    if args.command == 'objects':
+        object_cost([int(v) for v in args.coins.split(',')], args.path)
+        return
+    if args.command == 'startup' and not args.probe:
+        startup(args.engine, args.runs)
+        return
+    init_headless()
+    if args.command == 'startup':
+        startup_probe(args.engine)
+    elif args.command == 'render':
+        path_names = args.paths.split(',') if args.paths else None
+        mipmaps = [value == 'on' for value in args.mipmaps.split(',')]
+        results = render_suite(parse_resolutions(args.res), args.engine.split(','), path_names, args.repeat, mipmaps,
+                               args.walls.split(','), args.layouts.split(','))
+        if args.json:
+            write_results(results, args.json)
+        if args.compare:
+            compare(results, args.compare)
+    elif args.command == 'equivalence':
+        if not engine_equivalence(parse_resolutions(args.res), args.engine, args.reference, args.tolerance,
+                                  walls=args.walls.split(',')):
+            sys.exit(1)
+    elif args.command == 'karts':
+        kart_throughput([int(v) for v in args.karts.split(',')], args.steps)
+    elif args.command == 'threads':
+        counts = [int(v) for v in args.threads.split(',')]
+        thread_scaling(parse_resolutions(args.res), counts, args.path)
+
+if __name__ == '__main__':
+    main()
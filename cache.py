@@ -0,0 +1,118 @@
+"""Cache em disco de assets já decodificados e prontos para o renderizador.
+
+Cada entrada é um .npy com o array no dtype e layout que o renderizador usa (por exemplo o chão em uint8
+(largura, altura, 3), ou em float64 no formato de pixel antigo), identificado pelo caminho da fonte, pelo
+mtime e tamanho do arquivo e por uma variante (formato de pixel, altura do céu redimensionado, ...).
+Na próxima execução o array é aberto com np.load(mmap_mode='r'): nada é decodificado, as páginas vêm do cache
+do sistema, são compartilhadas entre processos e só são lidas quando o kernel as acessa.
+
+Uso:
+ python cache.py          mostra tempo de carregamento e memória residente de cada asset do renderizador
+ python cache.py --clear  apaga o cache
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import time
+import numpy as np
+
+CACHE_DIR = '.cache/assets'
+CACHE_FORMAT_VERSION = 1
+
+def resident_bytes(path):
+    """ Memória residente (RSS) das páginas do arquivo mapeadas neste processo, lida de /proc/self/smaps.
+    Retorna:
+     int ou None: Bytes residentes, ou None se o sistema não expõe smaps."""
+    target = os.path.realpath(path)
+    total = 0
+    current = False
+    try:
+        with open('/proc/self/smaps') as f:
+            for line in f:
+                fields = line.split()
+                if '-' in fields[0] and len(fields) >= 5:
+                    # Cabeçalho de um mapeamento: endereço, permissões, offset, dispositivo, inode e caminho
+                    current = len(fields) >= 6 and fields[5] == target
+                elif current and fields[0] == 'Rss:':
+                    total += int(fields[1]) * 1024
+    except OSError:
+        return None
+    return total
+
+class AssetCache:
+    """Cache de arrays derivados de arquivos de asset, invalidado quando a fonte muda."""
+    def __init__(self, directory=CACHE_DIR, mmap_mode='r'):
+        """ Parâmetros:
+         directory (str): Diretório das entradas.
+         mmap_mode (str ou None): Modo de np.load; None lê o array inteiro para a memória."""
+        self.directory = directory
+        self.mmap_mode = mmap_mode
+        # Por entrada carregada: (fonte, variante, segundos, bytes, arquivo do cache, se veio do cache)
+        self.loaded = []
+
+    def entry_path(self, source, variant):
+        stat = os.stat(source)
+        key = f'{CACHE_FORMAT_VERSION}|{os.path.realpath(source)}|{stat.st_mtime_ns}|{stat.st_size}|{variant}'
+        name = os.path.splitext(os.path.basename(source))[0]
+        return os.path.join(self.directory, f'{name}-{hashlib.sha1(key.encode()).hexdigest()[:16]}.npy')
+
+    def load(self, source, variant, build):
+        """ Retorna o array da fonte na variante pedida, do cache ou construído e gravado nele.
+        Parâmetros:
+         source (str): Arquivo de origem (imagem, som...).
+         variant (str): Distingue arrays diferentes derivados da mesma fonte.
+         build (callable): Recebe source e devolve o array; chamado só quando não há entrada válida.
+        Retorna:
+         np.ndarray: O array (somente leitura se mapeado em memória)."""
+        start = time.perf_counter()
+        path = self.entry_path(source, variant)
+        hit = os.path.exists(path)
+        if not hit:
+            array = np.ascontiguousarray(build(source))
+            os.makedirs(self.directory, exist_ok=True)
+            # Grava em um arquivo temporário e renomeia, para outro processo nunca ler uma entrada pela metade
+            temporary = f'{path}.{os.getpid()}.tmp'
+            with open(temporary, 'wb') as f:
+                np.save(f, array)
+            os.replace(temporary, path)
+        array = np.load(path, mmap_mode=self.mmap_mode)
+        self.loaded.append((source, variant, time.perf_counter() - start, array.nbytes, path, hit))
+        return array
+
+    def report(self):
+        """ Tempo de carregamento, tamanho e memória residente atual de cada entrada carregada.
+        Retorna:
+         list: Linhas de texto, uma por entrada."""
+        lines = [f"{'asset':<24} {'variante':<16} {'origem':>7} {'ms':>8} {'tamanho KiB':>12} {'residente KiB':>14}"]
+        for source, variant, seconds, size, path, hit in self.loaded:
+            resident = resident_bytes(path) if self.mmap_mode else size
+            resident_text = '-' if resident is None else f'{resident / 1024:.0f}'
+            lines.append(f"{os.path.basename(source):<24} {variant:<16} {'cache' if hit else 'fonte':>7} "
+                         f"{seconds * 1000:>8.2f} {size / 1024:>12.0f} {resident_text:>14}")
+        return lines
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clear', action='store_true', help='apaga o cache')
+    parser.add_argument('--format', default='uint8', choices=['uint8', 'float'], help='formato de pixel')
+    args = parser.parse_args()
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    if args.clear:
+        AssetCache().clear()
+        return
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame as pg
+    from main import Renderer, SCREEN_WIDTH, SCREEN_HEIGHT
+    pg.display.init()
+    pg.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    renderer = Renderer(120, 100, pixel_format=args.format)
+    # Um frame faz o kernel tocar as páginas do chão e do céu que ele realmente lê
+    renderer.render_frame(*(float(v) for v in renderer.track.spawn))
+    print('\n'.join(renderer.assets.report()))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Gravação e reprodução determinística das entradas de uma partida.
+
+Cada frame guarda os valores de controle já combinados (teclado, joystick e volante), as bordas dos botões
+de poder e pausa, o et devolvido por clock.tick e o tempo do jogo; a semente do sorteio de poderes vai junto.
+Reproduzir o arquivo recria a mesma partida sem nenhum dispositivo conectado.
+"""
+import numpy as np
+
+FRAME_DTYPE = np.dtype([
+    ('et', '<u2'), ('ticks', '<u4'), ('turn', '<f8'), ('accelerate', '<f8'), ('brake', '<f8'), ('flags', 'u1')
+])
+POWER, PAUSE = 1, 2
+FORMAT_VERSION = 1
+
+class InputRecorder:
+    """Acumula os frames em um array estruturado que dobra de tamanho quando enche."""
+    def __init__(self, path, seed, capacity=4096):
+        """ Parâmetros:
+         path (str): Arquivo .npz de saída.
+         seed (int): Semente do gerador de números aleatórios da partida.
+         capacity (int): Número inicial de frames pré-alocados."""
+        self.path = path
+        self.seed = seed
+        self.frames = np.zeros(capacity, dtype=FRAME_DTYPE)
+        self.count = 0
+
+    def record(self, et, ticks, turn, accelerate, brake, power, pause):
+        """ Registra as entradas de um frame.
+        Parâmetros:
+         et (int): Tempo do frame em ms (retorno de clock.tick).
+         ticks (int): Tempo do jogo em ms desde o início da corrida.
+         turn, accelerate, brake (float): Valores de controle combinados.
+         power (bool): Se o poder foi acionado neste frame.
+         pause (bool): Se a pausa foi acionada neste frame."""
+        if self.count == len(self.frames):
+            self.frames = np.concatenate((self.frames, np.zeros_like(self.frames)))
+        self.frames[self.count] = (et, ticks, turn, accelerate, brake, POWER * bool(power) | PAUSE * bool(pause))
+        self.count += 1
+
+    def save(self):
+        np.savez_compressed(self.path, frames=self.frames[:self.count], seed=self.seed, version=FORMAT_VERSION)
+
+class InputReplay:
+    """Entrega os frames de uma gravação, um por chamada."""
+    def __init__(self, path):
+        with np.load(path) as data:
+            if int(data['version']) != FORMAT_VERSION:
+                raise ValueError(f"Versão de gravação não suportada: {int(data['version'])}")
+            self.frames = data['frames']
+            self.seed = int(data['seed'])
+        self.index = 0
+
+    def __len__(self):
+        return len(self.frames)
+
+    def next_frame(self):
+        """ Retorna o próximo frame gravado.
+        Retorna:
+         np.void ou None: O frame (campos de FRAME_DTYPE), ou None ao fim da gravação."""
+        if self.index >= len(self.frames):
+            return None
+        frame = self.frames[self.index]
+        self.index += 1
+        return frame
@@ -1,150 +1,423 @@
 import pygame as pg
 import numpy as np
-from numba import njit
+import numba
+from numba import njit, prange
+from abc import ABC, abstractmethod
+import argparse
+import os
 import random
+from collections import OrderedDict
+from concurrent import futures
+import threading
+import time
 import serial
+from protocolo import SensorDecoder
+from gravacao import InputRecorder, InputReplay, POWER, PAUSE
+from pista import FLOOR_PERIOD, in_region, load_track, on_track_lookup
+from cache import AssetCache
+from perfil import FrameProfiler, HISTORY_FRAMES, NULL_PROFILER
+from telemetria import POWER_PENDING, TelemetryLogger, session_path
 
 SCREEN_WIDTH, SCREEN_HEIGHT = 800, 600
 COINS = 10
 TIME = 600000
 LAPS = 10
+# Motor de renderização ('serial', 'parallel' ou 'scanline') e threads do motor paralelo (None = todos os núcleos)
+RENDER_ENGINE = 'serial'
+RENDER_THREADS = None
+# Orçamento de tempo de render_frame (ms) e níveis permitidos da resolução dinâmica (ver ResolutionController.LEVELS)
+RENDER_BUDGET_MS = 6.0
+RESOLUTION_MIN_LEVEL = 0
+RESOLUTION_MAX_LEVEL = None
+# Amostragem do chão no formato uint8: mipmaps escolhidos por linha (False usa só o nível 0) e layout dos texels
+# de cada nível ('linear' ou 'tiled', em blocos de 8 x 8; ver build_floor_mips)
+FLOOR_MIPMAPS = True
+FLOOR_LAYOUT = 'linear'
+# Simulação em passo fixo: frequência (Hz), maior deslocamento por subpasso e maior et aceito por frame (ms)
+SIM_RATE = 120
+MAX_SUBSTEP_DISTANCE = 0.05
+MAX_FRAME_TIME = 250
+# Objetos da pista: distância máxima de desenho (a altura do sprite chega a SpriteCache.MIN_HEIGHT por volta de 14
+# na resolução de referência) e máximo de sprites por frame, os mais próximos
+OBJECT_DRAW_DISTANCE = 14.0
+MAX_DRAWN_OBJECTS = 256
+# Texto exibido enquanto há um poder de caixa aguardando ativação
+POWER_PROMPT = "Press X / R /BOT4"
+# Etapas de um frame medidas pelo perfilador (--profile), na ordem do laço do jogo
+FRAME_STAGES = ['espera', 'eventos', 'entrada', 'física', 'colisões', 'render', 'objetos', 'escala', 'hud', 'display']
+# Diretório dos logs de telemetria das partidas (ver telemetria.py); None desliga
+TELEMETRY_DIR = 'telemetria'
+# Pacote de pista carregado pelo jogo (ver pista.py)
+TRACK_PATH = 'pistas/mario'
+# Porta do volante; aceita também URLs do pyserial, como 'loop://' para testes sem hardware
+SERIAL_PORT = 'COM5'
+# Pré-gera na carga os sprites de caixa e moeda em todas as alturas possíveis
+PREBUILD_SPRITES = True
+
+# Campos do KartArray, um por linha do array de estado (struct-of-arrays)
+KART_FIELDS = ('posx', 'posy', 'rot', 'vel', 'acceleration', 'deceleration', 'brake_deceleration', 'max_speed',
+               'min_speed', 'slow_down_factor', 'rotation_speed_factor')
+(KART_POSX, KART_POSY, KART_ROT, KART_VEL, KART_ACCELERATION, KART_DECELERATION, KART_BRAKE_DECELERATION,
+ KART_MAX_SPEED, KART_MIN_SPEED, KART_SLOW_DOWN_FACTOR, KART_ROTATION_SPEED_FACTOR) = range(len(KART_FIELDS))
+
+@njit(cache=True)
+def move_kart(state, k, turn_value, accelerate_value, brake_value, step_scale):
+    """Atualiza a velocidade e a rotação do kart k com base nos valores de entrada (ver Kart.handle_movement)."""
+    vel = state[KART_VEL, k]
+    max_speed = state[KART_MAX_SPEED, k]
+    if vel != 0:
+        # Calcula a velocidade de rotação baseada na velocidade atual
+        speed_ratio = abs(vel) / max_speed
+        state[KART_ROT, k] += turn_value * state[KART_ROTATION_SPEED_FACTOR, k] * speed_ratio * step_scale
+    # Trata a entrada de aceleração
+    if accelerate_value > 0:
+        vel = min(vel + state[KART_ACCELERATION, k] * accelerate_value * step_scale, max_speed)
+    # Trata a entrada de freio
+    elif brake_value > 0:
+        if vel > 0:
+            vel = max(vel - state[KART_BRAKE_DECELERATION, k] * brake_value * step_scale, 0.0)
+        else:
+            vel = max(vel - state[KART_ACCELERATION, k] * brake_value * step_scale, state[KART_MIN_SPEED, k])
+    else:
+        # Aplica desaceleração natural quando não há entrada
+        if vel > 0:
+            vel = max(vel - state[KART_DECELERATION, k] * step_scale, 0.0)
+        elif vel < 0:
+            vel = min(vel + state[KART_DECELERATION, k] * step_scale, 0.0)
+    # Limita a velocidade dentro do intervalo permitido
+    state[KART_VEL, k] = max(min(vel, max_speed), state[KART_MIN_SPEED, k])
+
+@njit(cache=True)
+def advance_kart(state, k, et, on_track, maph, size):
+    """Move o kart k por et ms com colisão separada por eixo contra maph (ver Kart.update)."""
+    # Fatores multiplicativos são calibrados por frame de 60 Hz
+    step_scale = et * 60 / 1000
+    if not on_track:
+        state[KART_VEL, k] *= state[KART_SLOW_DOWN_FACTOR, k] ** step_scale # Reduz a velocidade fora da pista
+    posx = state[KART_POSX, k]
+    posy = state[KART_POSY, k]
+    rot = state[KART_ROT, k]
+    vel = state[KART_VEL, k]
+    next_posx = posx + np.cos(rot) * vel * et
+    next_posy = posy + np.sin(rot) * vel * et
+    # Verifica colisão no eixo X
+    can_move_x = maph[int(next_posx) % size][int(posy) % size] != 1
+    if can_move_x:
+        posx = next_posx
+    # Verifica colisão no eixo Y, já a partir do novo x
+    can_move_y = maph[int(posx) % size][int(next_posy) % size] != 1
+    if can_move_y:
+        posy = next_posy
+    state[KART_POSX, k] = posx
+    state[KART_POSY, k] = posy
+    # Trata a resposta à colisão
+    if not can_move_x and not can_move_y:
+        state[KART_VEL, k] = 0.0
+    elif not can_move_x or not can_move_y:
+        state[KART_VEL, k] = vel * 0.985 ** step_scale # Atrito ao deslizar na parede
+
+@njit(cache=True)
+def move_karts(state, controls, start, stop, step_scale):
+    for k in range(start, stop):
+        move_kart(state, k, controls[0, k], controls[1, k], controls[2, k], step_scale)
+
+@njit(cache=True)
+def advance_karts(state, on_track, start, stop, et, maph, size):
+    for k in range(start, stop):
+        advance_kart(state, k, et, on_track[k], maph, size)
+
+@njit(cache=True)
+def step_karts(state, controls, on_track, count, et, substeps, mask, resolution, maph, size):
+    """ Avança count karts por et ms: entradas, e então substeps subpassos de pista + movimento com colisão.
+    Parâmetros:
+     state (np.ndarray): Estado dos karts, uma linha por campo de KART_FIELDS.
+     controls (np.ndarray): Entradas (turn, accelerate, brake) por kart, shape (3, capacidade).
+     on_track (np.ndarray): Saída: se cada kart terminou o passo na pista.
+     mask (np.ndarray): Máscara de pista empacotada (Track.on_track).
+     resolution (int): Células da máscara por unidade do mundo."""
+    step_scale = et * 60 / 1000
+    for k in range(count):
+        move_kart(state, k, controls[0, k], controls[1, k], controls[2, k], step_scale)
+        for _ in range(substeps):
+            inside = on_track_lookup(mask, resolution, state[KART_POSX, k], state[KART_POSY, k])
+            advance_kart(state, k, et / substeps, inside, maph, size)
+        on_track[k] = on_track_lookup(mask, resolution, state[KART_POSX, k], state[KART_POSY, k])
+
+class KartArray:
+    """Estado de vários karts em struct-of-arrays, avançado de uma vez pelos kernels compilados.
+    Kart é uma view sobre uma posição deste array."""
+    # Valores iniciais: posição de largada, parado, e os parâmetros de movimento do kart do jogador
+    DEFAULTS = {
+        'posx': 27, 'posy': 18.5, 'rot': 4.7, 'vel': 0, 'acceleration': 0.00001, 'deceleration': 0.00002,
+        'brake_deceleration': 0.00005, 'max_speed': 0.01, 'min_speed': -0.005, 'slow_down_factor': 1,
+        'rotation_speed_factor': 0.05
+    }
+
+    def __init__(self, capacity=1):
+        self.state = np.zeros((len(KART_FIELDS), capacity))
+        self.controls = np.zeros((3, capacity))
+        self.on_track = np.ones(capacity, dtype=np.bool_)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def add(self, **values):
+        """ Acrescenta um kart com os valores de DEFAULTS, sobrepostos pelos informados.
+        Retorna:
+         int: Índice do novo kart."""
+        if self.count == self.state.shape[1]:
+            # Dobra a capacidade, como o InputRecorder
+            self.state = np.concatenate((self.state, np.zeros_like(self.state)), axis=1)
+            self.controls = np.concatenate((self.controls, np.zeros_like(self.controls)), axis=1)
+            self.on_track = np.concatenate((self.on_track, np.ones_like(self.on_track)))
+        self.count += 1
+        self.reset(self.count - 1, **values)
+        return self.count - 1
+
+    def reset(self, index, **values):
+        """Volta o kart index aos valores de DEFAULTS, sobrepostos pelos informados, parado e sem entradas."""
+        for row, field in enumerate(KART_FIELDS):
+            self.state[row, index] = values.pop(field, self.DEFAULTS[field])
+        if values:
+            raise TypeError(f"Campos de kart desconhecidos: {', '.join(values)}")
+        self.controls[:, index] = 0
+        self.on_track[index] = True
+
+    def field(self, name):
+        """Retorna a view (sem cópia) da coluna name para os karts existentes."""
+        return self.state[KART_FIELDS.index(name), :self.count]
+
+    def step(self, et, track, substeps=1):
+        """ Avança todos os karts por et ms com as entradas em self.controls, usando a máscara e as paredes da pista.
+        Retorna:
+         np.ndarray: Se cada kart está na pista ao fim do passo."""
+        step_karts(self.state, self.controls, self.on_track, self.count, float(et), substeps,
+                   track.on_track, track.resolution, track.walls, track.size)
+        return self.on_track[:self.count]
+
+    @staticmethod
+    def warm_up(track):
+        """ Compila (ou carrega do cache em disco) os kernels dos karts com os tipos usados no jogo.
+        Retorna:
+         float: Tempo gasto em segundos."""
+        start = time.perf_counter()
+        kart = Kart()
+        kart.handle_movement(0.0, 0.0, 0.0)
+        kart.update(1000 / SIM_RATE, True, track.walls, track.size)
+        kart.karts.step(1000 / SIM_RATE, track)
+        return time.perf_counter() - start
+
+def kart_field(row):
+    """Propriedade que lê e escreve a linha row do KartArray na posição do kart."""
+    def get(self):
+        return float(self.karts.state[row, self.index])
+    def set(self, value):
+        self.karts.state[row, self.index] = value
+    return property(get, set)
 
 class Kart:
-    """Representa o kart do jogador com posição, rotação e mecânicas de movimento."""
-    def __init__(self):
-        # Posição inicial (x, y) e rotação (em radianos)
-        self.posx, self.posy, self.rot = 27, 18.5, 4.7
-        self.vel = 0 # Velocidade atual
-        # Parâmetros de movimento
-        self.acceleration = 0.00001
-        self.deceleration = 0.00002
-        self.brake_deceleration = 0.00005
-        self.max_speed = 0.01
-        self.min_speed = -0.005
-        self.slow_down_factor = 1
-        self.rotation_speed_factor = 0.05
-
-    def handle_movement(self, turn_value, accelerate_value, brake_value):
+    """Representa o kart do jogador com posição, rotação e mecânicas de movimento.
+    Os dados ficam em uma posição de um KartArray; sem array, o kart cria um só para ele."""
+    posx, posy, rot, vel = (kart_field(row) for row in (KART_POSX, KART_POSY, KART_ROT, KART_VEL))
+    acceleration = kart_field(KART_ACCELERATION)
+    deceleration = kart_field(KART_DECELERATION)
+    brake_deceleration = kart_field(KART_BRAKE_DECELERATION)
+    max_speed = kart_field(KART_MAX_SPEED)
+    min_speed = kart_field(KART_MIN_SPEED)
+    slow_down_factor = kart_field(KART_SLOW_DOWN_FACTOR)
+    rotation_speed_factor = kart_field(KART_ROTATION_SPEED_FACTOR)
+
+    def __init__(self, karts=None, index=None):
+        """ Parâmetros:
+         karts (KartArray): Array que guarda o estado; None cria um array de um kart.
+         index (int): Posição no array; None acrescenta um kart com os valores iniciais."""
+        self.karts = karts if karts is not None else KartArray()
+        self.index = index if index is not None else self.karts.add()
+
+    def reset(self, **values):
+        """Volta o kart aos valores iniciais (KartArray.DEFAULTS), desfazendo poderes e movimento."""
+        self.karts.reset(self.index, **values)
+
+    def handle_movement(self, turn_value, accelerate_value, brake_value, step_scale=1.0):
         """ Atualiza a velocidade e rotação do kart com base nos valores de entrada.
             Parâmetros:
             turn_value (float): Valor indicando a direção e magnitude da curva.
             accelerate_value (float): Valor indicando a entrada de aceleração.
-            brake_value (float): Valor indicando a entrada de freio. """
-        if self.vel != 0:
-            # Calcula a velocidade de rotação baseada na velocidade atual
-            speed_ratio = abs(self.vel) / self.max_speed
-            rotation_speed = turn_value * self.rotation_speed_factor * speed_ratio
-            self.rot += rotation_speed
-        # Trata a entrada de aceleração
-        if accelerate_value > 0:
-            self.vel += self.acceleration * accelerate_value
-            self.vel = min(self.vel, self.max_speed)
-        # Trata a entrada de freio
-        elif brake_value > 0:
-            if self.vel > 0:
-                self.vel -= self.brake_deceleration * brake_value
-                self.vel = max(self.vel, 0)
-            else:
-                self.vel -= self.acceleration * brake_value
-                self.vel = max(self.vel, self.min_speed)
-        else:
-            # Aplica desaceleração natural quando não há entrada
-            if self.vel > 0:
-                self.vel = max(self.vel - self.deceleration, 0)
-            elif self.vel < 0:
-                self.vel = min(self.vel + self.deceleration, 0)
-        # Limita a velocidade dentro do intervalo permitido
-        self.vel = max(min(self.vel, self.max_speed), self.min_speed)
+            brake_value (float): Valor indicando a entrada de freio.
+            step_scale (float): Duração do passo em frames de 60 Hz (os parâmetros são calibrados por frame). """
+        self.karts.controls[:, self.index] = (turn_value, accelerate_value, brake_value)
+        move_karts(self.karts.state, self.karts.controls, self.index, self.index + 1, float(step_scale))
 
     def update(self, et, on_track, maph, size):
         """ Atualiza a posição do kart com base na velocidade e verifica colisões com a pista. 
         Parâmetros:
-            et (int): Tempo decorrido desde a última atualização em milissegundos.
+            et (float): Tempo decorrido desde a última atualização em milissegundos.
             on_track (bool): Indica se o kart está atualmente na pista.
             maph (np.ndarray): Layout do mapa como uma matriz 2D.
             size (int): Tamanho do mapa. """
-        if not on_track:
-            self.vel *= self.slow_down_factor # Reduz a velocidade se estiver fora da pista
-        # Calcula a variação de movimento com base na rotação e velocidade
-        cos_rot = np.cos(self.rot)
-        sin_rot = np.sin(self.rot)
-        delta_x = cos_rot * self.vel * et
-        delta_y = sin_rot * self.vel * et
-
-        next_posx = self.posx + delta_x
-        next_posy = self.posy + delta_y
-
-        can_move_x = True
-        can_move_y = True
-        # Verifica colisão no eixo X
-        map_x, map_y = int(next_posx) % size, int(self.posy) % size
-        if maph[map_x][map_y] != 1:
-            self.posx = next_posx
-        else:
-            can_move_x = False
-        # Verifica colisão no eixo Y
-        map_x, map_y = int(self.posx) % size, int(next_posy) % size
-        if maph[map_x][map_y] != 1:
-            self.posy = next_posy
-        else:
-            can_move_y = False
-        # Trata a resposta à colisão
-        if not can_move_x and not can_move_y:
-            self.vel = 0
-        elif not can_move_x or not can_move_y:
-            sliding_friction = 0.985
-            self.vel *= sliding_friction
+        self.karts.on_track[self.index] = on_track
+        advance_karts(self.karts.state, self.karts.on_track, self.index, self.index + 1, float(et), maph, size)
 
 class Renderer:
     """Responsável por renderizar os gráficos do jogo, incluindo o céu, chão e objetos."""
-    def __init__(self, hres, halfvres):
+    def __init__(self, hres, halfvres, pixel_format='uint8', engine='serial', threads=None, track=None, assets=None,
+                 mipmaps=FLOOR_MIPMAPS, floor_layout=FLOOR_LAYOUT):
+        """ Parâmetros:
+         hres (int): Resolução horizontal interna (colunas).
+         halfvres (int): Metade da resolução vertical interna.
+         pixel_format (str): 'uint8' renderiza direto no buffer de uma superfície persistente;
+          'float' mantém o caminho antigo em float64 normalizado.
+         engine (str): 'serial' percorre as colunas em uma thread; 'parallel' divide as colunas entre threads;
+          'scanline' desenha o chão linha a linha com tabelas pré-calculadas (os dois últimos somente com
+          pixel_format 'uint8').
+         threads (int, opcional): Número de threads do motor paralelo; None usa todos os núcleos.
+         track (Track, opcional): Pista com as texturas e a grade de paredes; None carrega a pista padrão.
+         assets (AssetCache, opcional): Cache em disco das texturas decodificadas; None usa o diretório padrão.
+         mipmaps (bool): No formato uint8, escolhe o nível de mipmap do chão por linha; False usa só o nível 0.
+         floor_layout (str): No formato uint8, layout dos texels do chão: 'linear' ou 'tiled' (blocos de 8 x 8). """
+        if pixel_format not in ('uint8', 'float'):
+            raise ValueError(f"Formato de pixel desconhecido: {pixel_format}")
+        if engine not in ('serial', 'parallel', 'scanline'):
+            raise ValueError(f"Motor de renderização desconhecido: {engine}")
+        if engine != 'serial' and pixel_format != 'uint8':
+            raise ValueError(f"O motor {engine} requer pixel_format 'uint8'")
+        if floor_layout not in FLOOR_LAYOUTS:
+            raise ValueError(f"Layout do chão desconhecido: {floor_layout}")
         self.hres, self.halfvres = hres, halfvres
+        self.pixel_format = pixel_format
+        self.engine = engine
+        # Limita ao número de threads com que o Numba foi iniciado
+        self.threads = min(threads or numba.config.NUMBA_NUM_THREADS, numba.config.NUMBA_NUM_THREADS)
         self.mod = hres / 60
-        self.size = 32
-        self.maph = np.zeros((self.size, self.size), dtype=int)
-        self.frame = np.random.uniform(0, 1, (hres, halfvres * 2, 3))
+        self.track = track if track is not None else load_track(TRACK_PATH)
+        self.size = self.track.size
+        self.maph = self.track.walls
+        self.assets = assets if assets is not None else AssetCache()
+        self.mipmaps = mipmaps
+        self.floor_layout = floor_layout
+        self.allocate_frame()
         self.load_assets()
-        self.create_map_boundaries()
 
-    def create_map_boundaries(self):
-        """Cria limites ao redor do mapa para evitar que o kart saia dos limites."""
-        self.maph[0, :] = 1
-        self.maph[:, 0] = 1
-        self.maph[self.size - 1, :] = 1
-        self.maph[:, self.size - 1] = 1
+    def allocate_frame(self):
+        """Aloca o buffer do frame para a resolução atual."""
+        if self.pixel_format == 'uint8':
+            # Superfície persistente: o kernel escreve direto nos pixels dela a cada frame
+            self.surface = pg.Surface((self.hres, self.halfvres * 2))
+            self.frame = None
+        else:
+            self.surface = None
+            self.frame = np.random.uniform(0, 1, (self.hres, self.halfvres * 2, 3))
+
+    def set_resolution(self, hres, halfvres):
+        """ Troca a resolução interna, realocando o buffer do frame e o céu redimensionado.
+        Parâmetros:
+         hres (int): Nova resolução horizontal.
+         halfvres (int): Nova metade da resolução vertical."""
+        if (hres, halfvres) == (self.hres, self.halfvres):
+            return
+        self.hres, self.halfvres = hres, halfvres
+        self.mod = hres / 60
+        self.allocate_frame()
+        self.sky = self.scale_sky()
+        self.update_row_levels()
 
     def load_assets(self):
         """Carrega e inicializa todos os recursos gráficos necessários para a renderização."""
-        self.sky = self.load_and_scale_image('assets/skybox.jpg', (360, self.halfvres * 2))
-        self.floor = self.load_image('assets/MarioKart.png')
-        self.track_surface = self.load_image('assets/pista.png', alpha=False)
-        self.wall_texture = np.full((100, 100, 3), [0.5, 0.5, 0.5])
+        normalize = self.pixel_format == 'float'
+        # Texturas já decodificadas no formato de pixel vêm do cache em disco, mapeadas em memória
+        floor_path = self.track.textures['floor']
+        if normalize:
+            self.floor = self.assets.load(floor_path, 'float', lambda path: self.load_image(path, normalize=True))
+        else:
+            # Chão com a cadeia de mipmaps no layout pedido (ver build_floor_mips); a tabela de níveis sai do lado
+            # do nível 0, que é o shape[0] da cadeia, e os kernels leem a cadeia como um array 1D
+            layout = self.floor_layout
+            chain = self.assets.load(floor_path, f'uint8-{layout}',
+                                     lambda path: build_floor_mips(self.load_image(path, normalize=False), layout))
+            self.floor_levels = floor_mip_levels(chain.shape[0], layout)
+            self.floor = chain.reshape(-1)
+        # A imagem original do céu só é decodificada se faltar no cache a altura pedida, e então é mantida
+        self.sky_image = None
+        self.skies = {}
+        self.prepare_skies([self.halfvres * 2])
+        self.sky = self.scale_sky()
+        if normalize:
+            self.wall_texture = np.full((100, 100, 3), [0.5, 0.5, 0.5])
+        else:
+            self.wall_texture = np.full((100, 100, 3), 128, dtype=np.uint8)
+        self.update_row_levels()
+
+    def update_row_levels(self):
+        """Recalcula o nível de mipmap de cada linha do chão para a resolução atual (somente uint8) e, no motor
+        scanline, as tabelas de colunas e linhas e os arrays de trabalho por coluna."""
+        if self.pixel_format == 'uint8':
+            self.row_levels = floor_row_levels(self.hres, self.halfvres, self.floor_levels[0, 1],
+                                               len(self.floor_levels), self.mipmaps)
+        if self.engine == 'scanline':
+            self.column_angles, self.column_cos, self.row_distances, self.row_shades = ray_tables(
+                self.hres, self.halfvres, self.mod)
+            self.floor_rows = np.empty(self.hres, dtype=np.int64)
+            self.step_u = np.empty(self.hres)
+            self.step_v = np.empty(self.hres)
+
+    def prepare_skies(self, heights):
+        """ Carrega pelo cache de assets o céu de cada altura de frame que o jogo pode usar, para que trocas de
+        resolução durante a partida não leiam nem gravem em disco.
+        Parâmetros:
+         heights (list): Alturas do frame em pixels (2 * halfvres)."""
+        path = self.track.textures['sky']
+        for height in heights:
+            if height not in self.skies:
+                # Copiado para a memória: nem a primeira leitura das páginas mapeadas acontece durante a partida
+                self.skies[height] = np.array(self.assets.load(
+                    path, f'{self.pixel_format}-{height}', lambda path, height=height: self.build_sky(path, height)))
+
+    def scale_sky(self):
+        """Céu redimensionado para 360 colunas (uma por grau) e a altura do frame atual. Alturas que não foram
+        preparadas por prepare_skies são redimensionadas só em memória, sem passar pelo cache em disco."""
+        height = self.halfvres * 2
+        sky = self.skies.get(height)
+        if sky is None:
+            sky = self.skies[height] = self.build_sky(self.track.textures['sky'], height)
+        return sky
+
+    def build_sky(self, path, height):
+        if self.sky_image is None:
+            self.sky_image = pg.image.load(path)
+        image = pg.transform.scale(self.sky_image, (360, height))
+        pixels = pg.surfarray.array3d(image)
+        return pixels / 255 if self.pixel_format == 'float' else pixels
 
     @staticmethod
-    def load_image(path, alpha=False):
+    def load_image(path, alpha=False, normalize=True):
         """ Carrega uma imagem do caminho fornecido. 
         Parâmetros:
          path (str): Caminho para o arquivo de imagem.
          alpha (bool): Se deve incluir transparência alfa.
+         normalize (bool): Se deve converter para float no intervalo [0, 1]; caso contrário mantém uint8.
         Retorna:
-         np.ndarray: A imagem carregada como um array NumPy normalizado."""
+         np.ndarray: A imagem carregada como um array NumPy."""
         image = pg.image.load(path)
         if alpha:
             image = image.convert_alpha()
         else:
             image = image.convert()
-        return pg.surfarray.array3d(image) / 255
+        pixels = pg.surfarray.array3d(image)
+        return pixels / 255 if normalize else pixels
 
     @staticmethod
-    def load_and_scale_image(path, size):
+    def load_and_scale_image(path, size, normalize=True):
         """ Carrega e redimensiona uma imagem para o tamanho especificado.
         Parâmetros:
          path (str): Caminho para o arquivo de imagem.
          size (tuple): Tamanho desejado como (largura, altura).
+         normalize (bool): Se deve converter para float no intervalo [0, 1]; caso contrário mantém uint8.
         Retorna:
-         np.ndarray: A imagem carregada e redimensionada como um array NumPy normalizado. """
+         np.ndarray: A imagem carregada e redimensionada como um array NumPy. """
         image = pg.transform.scale(pg.image.load(path), size)
-        return pg.surfarray.array3d(image) / 255
+        pixels = pg.surfarray.array3d(image)
+        return pixels / 255 if normalize else pixels
 
     def render_frame(self, posx, posy, rot):
         """Renderiza um único frame com base na posição e rotação do kart.
@@ -154,23 +427,111 @@ class Renderer:
          rot (float): Rotação do kart em radianos.
         Retorna:
          pg.Surface: O frame renderizado como uma superfície Pygame."""
+        if self.pixel_format == 'uint8':
+            # A view trava a superfície; é liberada antes do retorno para permitir blits
+            pixels = pg.surfarray.pixels3d(self.surface)
+            if self.engine == 'scanline':
+                new_frame_scanline(
+                    posx, posy, rot, pixels, self.sky, self.floor, self.floor_levels, self.row_levels,
+                    self.column_angles, self.column_cos, self.row_distances, self.row_shades, self.halfvres,
+                    self.maph, self.size, self.wall_texture, self.floor_rows, self.step_u, self.step_v
+                )
+                del pixels
+                return self.surface
+            kernel = new_frame_u8
+            if self.engine == 'parallel':
+                numba.set_num_threads(self.threads)
+                kernel = new_frame_u8_parallel
+            kernel(
+                posx, posy, rot, pixels, self.sky, self.floor, self.floor_levels, self.row_levels,
+                self.hres, self.halfvres, self.mod, self.maph, self.size, self.wall_texture
+            )
+            del pixels
+            return self.surface
         self.frame = new_frame(
             posx, posy, rot, self.frame, self.sky, self.floor,
-            self.track_surface, self.hres, self.halfvres, self.mod, self.maph, self.size, self.wall_texture
+            self.hres, self.halfvres, self.mod, self.maph, self.size, self.wall_texture
         )
         return pg.surfarray.make_surface(self.frame * 255)
 
-    def is_on_track(self, posx, posy):
-        height, width = self.track_surface.shape[:2]
-        xx = int((posx / self.size) * (width - 1))
-        yy = int((1 - posy / self.size) * (height - 1))
-        xx = np.clip(xx, 0, width - 1)
-        yy = np.clip(yy, 0, height - 1)
-        red = self.track_surface[yy, xx, 0]
-        return red > 0.5
-
-@njit()
-def new_frame(posx, posy, rot, frame, sky, floor, track_surface, hres, halfvres, mod, maph, size, wall_texture):
+    def warm_up(self):
+        """Compila (ou carrega do cache em disco) o kernel ativo renderizando um frame com os mesmos
+        tipos de argumento usados no jogo.
+        Retorna:
+         float: Tempo gasto em segundos."""
+        start = time.perf_counter()
+        self.render_frame(*(float(v) for v in self.track.spawn))
+        return time.perf_counter() - start
+
+@njit(cache=True)
+def cast_wall(posx, posy, cos_rot, sin_rot, max_distance, maph, size):
+    """ Percorre a grade de paredes célula a célula ao longo do raio (DDA) até a primeira parede. O custo depende
+    só do número de células atravessadas, não da resolução, e a distância é exata.
+    Parâmetros:
+     posx, posy (float): Origem do raio.
+     cos_rot, sin_rot (float): Direção do raio.
+     max_distance (float): Distância ao longo do raio em que a busca para.
+     maph (np.ndarray): Grade de paredes, 1 onde há parede; os índices são tomados módulo size.
+     size (int): Lado da grade.
+    Retorna:
+     tuple: (distância ao longo do raio até a parede, ou -1.0 sem parede até max_distance;
+      coordenada da face atingida ao longo da parede, em unidades do mundo)."""
+    map_x, map_y = int(np.floor(posx)), int(np.floor(posy))
+    if maph[map_x % size, map_y % size] == 1:
+        return 0.0, posx + posy  # Origem dentro de uma parede
+    # Distância ao longo do raio entre duas bordas verticais (x inteiro) e horizontais (y inteiro) da grade,
+    # e até a primeira de cada
+    step_x, step_y = 1, 1
+    delta_x, delta_y = np.inf, np.inf
+    side_x, side_y = np.inf, np.inf
+    if cos_rot != 0:
+        delta_x = abs(1 / cos_rot)
+        if cos_rot > 0:
+            side_x = (map_x + 1 - posx) * delta_x
+        else:
+            step_x = -1
+            side_x = (posx - map_x) * delta_x
+    if sin_rot != 0:
+        delta_y = abs(1 / sin_rot)
+        if sin_rot > 0:
+            side_y = (map_y + 1 - posy) * delta_y
+        else:
+            step_y = -1
+            side_y = (posy - map_y) * delta_y
+    while True:
+        # Atravessa a borda mais próxima
+        if side_x < side_y:
+            distance = side_x
+            side_x += delta_x
+            map_x += step_x
+            crossed_x = True
+        else:
+            distance = side_y
+            side_y += delta_y
+            map_y += step_y
+            crossed_x = False
+        if distance > max_distance:
+            return -1.0, 0.0
+        if maph[map_x % size, map_y % size] == 1:
+            # Face em x constante: a coordenada ao longo dela é y, e vice-versa
+            if crossed_x:
+                return distance, posy + sin_rot * distance
+            return distance, posx + cos_rot * distance
+
+@njit(cache=True)
+def wall_floor_rows(distance, cos2, halfvres):
+    """ Número de linhas de chão abaixo da parede à distância distance (ao longo do raio) de uma coluna com
+    cos2 = cos(ângulo da coluna): as linhas j com n = halfvres / (halfvres - j) / cos2 < distance. A parede ocupa
+    as halfvres menos essas linhas de cada lado do horizonte."""
+    if distance < 0:
+        return halfvres  # Sem parede ao alcance
+    perpendicular = distance * cos2
+    if perpendicular <= 1:
+        return 0
+    return min(halfvres, int(np.ceil(halfvres - halfvres / perpendicular)))
+
+@njit(cache=True)
+def new_frame(posx, posy, rot, frame, sky, floor, hres, halfvres, mod, maph, size, wall_texture):
     """Gera um novo frame para renderização usando código otimizado compilado com Numba.
     Retorna:
      np.ndarray: Buffer do frame atualizado."""
@@ -180,9 +541,12 @@ def new_frame(posx, posy, rot, frame, sky, floor, track_surface, hres, halfvres,
         sin_rot, cos_rot = np.sin(rot_i), np.cos(rot_i)
         cos2 = np.cos(np.deg2rad(i / mod - 30))
         sky_index = int(np.rad2deg(rot_i) % 359)
-        frame[i][:] = sky[sky_index][:]  # Define a cor do céu
-
-        for j in range(halfvres):
+        # Parede da coluna pela grade; o chão vai só até a linha dela
+        distance, wall_u = cast_wall(posx, posy, cos_rot, sin_rot, halfvres / cos2, maph, size)
+        floor_rows = wall_floor_rows(distance, cos2, halfvres)
+        # Define a cor do céu acima da parede (ou do horizonte); o resto da coluna é parede e chão
+        frame[i][:floor_rows] = sky[sky_index][:floor_rows]
+        for j in range(floor_rows):
             # Calcula a distância e posição com base no ângulo atual e j
             n = (halfvres / (halfvres - j)) / cos2
             x = posx + cos_rot * n
@@ -190,79 +554,819 @@ def new_frame(posx, posy, rot, frame, sky, floor, track_surface, hres, halfvres,
             xx = int(x / 30 % 1 * 1023)
             yy = int(y / 30 % 1 * 1023)
             shade = 0.95 + 0.05 * (1 - j / halfvres)
-
-            map_x, map_y = int(x) % size, int(y) % size
-            if maph[map_x][map_y] == 1:
-                # Colisão detectada com parede
-                h = halfvres - j
-                c = shade * wall_texture[int(x * 10 % 100)][int(y * 10 % 100)]
-                min_k = max(0, halfvres - h)
-                max_k = min(frame.shape[1], halfvres + h)
-                frame[i][min_k:max_k] = c  # Desenha a parede
-                break
-            else:
-                # Desenha o chão
-                frame[i][halfvres * 2 - j - 1] = floor[xx][yy] * shade
+            frame[i][halfvres * 2 - j - 1] = floor[xx][yy] * shade  # Desenha o chão
+
+        h = halfvres - floor_rows
+        if h > 0:
+            # Desenha a parede: coluna da textura pelo ponto atingido, linha pela altura projetada exata
+            shade = 0.95 + 0.05 * (1 - floor_rows / halfvres)
+            tx = int(wall_u * 10 % 100)
+            step = 100 * max(distance * cos2, 1e-6) / (2 * halfvres)
+            for k in range(max(0, halfvres - h), min(frame.shape[1], halfvres + h)):
+                ty = min(99, max(0, int((k - halfvres) * step + 50)))
+                frame[i][k] = shade * wall_texture[tx][ty]
     return frame
 
+# Lado mínimo do último nível de mipmap do chão, em texels
+FLOOR_MIP_MIN_SIZE = 8
+# Lado dos blocos do layout 'tiled' em texels (8 x 8 texels de 4 bytes = 256 bytes, 4 linhas de cache)
+FLOOR_TILE_SHIFT = 3
+FLOOR_LAYOUTS = {'linear': 0, 'tiled': FLOOR_TILE_SHIFT}
+
+def floor_mip_levels(size, layout='linear'):
+    """ Tabela dos níveis de mipmap de uma textura size x size no formato de build_floor_mips.
+    O layout 'linear' é o caso de blocos de 1 x 1 texel: blocos por lado = lado e deslocamento 0.
+    Retorna:
+     np.ndarray: Uma linha por nível: (offset em bytes, lado em texels, blocos por lado, log2 do lado do bloco)."""
+    shift = FLOOR_LAYOUTS[layout]
+    tile = 1 << shift
+    levels = []
+    offset = 0
+    while True:
+        tiles = -(-size // tile)
+        levels.append((offset, size, tiles, shift))
+        offset += (tiles * tile) ** 2 * 4
+        if size < 2 * FLOOR_MIP_MIN_SIZE:
+            return np.array(levels, dtype=np.int64)
+        size //= 2
+
+def build_floor_mips(floor, layout='linear'):
+    """ Monta a cadeia de mipmaps (média de 2 x 2 texels por nível) da textura do chão, com texels RGB + 1 byte
+    de alinhamento. No layout 'linear' cada nível fica em ordem (x, y); no 'tiled', em blocos de
+    2 ** FLOOR_TILE_SHIFT texels de lado, cada bloco contíguo na memória.
+    Parâmetros:
+     floor (np.ndarray): Textura uint8 (largura, altura, 3), quadrada.
+     layout (str): 'linear' ou 'tiled'.
+    Retorna:
+     np.ndarray: Os níveis concatenados em um array uint8 (largura, n), com n completado até caber a cadeia;
+      o lado do nível 0 é o shape[0], e a posição de cada nível vem de floor_mip_levels."""
+    levels = floor_mip_levels(floor.shape[0], layout)
+    end = levels[-1, 0] + (levels[-1, 2] << levels[-1, 3]) ** 2 * 4
+    chain = np.zeros((floor.shape[0], -(-end // floor.shape[0])), dtype=np.uint8)
+    texels = chain.reshape(-1)
+    image = floor.astype(np.uint16)
+    for offset, size, tiles, shift in levels:
+        if image.shape[0] != size:
+            # Reduz pela média de cada bloco 2 x 2 do nível anterior
+            even = image[:size * 2, :size * 2]
+            image = (even[0::2, 0::2] + even[1::2, 0::2] + even[0::2, 1::2] + even[1::2, 1::2] + 2) // 4
+        tile = 1 << shift
+        padded = np.zeros((tiles * tile, tiles * tile, 4), dtype=np.uint8)
+        padded[:size, :size, :3] = image
+        blocks = padded.reshape(tiles, tile, tiles, tile, 4).transpose(0, 2, 1, 3, 4)
+        texels[offset:offset + padded.nbytes] = blocks.ravel()
+    return chain
+
+def floor_row_levels(hres, halfvres, texture_size, level_count, mipmaps=True):
+    """ Nível de mipmap de cada linha do chão (j = 0 na linha mais distante), pela área em texels que um pixel
+    cobre à distância n = halfvres / (halfvres - j): n * (1/mod)° na horizontal e n² / halfvres na vertical.
+    Usa a média geométrica das duas direções, que evita o borrão excessivo do maior lado em ângulos rasantes.
+    Retorna:
+     np.ndarray: int64, halfvres níveis (todos 0 se mipmaps for False)."""
+    if not mipmaps:
+        return np.zeros(halfvres, dtype=np.int64)
+    texels_per_unit = (texture_size - 1) / FLOOR_PERIOD
+    n = halfvres / (halfvres - np.arange(halfvres))
+    across = n * np.deg2rad(60 / hres) * texels_per_unit
+    along = n * n / halfvres * texels_per_unit
+    lod = 0.5 * np.log2(np.maximum(across * along, 1.0))
+    return np.clip(lod.astype(np.int64), 0, level_count - 1)
+
+@njit(cache=True)
+def draw_wall_u8(i, frame, wall_texture, distance, wall_u, cos2, floor_rows, halfvres):
+    """Desenha na coluna i a parede encontrada por cast_wall, entre as floor_rows linhas de céu e as de chão."""
+    h = halfvres - floor_rows
+    if h <= 0:
+        return
+    # Coluna da textura pelo ponto atingido, linha pela altura projetada exata
+    shade = int(256 * (0.95 + 0.05 * (1 - floor_rows / halfvres)))
+    tx = int(wall_u * 10 % 100)
+    # Os 100 texels da coluna da textura cobrem a altura projetada; cada um preenche um trecho de linhas
+    # com a mesma cor, e só os texels das linhas visíveis são percorridos
+    min_k, max_k = max(0, halfvres - h), min(frame.shape[1], halfvres + h)
+    rows_per_texel = 2 * halfvres / max(distance * cos2, 1e-6) / 100
+    first_ty = max(0, int((min_k - halfvres) / rows_per_texel + 50))
+    last_ty = min(99, int((max_k - 1 - halfvres) / rows_per_texel + 50))
+    start = min_k
+    for ty in range(first_ty, last_ty + 1):
+        end = max_k if ty == last_ty else min(max_k, int(np.ceil(halfvres + (ty - 49) * rows_per_texel)))
+        r = (wall_texture[tx, ty, 0] * shade) >> 8
+        g = (wall_texture[tx, ty, 1] * shade) >> 8
+        b = (wall_texture[tx, ty, 2] * shade) >> 8
+        for k in range(start, end):
+            frame[i, k, 0] = r
+            frame[i, k, 1] = g
+            frame[i, k, 2] = b
+        start = max(start, end)
+
+@njit(cache=True)
+def render_column_u8(i, posx, posy, rot, frame, sky, floor, floor_levels, row_levels, halfvres, mod, maph, size,
+                     wall_texture):
+    """Renderiza a coluna i da tela em uint8. Cada coluna é independente (ângulo, céu, chão e parede próprios),
+    o que permite distribuí-las entre threads. O chão vem da cadeia de mipmaps, no nível da linha."""
+    # Calcula a rotação para a coluna atual
+    rot_i = rot + np.deg2rad(i / mod - 30)
+    sin_rot, cos_rot = np.sin(rot_i), np.cos(rot_i)
+    cos2 = np.cos(np.deg2rad(i / mod - 30))
+    sky_index = int(np.rad2deg(rot_i) % 359)
+    # Parede da coluna pela grade; o chão vai só até a linha dela
+    distance, wall_u = cast_wall(posx, posy, cos_rot, sin_rot, halfvres / cos2, maph, size)
+    floor_rows = wall_floor_rows(distance, cos2, halfvres)
+    # Define a cor do céu só acima da parede (ou do horizonte): as outras linhas são parede e chão. São tantas
+    # linhas quanto as de chão, já que a parede é simétrica em relação ao horizonte
+    for k in range(floor_rows):
+        for c in range(3):
+            frame[i, k, c] = sky[sky_index, k, c]
+
+    # Nível de mipmap atual; os dados dele só são relidos quando a linha muda de nível
+    level, offset, scale, tiles, shift, mask = -1, 0, 0.0, 0, 0, 0
+    for j in range(floor_rows):
+        # Calcula a distância e posição com base no ângulo atual e j
+        n = (halfvres / (halfvres - j)) / cos2
+        x = posx + cos_rot * n
+        y = posy + sin_rot * n
+        shade = int(256 * (0.95 + 0.05 * (1 - j / halfvres)))
+        # Desenha o chão: texel (xx, yy) do nível da linha, dentro do bloco (xx, yy) >> shift
+        if row_levels[j] != level:
+            level = row_levels[j]
+            offset, scale, tiles = floor_levels[level, 0], float(floor_levels[level, 1] - 1), floor_levels[level, 2]
+            shift = floor_levels[level, 3]
+            mask = (1 << shift) - 1
+        # Parte fracionária por floor, mais barata que o % 1 do Python (mesmo resultado para x, y >= 0)
+        u, v = x / FLOOR_PERIOD, y / FLOOR_PERIOD
+        xx = int((u - np.floor(u)) * scale)
+        yy = int((v - np.floor(v)) * scale)
+        tile = (xx >> shift) * tiles + (yy >> shift)
+        texel = offset + ((tile << (2 * shift)) + ((xx & mask) << shift) + (yy & mask)) * 4
+        row = halfvres * 2 - j - 1
+        for c in range(3):
+            frame[i, row, c] = (floor[texel + c] * shade) >> 8
+
+    draw_wall_u8(i, frame, wall_texture, distance, wall_u, cos2, floor_rows, halfvres)
+
+@njit(cache=True)
+def new_frame_u8(posx, posy, rot, frame, sky, floor, floor_levels, row_levels, hres, halfvres, mod, maph, size,
+                 wall_texture):
+    """Versão uint8 de new_frame: escreve direto no buffer de pixels da superfície (view de pixels3d),
+    com sombreamento em ponto fixo (shade em 1/256) e sem alocar arrays temporários."""
+    for i in range(hres):
+        render_column_u8(i, posx, posy, rot, frame, sky, floor, floor_levels, row_levels, halfvres, mod, maph, size,
+                         wall_texture)
+
+@njit(parallel=True, cache=True)
+def new_frame_u8_parallel(posx, posy, rot, frame, sky, floor, floor_levels, row_levels, hres, halfvres, mod, maph,
+                          size, wall_texture):
+    """Mesmo que new_frame_u8, mas distribui as colunas entre as threads do Numba com prange."""
+    for i in prange(hres):
+        render_column_u8(i, posx, posy, rot, frame, sky, floor, floor_levels, row_levels, halfvres, mod, maph, size,
+                         wall_texture)
+
+def ray_tables(hres, halfvres, mod):
+    """ Tabelas do motor scanline, que só dependem da resolução.
+    Retorna:
+     tuple: (ângulo de cada coluna em relação ao centro da tela em radianos, cosseno desse ângulo,
+      distância perpendicular de cada linha do chão (j = 0 na mais próxima) em períodos da textura,
+      sombreamento de cada linha em 1/256)."""
+    angles = np.deg2rad(np.arange(hres) / mod - 30)
+    rows = np.arange(halfvres)
+    distances = halfvres / (halfvres - rows) / FLOOR_PERIOD
+    shades = (256 * (0.95 + 0.05 * (1 - rows / halfvres))).astype(np.int64)
+    return angles, np.cos(angles), distances, shades
+
+@njit(cache=True)
+def new_frame_scanline(posx, posy, rot, frame, sky, floor, floor_levels, row_levels, column_angles, column_cos,
+                       row_distances, row_shades, halfvres, maph, size, wall_texture, floor_rows, step_u, step_v):
+    """Motor scanline (estilo Mode 7): o mesmo frame de new_frame_u8, com o chão desenhado linha a linha.
+    Ângulo das colunas e distância, sombreamento e nível de mipmap das linhas vêm das tabelas da resolução
+    (ray_tables); por frame só se calcula a direção de cada coluna, e o ponto do chão é a posição da câmera mais
+    a distância da linha vezes essa direção. As linhas seguem a ordem do buffer na memória. floor_rows, step_u e
+    step_v são arrays de trabalho com uma posição por coluna, alocados uma vez por resolução."""
+    hres = len(column_angles)
+    for i in range(hres):
+        # Céu, parede e direção de cada coluna
+        rot_i = rot + column_angles[i]
+        sin_rot, cos_rot = np.sin(rot_i), np.cos(rot_i)
+        cos2 = column_cos[i]
+        sky_index = int(np.rad2deg(rot_i) % 359)
+        distance, wall_u = cast_wall(posx, posy, cos_rot, sin_rot, halfvres / cos2, maph, size)
+        rows = wall_floor_rows(distance, cos2, halfvres)
+        floor_rows[i] = rows
+        for k in range(rows):
+            for c in range(3):
+                frame[i, k, c] = sky[sky_index, k, c]
+        draw_wall_u8(i, frame, wall_texture, distance, wall_u, cos2, rows, halfvres)
+        # Deslocamento no chão por unidade de distância perpendicular
+        step_u[i] = cos_rot / cos2
+        step_v[i] = sin_rot / cos2
+
+    origin_u, origin_v = posx / FLOOR_PERIOD, posy / FLOOR_PERIOD
+    for j in range(halfvres):
+        # Tudo o que depende só da linha sai das tabelas, uma vez por linha
+        level = row_levels[j]
+        offset, scale, tiles = floor_levels[level, 0], float(floor_levels[level, 1] - 1), floor_levels[level, 2]
+        shift = floor_levels[level, 3]
+        mask = (1 << shift) - 1
+        distance = row_distances[j]
+        shade = row_shades[j]
+        row = halfvres * 2 - j - 1
+        for i in range(hres):
+            if j >= floor_rows[i]:
+                continue  # Linha coberta pela parede nesta coluna
+            u = origin_u + distance * step_u[i]
+            v = origin_v + distance * step_v[i]
+            xx = int((u - np.floor(u)) * scale)
+            yy = int((v - np.floor(v)) * scale)
+            tile = (xx >> shift) * tiles + (yy >> shift)
+            texel = offset + ((tile << (2 * shift)) + ((xx & mask) << shift) + (yy & mask)) * 4
+            for c in range(3):
+                frame[i, row, c] = (floor[texel + c] * shade) >> 8
+
+@njit(cache=True)
+def upscale_nearest(src, dst, x_map, y_map):
+    """Amplia src para dst por vizinho mais próximo, copiando pixels inteiros (views de pixels2d no mesmo formato).
+    O laço interno percorre x, que é a dimensão contígua na memória da superfície."""
+    for y in range(dst.shape[1]):
+        sy = y_map[y]
+        for x in range(dst.shape[0]):
+            dst[x, y] = src[x_map[x], sy]
+
+class ScreenUpscaler:
+    """Amplia o frame de baixa resolução escrevendo direto no buffer de pixels da tela, sem criar a
+    superfície intermediária de pg.transform.scale. Usa o caminho antigo (scale + blit) quando os formatos
+    de pixel das duas superfícies não são iguais."""
+    def __init__(self, screen):
+        self.screen = screen
+        self.maps = {}
+
+    def index_maps(self, source_size):
+        """Tabelas coluna/linha de destino -> origem, calculadas uma vez por resolução de origem."""
+        maps = self.maps.get(source_size)
+        if maps is None:
+            width, height = self.screen.get_size()
+            x_map = (np.arange(width) * source_size[0] // width).astype(np.int64)
+            y_map = (np.arange(height) * source_size[1] // height).astype(np.int64)
+            maps = self.maps[source_size] = (x_map, y_map)
+        return maps
+
+    def can_write_directly(self, surface):
+        return (surface.get_bitsize() == self.screen.get_bitsize() == 32
+                and surface.get_masks() == self.screen.get_masks())
+
+    def draw(self, surface):
+        """ Desenha a superfície ampliada ocupando a tela inteira.
+        Parâmetros:
+         surface (pg.Surface): O frame em resolução interna."""
+        if not self.can_write_directly(surface):
+            self.screen.blit(pg.transform.scale(surface, self.screen.get_size()), (0, 0))
+            return
+        x_map, y_map = self.index_maps(surface.get_size())
+        src = pg.surfarray.pixels2d(surface)
+        dst = pg.surfarray.pixels2d(self.screen)
+        upscale_nearest(src, dst, x_map, y_map)
+        # Libera as views para destravar as superfícies antes dos próximos blits
+        del src, dst
+
+class ResolutionController:
+    """Ajusta a resolução interna do renderizador para manter o tempo de render_frame dentro de um orçamento.
+    Mede o tempo de cada frame com média móvel exponencial, reduz um nível quando o orçamento é estourado e
+    só aumenta quando a estimativa para o nível seguinte cabe com folga (histerese), respeitando um
+    intervalo mínimo de frames entre trocas."""
+    # Níveis de resolução (hres, halfvres), todos na proporção de 120x100
+    LEVELS = [(60, 50), (84, 70), (120, 100), (156, 130), (192, 160), (240, 200)]
+
+    def __init__(self, renderer, target_ms=6.0, min_level=0, max_level=None, smoothing=0.1,
+                 cooldown=30, upscale_margin=0.8):
+        """ Parâmetros:
+         renderer (Renderer): Renderizador controlado.
+         target_ms (float): Orçamento de tempo para render_frame em milissegundos.
+         min_level (int): Menor nível permitido (índice em LEVELS).
+         max_level (int, opcional): Maior nível permitido; None usa o último.
+         smoothing (float): Peso de cada nova medição na média móvel.
+         cooldown (int): Frames mínimos entre duas trocas de resolução.
+         upscale_margin (float): Fração do orçamento que o nível seguinte deve respeitar para subir."""
+        self.renderer = renderer
+        self.target_ms = target_ms
+        self.smoothing = smoothing
+        self.cooldown = cooldown
+        self.upscale_margin = upscale_margin
+        current = (renderer.hres, renderer.halfvres)
+        self.level = self.LEVELS.index(current) if current in self.LEVELS else 2
+        # O céu de todos os níveis é preparado agora, no carregamento, e não a cada troca no meio da partida
+        renderer.prepare_skies([2 * halfvres for _, halfvres in self.LEVELS])
+        self.pin(min_level, max_level)
+        self.average_ms = None
+        self.frames_since_change = 0
+
+    @property
+    def scale(self):
+        """Escala atual em relação à resolução padrão de 120x100."""
+        return self.renderer.hres / 120
+
+    def pin(self, min_level=0, max_level=None):
+        """ Restringe os níveis que o controlador pode usar e aplica o nível resultante.
+        Parâmetros:
+         min_level (int): Menor nível permitido.
+         max_level (int, opcional): Maior nível permitido; None usa o último."""
+        last = len(self.LEVELS) - 1
+        self.min_level = max(0, min(min_level, last))
+        self.max_level = last if max_level is None else max(self.min_level, min(max_level, last))
+        self.set_level(max(self.min_level, min(self.level, self.max_level)))
+
+    def set_level(self, level):
+        """Aplica o nível de resolução ao renderizador e reinicia a medição."""
+        self.level = level
+        self.renderer.set_resolution(*self.LEVELS[level])
+        self.average_ms = None
+        self.frames_since_change = 0
+
+    def pixels(self, level):
+        hres, halfvres = self.LEVELS[level]
+        return hres * halfvres
+
+    def update(self, render_ms):
+        """ Registra o tempo do último render_frame e troca de nível se necessário.
+        Parâmetros:
+         render_ms (float): Tempo do último render_frame em milissegundos.
+        Retorna:
+         bool: True se a resolução foi alterada."""
+        if self.average_ms is None:
+            self.average_ms = render_ms
+        else:
+            self.average_ms += self.smoothing * (render_ms - self.average_ms)
+        self.frames_since_change += 1
+        if self.frames_since_change < self.cooldown:
+            return False
+        if self.average_ms > self.target_ms and self.level > self.min_level:
+            self.set_level(self.level - 1)
+            return True
+        if self.level < self.max_level:
+            # O custo do renderizador cresce com o número de pixels
+            predicted = self.average_ms * self.pixels(self.level + 1) / self.pixels(self.level)
+            if predicted < self.target_ms * self.upscale_margin:
+                self.set_level(self.level + 1)
+                return True
+        return False
+
+@njit(cache=True)
+def objects_in_radius(x, y, radius, kind, cell_size, cells_per_side, cell_start, cell_objects, posx, posy, kinds, active):
+    """Busca de ObjectStore.query_radius nas células da grade que cobrem o círculo, na mesma ordem de resultado."""
+    last = cells_per_side - 1
+    x0 = int(min(max((x - radius) / cell_size, 0), last))
+    x1 = int(min(max((x + radius) / cell_size, 0), last))
+    y0 = int(min(max((y - radius) / cell_size, 0), last))
+    y1 = int(min(max((y + radius) / cell_size, 0), last))
+    found = np.empty(len(posx), dtype=np.int64)
+    count = 0
+    for cx in range(x0, x1 + 1):
+        for cy in range(y0, y1 + 1):
+            cell = cx * cells_per_side + cy
+            for k in range(cell_start[cell], cell_start[cell + 1]):
+                index = cell_objects[k]
+                if active[index] and kinds[index] == kind and np.hypot(posx[index] - x, posy[index] - y) < radius:
+                    found[count] = index
+                    count += 1
+    return found[:count]
+
+class ObjectStore:
+    """Guarda os objetos da pista (moedas e caixas de itens) como arrays paralelos (posição, tipo, ativo,
+    tempo de reaparecimento) com um índice em grade uniforme sobre o mapa. Colisões e recorte pelo campo
+    de visão consultam apenas as células próximas e são calculados em lote com NumPy."""
+    COIN, ITEM_BOX = 0, 1
+    # Nome de cada tipo nos pacotes de pista
+    KINDS = {'coin': COIN, 'item_box': ITEM_BOX}
+    NO_RESPAWN = -1
+
+    def __init__(self, size, cell_size=1.0):
+        """ Parâmetros:
+         size (int): Tamanho do mapa (o mesmo de Renderer.size).
+         cell_size (float): Lado de cada célula da grade."""
+        self.size = size
+        self.cell_size = cell_size
+        self.cells_per_side = int(np.ceil(size / cell_size))
+        self.posx = np.empty(0)
+        self.posy = np.empty(0)
+        self.kind = np.empty(0, dtype=np.int8)
+        self.active = np.empty(0, dtype=bool)
+        self.respawn_time = np.empty(0, dtype=np.int64)
+        self.build_index()
+
+    def __len__(self):
+        return len(self.posx)
+
+    def add(self, kind, positions):
+        """ Adiciona objetos de um tipo e reconstrói o índice.
+        Parâmetros:
+         kind (int): ObjectStore.COIN ou ObjectStore.ITEM_BOX.
+         positions (sequence): Posições (posx, posy) dos objetos."""
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        count = len(positions)
+        self.posx = np.concatenate((self.posx, positions[:, 0]))
+        self.posy = np.concatenate((self.posy, positions[:, 1]))
+        self.kind = np.concatenate((self.kind, np.full(count, kind, dtype=np.int8)))
+        self.active = np.concatenate((self.active, np.ones(count, dtype=bool)))
+        self.respawn_time = np.concatenate((self.respawn_time, np.full(count, self.NO_RESPAWN, dtype=np.int64)))
+        self.build_index()
+
+    def cell_of(self, x, y):
+        """Índice linear da célula da grade que contém cada posição (posições fora do mapa vão para a borda)."""
+        last = self.cells_per_side - 1
+        cx = np.clip((np.asarray(x) / self.cell_size).astype(np.int64), 0, last)
+        cy = np.clip((np.asarray(y) / self.cell_size).astype(np.int64), 0, last)
+        return cx * self.cells_per_side + cy
+
+    def build_index(self):
+        """Ordena os objetos por célula (formato CSR: cell_start[c]:cell_start[c + 1] em cell_objects)."""
+        cells = self.cell_of(self.posx, self.posy)
+        self.cell_objects = np.argsort(cells, kind='stable')
+        counts = np.bincount(cells, minlength=self.cells_per_side ** 2)
+        self.cell_start = np.concatenate(([0], np.cumsum(counts)))
+        # Células ocupadas e seus centros, usados no recorte pelo campo de visão
+        self.occupied_cells = np.flatnonzero(counts)
+        self.cell_center_x = (self.occupied_cells // self.cells_per_side + 0.5) * self.cell_size
+        self.cell_center_y = (self.occupied_cells % self.cells_per_side + 0.5) * self.cell_size
+
+    def objects_in_cells(self, cells):
+        """Índices de todos os objetos das células dadas."""
+        starts = self.cell_start[cells]
+        counts = self.cell_start[cells + 1] - starts
+        total = counts.sum()
+        if total == 0:
+            return np.empty(0, dtype=np.int64)
+        # Concatena os intervalos starts[k]:starts[k] + counts[k] sem laço em Python
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+        return self.cell_objects[offsets + np.arange(total)]
+
+    def query_radius(self, x, y, radius, kind):
+        """ Encontra objetos ativos de um tipo dentro de um raio.
+        Parâmetros:
+         x (float): Posição x do centro da busca.
+         y (float): Posição y do centro da busca.
+         radius (float): Raio da busca.
+         kind (int): Tipo de objeto procurado.
+        Retorna:
+         np.ndarray: Índices dos objetos encontrados."""
+        return objects_in_radius(float(x), float(y), float(radius), kind, float(self.cell_size), self.cells_per_side,
+                                 self.cell_start, self.cell_objects, self.posx, self.posy, self.kind, self.active)
+
+    def visible(self, x, y, rot, half_fov, max_distance=np.inf):
+        """ Recorta os objetos ativos pelo campo de visão da câmera e pela distância.
+        Parâmetros:
+         x (float): Posição x da câmera.
+         y (float): Posição y da câmera.
+         rot (float): Rotação da câmera em radianos.
+         half_fov (float): Metade do campo de visão em radianos.
+         max_distance (float): Distância máxima dos objetos à câmera.
+        Retorna:
+         tuple: (índices, distâncias, diferenças de ângulo em relação à rotação) dos objetos visíveis."""
+        # Primeiro descarta células inteiras fora do cone ou longe demais, com margem do raio da célula
+        radius = self.cell_size * 0.7072
+        dx = self.cell_center_x - x
+        dy = self.cell_center_y - y
+        distance = np.maximum(np.hypot(dx, dy), 1e-9)
+        # Uma célula cujo círculo envolvente contém a câmera pode ter objetos em qualquer direção
+        margin = np.where(distance > radius, np.arcsin(np.minimum(1.0, radius / distance)), np.pi)
+        difference = (np.arctan2(dy, dx) - rot + np.pi) % (2 * np.pi) - np.pi
+        cells = (np.abs(difference) < half_fov + margin) & (distance - radius < max_distance)
+        candidates = self.objects_in_cells(self.occupied_cells[cells])
+        candidates = candidates[self.active[candidates]]
+        # Depois testa cada objeto restante
+        dx = self.posx[candidates] - x
+        dy = self.posy[candidates] - y
+        distance = np.hypot(dx, dy)
+        difference = (np.arctan2(dy, dx) - rot + np.pi) % (2 * np.pi) - np.pi
+        inside = (np.abs(difference) < half_fov) & (distance < max_distance)
+        return candidates[inside], distance[inside], difference[inside]
+
+    def deactivate(self, index, respawn_time=NO_RESPAWN):
+        """Desativa um objeto; se respawn_time for dado (ms), ele reaparece nesse instante."""
+        self.active[index] = False
+        self.respawn_time[index] = respawn_time
+
+    def respawn(self, now):
+        """Reativa objetos cujo tempo de reaparecimento já passou."""
+        ready = ~self.active & (self.respawn_time != self.NO_RESPAWN) & (self.respawn_time <= now)
+        if ready.any():
+            self.active[ready] = True
+            self.respawn_time[ready] = self.NO_RESPAWN
+
+class SpriteCache:
+    """Cache LRU de sprites redimensionados, indexado pela imagem de origem e pela altura em pixels.
+    Como a altura dos objetos é limitada a um intervalo inteiro pequeno, quase todo frame reutiliza
+    superfícies já escaladas em vez de chamar pg.transform.scale por objeto."""
+    MIN_HEIGHT, MAX_HEIGHT = 5, 200
+
+    def __init__(self, max_entries=512, x_scale=0.5):
+        """ Parâmetros:
+         max_entries (int): Número máximo de sprites escalados mantidos; os menos usados são descartados.
+         x_scale (float): Fator horizontal aplicado à proporção da imagem (o frame interno é mais estreito)."""
+        self.max_entries = max_entries
+        self.x_scale = x_scale
+        self.entries = OrderedDict()
+        self.aspect_ratios = {}
+        self.hits = 0
+        self.misses = 0
+
+    def aspect_ratio(self, image):
+        """Proporção largura/altura do sprite na tela, calculada uma vez por imagem."""
+        ratio = self.aspect_ratios.get(image)
+        if ratio is None:
+            ratio = (self.x_scale * image.get_width()) / image.get_height()
+            self.aspect_ratios[image] = ratio
+        return ratio
+
+    def get(self, image, height):
+        """ Retorna o sprite escalado para a altura pedida, criando-o se necessário.
+        Parâmetros:
+         image (pg.Surface): Imagem de origem.
+         height (int): Altura desejada em pixels.
+        Retorna:
+         pg.Surface: O sprite escalado."""
+        key = (image, height)
+        sprite = self.entries.get(key)
+        if sprite is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return sprite
+        self.misses += 1
+        width = int(height * self.aspect_ratio(image))
+        sprite = pg.transform.scale(image, (width, height))
+        self.entries[key] = sprite
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return sprite
+
+    def prebuild(self, image):
+        """Gera antecipadamente todas as alturas possíveis de uma imagem."""
+        for height in range(self.MIN_HEIGHT, self.MAX_HEIGHT + 1):
+            self.get(image, height)
+
+class TextCache:
+    """Cache LRU de textos com borda já compostos em uma única superfície, indexado por
+    (texto, fonte, cor, cor da borda). Textos do HUD que não mudam entre frames não são rasterizados de novo;
+    entradas que deixam de ser usadas (valores antigos) são descartadas quando o limite é atingido."""
+    BORDER_OFFSETS = [(-1, -1), (1, -1), (-1, 1), (1, 1)]
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def get(self, text, font, color, border_color):
+        """ Retorna a superfície do texto com borda de 1 pixel, renderizando-a se necessário.
+        Parâmetros:
+         text (str): Texto a desenhar.
+         font (pg.font.Font): Fonte usada.
+         color (tuple): Cor do texto.
+         border_color (tuple): Cor da borda, ou None para texto sem borda.
+        Retorna:
+         pg.Surface: Superfície com 1 pixel de margem em cada lado para a borda."""
+        key = (text, font, color, border_color)
+        surface = self.entries.get(key)
+        if surface is not None:
+            self.entries.move_to_end(key)
+            return surface
+        text_surface = font.render(text, True, color)
+        width, height = text_surface.get_size()
+        surface = pg.Surface((width + 2, height + 2), pg.SRCALPHA)
+        if border_color is not None:
+            # A borda é rasterizada uma vez e desenhada nos quatro deslocamentos diagonais
+            border_surface = font.render(text, True, border_color)
+            for dx, dy in self.BORDER_OFFSETS:
+                surface.blit(border_surface, (1 + dx, 1 + dy))
+        surface.blit(text_surface, (1, 1))
+        self.entries[key] = surface
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return surface
+
+class AssetManager:
+    """ Carrega imagens e sons em uma thread de fundo e os guarda prontos para uso, compartilhados entre as telas
+    e entre partidas. Os sons são decodificados por inteiro para PCM (pg.mixer.Sound) já na carga; as imagens são
+    convertidas para o formato da tela (e redimensionadas) na primeira vez que são pedidas."""
+    # Na ordem de carga: sprites e contagem, telas do menu e finais, depois os sons
+    MENU_IMAGES = ['assets/fundo.png', 'assets/play.png', 'assets/exit.png']
+    IMAGES = ['assets/mario_sheet.png', 'assets/kart.png', 'assets/box.png', 'assets/moeda.png', 'assets/3.png',
+              'assets/2.png', 'assets/1.png', 'assets/go.png'] + MENU_IMAGES
+    SOUNDS = ['assets/ct.mp3', 'assets/moeda.mp3', 'assets/item.mp3', 'assets/boost.mp3', 'assets/unboost.mp3',
+              'assets/coin_up.mp3', 'assets/coin_down.mp3', 'assets/victory.mp3', 'assets/lose.mp3']
+
+    def __init__(self):
+        self.executor = futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='assets')
+        # Arquivo -> Future com a Surface decodificada ou o pg.mixer.Sound
+        self.pending = {}
+        # (arquivo, tamanho) -> Surface convertida para a tela
+        self.surfaces = {}
+        self.missing = set()
+
+    @staticmethod
+    def decode(path):
+        return pg.mixer.Sound(path) if path.endswith('.mp3') else pg.image.load(path)
+
+    def preload(self, paths=None):
+        """ Agenda na thread de carga os arquivos ainda não pedidos; retorna sem esperar.
+        Parâmetros:
+         paths (iterable, opcional): Arquivos de imagem ou som; None agenda todos os assets do jogo."""
+        for path in self.IMAGES + self.SOUNDS if paths is None else paths:
+            if path not in self.pending:
+                self.pending[path] = self.executor.submit(self.decode, path)
+
+    def ready(self):
+        """Indica se todas as cargas agendadas terminaram."""
+        return all(future.done() for future in self.pending.values())
+
+    def wait(self, timeout=None):
+        """ Aguarda as cargas agendadas.
+        Parâmetros:
+         timeout (float, opcional): Limite de espera em segundos; None espera até o fim.
+        Retorna:
+         bool: Se todas terminaram."""
+        futures.wait(list(self.pending.values()), timeout)
+        return self.ready()
+
+    def result(self, path):
+        """Objeto carregado de path, aguardando a carga se preciso; None (com um aviso único) se falhou."""
+        self.preload([path])
+        try:
+            return self.pending[path].result()
+        except (pg.error, OSError) as error:
+            if path not in self.missing:
+                self.missing.add(path)
+                print(f"Aviso: não foi possível carregar {path}: {error}")
+            return None
+
+    def image(self, path, size=None):
+        """ Imagem convertida para o formato da tela, mantendo a transparência por pixel quando existe.
+        Parâmetros:
+         path (str): Arquivo da imagem.
+         size (tuple, opcional): (largura, altura) para redimensionar.
+        Retorna:
+         pg.Surface: A mesma superfície em todas as chamadas com os mesmos argumentos.
+        Lança:
+         RuntimeError: Se a imagem falta ou não pôde ser decodificada (ao contrário dos sons, o jogo não tem como
+          seguir sem ela)."""
+        surface = self.surfaces.get((path, size))
+        if surface is None:
+            surface = self.result(path)
+            if surface is None:
+                raise RuntimeError(f"Não foi possível carregar a imagem {path}") from self.pending[path].exception()
+            surface = surface.convert_alpha() if surface.get_flags() & pg.SRCALPHA else surface.convert()
+            if size:
+                surface = pg.transform.scale(surface, size)
+            self.surfaces[(path, size)] = surface
+        return surface
+
+    def sound(self, path, volume=None):
+        """ Som já decodificado.
+        Parâmetros:
+         path (str): Arquivo do som.
+         volume (float, opcional): Volume a aplicar.
+        Retorna:
+         pg.mixer.Sound ou None: None se o arquivo falta ou não há dispositivo de áudio."""
+        sound = self.result(path)
+        if sound is not None and volume is not None:
+            sound.set_volume(volume)
+        return sound
+
 class SoundManager:
     """Gerencia todos os sons do jogo, incluindo música de fundo e efeitos sonoros."""
-    def __init__(self):
-        # Carrega e reproduz a música de fundo
-        pg.mixer.music.load('assets/nirvana.mp3')
-        pg.mixer.music.play(-1) # Loop indefinidamente
-        pg.mixer.music.set_volume(0.3)
-        # Carrega efeitos sonoros
-        self.item_sound = pg.mixer.Sound('assets/item.mp3')
-        self.boost_sound = pg.mixer.Sound('assets/boost.mp3')
-        self.unboost_sound = pg.mixer.Sound('assets/unboost.mp3')
-        self.coin_up_sound = pg.mixer.Sound('assets/coin_up.mp3')
-        self.coin_down_sound = pg.mixer.Sound('assets/coin_down.mp3')
-        self.victory_sound = pg.mixer.Sound('assets/victory.mp3')
-        self.lose_sound = pg.mixer.Sound('assets/lose.mp3')
-        # Define o volume para todos os efeitos sonoros
-        for sound in [self.item_sound, self.boost_sound, self.unboost_sound,
-                      self.coin_up_sound, self.coin_down_sound, self.victory_sound, self.lose_sound]:
-            sound.set_volume(0.5)
-
-class Game:
-    """Classe principal do jogo que lida com inicialização, loop do jogo, renderização e lógica do jogo."""
-    def __init__(self):
-        pg.init()
-        self.screen = pg.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        self.clock = pg.time.Clock()
-        self.kart = Kart()
-        self.renderer = Renderer(120, 100)
-        self.load_sprites()
-        self.initialize_game_variables()
-        self.initialize_joysticks()
-        self.load_assets()
+    MUSIC = 'assets/nirvana.mp3'
+    EFFECTS = ['item', 'boost', 'unboost', 'coin_up', 'coin_down', 'victory', 'lose']
+
+    def __init__(self, assets):
+        """ Parâmetros:
+         assets (AssetManager): Origem dos efeitos sonoros, já decodificados."""
+        # Efeitos que não puderam ser carregados ficam None e são ignorados por Game.play_sound
+        for name in self.EFFECTS:
+            setattr(self, f'{name}_sound', assets.sound(f'assets/{name}.mp3', 0.5))
+        self.music_loaded = False
+
+    def load_music(self):
+        """Abre a música de fundo, tocada em streaming pelo pg.mixer.music, sem iniciá-la."""
+        try:
+            pg.mixer.music.load(self.MUSIC)
+            self.music_loaded = True
+        except (pg.error, OSError) as error:
+            print(f"Aviso: música de fundo indisponível: {error}")
+
+    def play_music(self):
+        if self.music_loaded:
+            pg.mixer.music.play(-1) # Loop indefinidamente
+            pg.mixer.music.set_volume(0.3)
+
+class SerialReader:
+    """Lê a porta serial do volante em uma thread dedicada. Os bytes recebidos são decodificados em lote
+    (protocolo binário ou texto antigo, detectado automaticamente) e cada amostra é publicada com carimbo de
+    tempo em um buffer circular pré-alocado; o loop do jogo consulta a amostra mais recente e as bordas de
+    subida dos botões ocorridas desde a última consulta, sem bloquear."""
+    FIELDS = ('ay', 'button1', 'button2', 'button3', 'button4')
+
+    def __init__(self, port, capacity=256):
+        """ Parâmetros:
+         port (serial.Serial): Porta já aberta; a thread passa a ser a única a ler dela.
+         capacity (int): Número de amostras mantidas no buffer circular."""
+        self.port = port
+        self.decoder = SensorDecoder()
+        # Colunas: tempo (time.monotonic), ay, button1..button4, tempo do dispositivo (ms), sequência
+        self.samples = np.zeros((capacity, 3 + len(self.FIELDS)))
+        self.count = 0  # Total de amostras publicadas (a próxima vai para count % capacity)
+        self.buttons = 0  # Máscara de botões da última amostra
+        self.rising_edges = np.zeros(len(self.FIELDS) - 1, dtype=int)
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name='serial-reader', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def run(self):
+        """Laço da thread: drena a porta continuamente e publica as amostras decodificadas."""
+        while self.running:
+            try:
+                data = self.port.read(self.port.in_waiting or 1)
+            except serial.SerialException:
+                break
+            if data:
+                self.publish(self.decoder.feed(data))
+
+    def publish(self, decoded):
+        """Grava um lote de amostras decodificadas no buffer circular e acumula as bordas dos botões."""
+        if len(decoded) == 0:
+            return
+        buttons = decoded['buttons'].astype(np.int64)
+        bits = (buttons[:, None] >> np.arange(4)) & 1
+        previous = np.concatenate(([self.buttons], buttons[:-1]))
+        previous_bits = (previous[:, None] >> np.arange(4)) & 1
+        capacity = len(self.samples)
+        with self.lock:
+            self.rising_edges += ((bits == 1) & (previous_bits == 0)).sum(axis=0)
+            self.buttons = buttons[-1]
+            # Em rajadas maiores que o buffer só as últimas amostras são gravadas, mas todas contam
+            total = len(decoded)
+            decoded, bits = decoded[-capacity:], bits[-capacity:]
+            rows = np.arange(self.count + total - len(decoded), self.count + total) % capacity
+            self.samples[rows, 0] = time.monotonic()
+            self.samples[rows, 1] = decoded['ay']
+            self.samples[rows, 2:6] = bits
+            self.samples[rows, 6] = decoded['timestamp']
+            self.samples[rows, 7] = decoded['seq']
+            self.count += total
+
+    def latest(self):
+        """ Retorna a amostra mais recente.
+        Retorna:
+         np.ndarray ou None: [tempo, ay, button1..button4, tempo do dispositivo, sequência], ou None se nada
+          foi recebido."""
+        with self.lock:
+            if self.count == 0:
+                return None
+            return self.samples[(self.count - 1) % len(self.samples)].copy()
+
+    def recent(self, n):
+        """Retorna as até n amostras mais recentes, da mais antiga para a mais nova."""
+        with self.lock:
+            n = min(n, self.count, len(self.samples))
+            indices = np.arange(self.count - n, self.count) % len(self.samples)
+            return self.samples[indices].copy()
+
+    def pop_rising_edges(self):
+        """ Retorna quantas vezes cada botão foi pressionado desde a última chamada e zera a contagem.
+        Retorna:
+         np.ndarray: Contagens para button1..button4."""
+        with self.lock:
+            edges = self.rising_edges.copy()
+            self.rising_edges[:] = 0
+        return edges
+
+class RaceRules(ABC):
+    """Regras da corrida, sem janela, som ou dispositivos: física em passo fixo, voltas, moedas, caixas, poderes
+    e condições de vitória e derrota. Usadas pelo Game e pela simulação sem interface (simulacao.Simulation).
+    A subclasse implementa now() e, antes de chamar initialize_race ao montar a partida, define:
+     kart (Kart): O kart do jogador.
+     track (pista.Track): A pista (ponto de largada, grade de paredes, regiões e objetos).
+     rng (random.Random): Gerador do sorteio de poderes, semeado para a partida ser reproduzível."""
+    # Perfilador de etapas (perfil.FrameProfiler); o padrão desligado não faz nada
+    profiler = NULL_PROFILER
+    # Log da sessão (telemetria.TelemetryLogger), ou None
+    telemetry = None
+
+    def initialize_race(self):
+        """Inicializa o estado da corrida: kart na largada, variáveis, objetos, simulação em passo fixo e relógio."""
+        self.kart.posx, self.kart.posy, self.kart.rot = self.track.spawn
         self.original_max_speed = self.kart.max_speed
         self.original_acceleration = self.kart.acceleration
-        # Tenta abrir a porta serial para entrada de sensores
-        try:
-            self.serial_port = serial.Serial('COM5', 115200, timeout=0)
-            self.serial_port.setDTR(False)
-            print("Porta serial COM5 aberta com sucesso.")
-        except serial.SerialException:
-            print("Erro: Não foi possível abrir a porta serial COM5")
-            self.serial_port = None
-        # Inicializa variáveis dos sensores
-        self.sensor_ay = 0
-        self.sensor_button1 = 0
-        self.sensor_button2 = 0
-        self.sensor_button3 = 0
-        self.sensor_button4 = 0
-        # Configuração dos sensores
-        self.sensor_max_angle = 90
-        self.sensor_max_value = -15600
-        self.turn_sensitivity = 0.8
-        self.max_turn_value = 5.0
-        # Estados anteriores dos botões dos sensores para detecção de borda
-        self.sensor_button3_prev = 0
-        self.sensor_button4_prev = 0
-        self.power_button_pressed = False
-        self.pause_button_pressed = False
+        self.initialize_game_variables()
+        self.initialize_game_objects()
+        # Estado da simulação em passo fixo: tempo acumulado, controles do frame e pose antes do último passo
+        self.sim_accumulator = 0.0
+        self.controls = (0, 0, 0)
+        self.previous_pose = None
         self.paused = False
         self.pause_start_time = None
         self.total_paused_time = 0
@@ -272,7 +1376,10 @@ class Game:
         self.running = True
         self.controls_enabled = False
         self.lap_count = 0
+        # Passagens válidas pela linha de chegada; ao contrário de lap_count, não muda com os poderes
+        self.finish_crossings = 0
         self.has_crossed_finish_line = False
+        self.next_checkpoint = 0
         self.current_power = None
         self.power_activation_time = None
         self.power_in_use = False
@@ -285,10 +1392,283 @@ class Game:
         self.game_result = None
         self.restart_game = False
 
+    def initialize_game_objects(self):
+        """Inicializa objetos do jogo como caixas de itens e moedas nas posições definidas pela pista."""
+        self.objects = ObjectStore(self.track.size)
+        for kind, positions in self.track.objects.items():
+            self.objects.add(ObjectStore.KINDS[kind], positions)
+
+    @abstractmethod
+    def now(self):
+        """Tempo do jogo em milissegundos: o mesmo valor em todas as chamadas de um passo."""
+
+    def play_sound(self, name):
+        """Toca o efeito sonoro de um evento da corrida ('coin', 'item', 'boost', ...). Sem som por padrão."""
+
+    def use_power(self):
+        """Ativa o poder da caixa coletada, se houver um aguardando o jogador."""
+        if self.current_power == POWER_PROMPT and not self.power_in_use:
+            self.activate_power()
+
+    def advance_simulation(self, et):
+        """ Avança a simulação em passos fixos de 1/SIM_RATE s com o tempo acumulado, guardando a pose anterior
+        ao último passo para a interpolação da renderização.
+        Parâmetros:
+         et (int): Tempo do frame em milissegundos."""
+        dt = 1000 / SIM_RATE
+        # Limita frames muito longos (por exemplo após a contagem) para não simular segundos de uma vez
+        self.sim_accumulator += min(et, MAX_FRAME_TIME)
+        while self.sim_accumulator >= dt:
+            self.previous_pose = (self.kart.posx, self.kart.posy, self.kart.rot)
+            self.simulation_step(dt)
+            self.sim_accumulator -= dt
+
+    def simulation_step(self, dt):
+        """ Executa um passo fixo: movimento, física do kart, linha de chegada, colisões e poderes.
+        A física é dividida em subpassos para que o kart nunca avance mais que MAX_SUBSTEP_DISTANCE por vez,
+        nem atravesse paredes ou a faixa da linha de chegada em velocidade de Boost.
+        Parâmetros:
+         dt (float): Duração do passo em milissegundos."""
+        self.kart.handle_movement(*self.controls, step_scale=dt * 60 / 1000)
+        substeps = max(1, int(np.ceil(abs(self.kart.vel) * dt / MAX_SUBSTEP_DISTANCE)))
+        for _ in range(substeps):
+            # Verifica se o kart está na pista e atualiza a posição
+            on_track = self.track.is_on_track(self.kart.posx, self.kart.posy)
+            self.kart.update(dt / substeps, on_track, self.track.walls, self.track.size)
+            self.profiler.mark('física')
+            self.check_finish_line()
+            self.check_collisions()
+            self.profiler.mark('colisões')
+        self.update_powers()
+        self.respawn_boxes()
+        self.profiler.mark('colisões')
+
+    def record_telemetry(self, frame_ms):
+        """ Acrescenta o estado do frame ao log de telemetria, se houver um.
+        Parâmetros:
+         frame_ms (float): Duração do frame em ms."""
+        if self.telemetry is not None:
+            posx, posy = self.kart.posx, self.kart.posy
+            if self.current_power is None:
+                power = -1
+            elif self.current_power == POWER_PROMPT:
+                power = POWER_PENDING
+            else:
+                power = self.powers.index(self.current_power)
+            self.telemetry.record(self.get_elapsed_time(), posx, posy, self.kart.rot, self.kart.vel,
+                                  self.track.is_on_track(posx, posy), self.lap_count, self.finish_crossings,
+                                  self.coin_count, power, frame_ms)
+
+    def check_finish_line(self):
+        """Verifica se o kart cruzou a linha de chegada para incrementar a contagem de voltas.
+        Se a pista tiver checkpoints, a volta só conta depois de passar por todos eles, em ordem."""
+        posx, posy = self.kart.posx, self.kart.posy
+        checkpoints = self.track.checkpoints
+        if self.next_checkpoint < len(checkpoints) and in_region(checkpoints[self.next_checkpoint], posx, posy):
+            self.next_checkpoint += 1
+        if in_region(self.track.finish_line, posx, posy):
+            if self.kart.vel > 0 and not self.has_crossed_finish_line and self.next_checkpoint == len(checkpoints):
+                self.lap_count += 1
+                self.finish_crossings += 1
+                self.has_crossed_finish_line = True
+                self.next_checkpoint = 0
+        else:
+            self.has_crossed_finish_line = False
+
+    def check_collisions(self):
+        """Verifica colisões entre o kart e moedas ou caixas de itens."""
+        self.check_coin_collisions()
+        self.check_item_box_collisions()
+
+    def check_coin_collisions(self):
+        """Detecta e trata colisões entre o kart e moedas."""
+        for index in self.objects.query_radius(self.kart.posx, self.kart.posy, 0.3, ObjectStore.COIN):
+            self.play_sound('coin')
+            self.coin_count += 1
+            # Remove a moeda coletada do jogo
+            self.objects.deactivate(index)
+
+    def check_item_box_collisions(self):
+        """Detecta e trata colisões entre o kart e caixas de itens."""
+        if self.current_power is None and not self.power_in_use:
+            hits = self.objects.query_radius(self.kart.posx, self.kart.posy, 0.3, ObjectStore.ITEM_BOX)
+            if len(hits):
+                # Reaparece após 10 segundos
+                self.objects.deactivate(hits[0], respawn_time=self.now() + 10000)
+                self.play_sound('item')
+                self.current_power = POWER_PROMPT  # Prompt para o jogador ativar o poder
+
+    def activate_power(self):
+        """Ativa um poder selecionado aleatoriamente a partir dos poderes disponíveis."""
+        self.current_power = self.rng.choice(self.powers)
+        self.power_activation_time = self.now()
+        self.power_in_use = True
+        # Aplica os efeitos do poder com base no poder selecionado
+        if self.current_power == 'Boost':
+            self.kart.max_speed = self.original_max_speed * 3
+            self.kart.acceleration = self.original_acceleration * 3
+            #self.kart.vel = self.kart.max_speed
+            self.play_sound('boost')
+        elif self.current_power == 'Un-Boost':
+            self.kart.max_speed = self.original_max_speed * 0.2
+            self.kart.acceleration = self.original_acceleration * 0.2
+            self.kart.vel = min(self.kart.vel, self.kart.max_speed)
+            self.play_sound('unboost')
+        elif self.current_power == '+ 1 Moeda :)':
+            self.coin_count += 1
+            self.play_sound('coin_up')
+        elif self.current_power == '- 1 Moeda :(':
+            self.coin_count = max(0, self.coin_count - 1)
+            self.play_sound('coin_down')
+        elif self.current_power == '- 1 Volta :)':
+            self.lap_count = max(0, self.lap_count - 1)
+            self.play_sound('coin_up')
+        elif self.current_power == '+ 1 Volta :(':
+            self.lap_count += 1
+            self.play_sound('coin_down')
+
+    def update_powers(self):
+        """Atualiza o status dos poderes ativos e reverte as mudanças após o término da duração."""
+        if self.power_in_use and self.now() - self.power_activation_time >= 5000:
+            # Reverte velocidade e aceleração se Boost ou Un-Boost estiver ativo
+            if self.current_power in ['Boost', 'Un-Boost']:
+                self.kart.max_speed = self.original_max_speed
+                self.kart.acceleration = self.original_acceleration
+                self.kart.vel = min(self.kart.vel, self.kart.max_speed)
+            # Limpa o poder atual
+            self.current_power = None
+            self.power_in_use = False
+
+    def respawn_boxes(self):
+        """Reaparece caixas de itens inativas após o tempo de reaparecimento ter decorrido."""
+        self.objects.respawn(self.now())
+
+    def get_elapsed_time(self):
+        """Calcula o tempo total decorrido do jogo excluindo as durações pausadas."""
+        current_time = self.now()
+        paused_duration = 0
+        if self.paused and self.pause_start_time is not None:
+            paused_duration = current_time - self.pause_start_time
+        elapsed_time_ms = current_time - self.start_time - self.total_paused_time - paused_duration
+        return elapsed_time_ms / 1000
+
+    def check_race_result(self):
+        """ Verifica as condições de vitória e derrota e encerra a corrida quando uma delas é atingida.
+        Retorna:
+         str ou None: 'win' ou 'lose' no passo em que a corrida terminou; None caso contrário."""
+        if self.game_over:
+            return None
+        elapsed_time = self.get_elapsed_time()
+        if self.coin_count >= COINS and elapsed_time <= TIME and self.lap_count <= LAPS:
+            self.game_result = 'win'
+        elif elapsed_time > TIME or self.lap_count >= LAPS:
+            self.game_result = 'lose'
+        else:
+            return None
+        self.game_over = True
+        self.game_over_time = self.now()
+        return self.game_result
+
+class Game(RaceRules):
+    """Classe principal do jogo que lida com inicialização, loop do jogo, renderização e lógica do jogo."""
+    def __init__(self, record_path=None, replay=None, replay_fast=False, assets=None, profile=False,
+                 profile_path=None, profile_full=False):
+        """ Parâmetros:
+         record_path (str, opcional): Arquivo onde gravar as entradas da partida.
+         replay (InputReplay, opcional): Gravação que conduz a partida no lugar dos dispositivos.
+         replay_fast (bool): Reproduz sem contagem regressiva e sem limitar a 60 FPS.
+         assets (AssetManager, opcional): Imagens e sons compartilhados com o menu e as partidas anteriores.
+         profile (bool): Mede as etapas de cada frame (overlay alternado com F3).
+         profile_path (str, opcional): Arquivo .json (trace do Chrome) ou .csv gravado em close(); liga o perfil.
+         profile_full (bool): Guarda no perfil todos os frames da sessão, e não só os últimos HISTORY_FRAMES."""
+        pg.init()
+        self.screen = pg.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.clock = pg.time.Clock()
+        # Os sons continuam carregando em segundo plano até o fim da tela de carregamento
+        self.assets = assets or AssetManager()
+        self.assets.preload()
+        self.replay = replay
+        self.replay_fast = replay_fast
+        # Tempo do frame atual em ms, lido uma vez por frame (ou vindo da gravação) e devolvido por now()
+        self.frame_ticks = 0
+        self.frame_times = []
+        self.profile_path = profile_path
+        if profile or profile_path:
+            self.profiler = FrameProfiler(FRAME_STAGES, history=None if profile_full else HISTORY_FRAMES)
+        # Semente do sorteio de poderes; gravada para que a reprodução sorteie os mesmos poderes
+        self.seed = replay.seed if replay else random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)
+        self.recorder = InputRecorder(record_path, self.seed) if record_path else None
+        self.upscaler = ScreenUpscaler(self.screen)
+        self.kart = Kart()
+        self.track = load_track(TRACK_PATH)
+        self.renderer = Renderer(120, 100, engine=RENDER_ENGINE, threads=RENDER_THREADS, track=self.track)
+        self.resolution = ResolutionController(self.renderer, RENDER_BUDGET_MS, RESOLUTION_MIN_LEVEL, RESOLUTION_MAX_LEVEL)
+        self.load_sprites()
+        self.initialize_joysticks()
+        self.load_assets()
+        self.initialize_race()
+        # Tenta abrir a porta serial para entrada de sensores; a leitura acontece em uma thread própria.
+        # A reprodução de uma gravação não usa o volante
+        self.serial_reader = None
+        self.serial_port = None
+        if not replay:
+            try:
+                self.serial_port = serial.serial_for_url(SERIAL_PORT, 115200, timeout=0.05)
+                self.serial_port.setDTR(False)
+                print(f"Porta serial {SERIAL_PORT} aberta com sucesso.")
+                self.serial_reader = SerialReader(self.serial_port)
+                self.serial_reader.start()
+            except serial.SerialException:
+                print(f"Erro: Não foi possível abrir a porta serial {SERIAL_PORT}")
+                self.serial_port = None
+        # Configuração dos sensores
+        self.sensor_max_angle = 90
+        self.sensor_max_value = -15600
+        self.turn_sensitivity = 0.8
+        self.max_turn_value = 5.0
+        self.initialize_input_state()
+        # Kernels compilados e assets carregados: a partir da segunda partida não há tela de carregamento
+        self.warmed_up = False
+
+    def initialize_input_state(self):
+        """Zera as leituras dos sensores, os botões pendentes e o estado de desenho de uma partida."""
+        self.sensor_ay = 0
+        self.sensor_button1 = 0
+        self.sensor_button2 = 0
+        self.sensor_button3 = 0
+        self.sensor_button4 = 0
+        # Bordas de subida dos botões dos sensores desde o último frame
+        self.sensor_edges = np.zeros(4, dtype=int)
+        if self.serial_reader:
+            self.serial_reader.pop_rising_edges()  # Descarta botões apertados fora da partida
+        self.power_button_pressed = False
+        self.pause_button_pressed = False
+        # Cópia da tela ao pausar e regiões redesenhadas a cada frame pausado
+        self.paused_background = None
+        self.pause_message_rect = None
+        self.hud_rects = []
+
+    def reset(self, record_path=None):
+        """ Prepara uma nova partida no mesmo Game: janela, renderizador, kernels compilados, assets, joysticks e a
+        porta serial aberta são reaproveitados; só o estado da corrida, o kart e as entradas são recriados.
+        Parâmetros:
+         record_path (str, opcional): Arquivo onde gravar as entradas da nova partida."""
+        self.seed = random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)
+        self.recorder = InputRecorder(record_path, self.seed) if record_path else None
+        self.frame_times = []
+        self.kart.reset()
+        self.current_sprite = self.mario_w
+        self.initialize_race()
+        self.initialize_input_state()
+
     def initialize_joysticks(self):
         """Inicializa joysticks conectados para entrada no jogo."""
         pg.joystick.init()
         self.joysticks = []
+        if self.replay:
+            return  # A reprodução não usa dispositivos
         for i in range(pg.joystick.get_count()):
             joystick = pg.joystick.Joystick(i)
             joystick.init()
@@ -297,7 +1677,7 @@ class Game:
     def load_sprites(self):
         """Carrega e redimensiona todas as imagens de sprites usadas no jogo."""
         # Carrega sprites do Mario a partir da folha de sprites
-        mario_sheet = pg.image.load('assets/mario_sheet.png').convert_alpha()
+        mario_sheet = self.assets.image('assets/mario_sheet.png')
         sprite_width, sprite_height, sprite_scale = 32, 32, 6.5
         positions = [(5.55, 1.1), (4.6, 1.1), (7.38, 1.1)]
         sprites = []
@@ -309,7 +1689,7 @@ class Game:
             sprites.append(sprite)
         self.mario_w, self.mario_a, self.mario_d = sprites
         # Carrega sprite do kart
-        self.kart_sprite = pg.transform.scale(pg.image.load('assets/kart.png'), (200, 200))
+        self.kart_sprite = self.assets.image('assets/kart.png', (200, 200))
         self.current_sprite = self.mario_w # Define sprite inicial
 
     def load_assets(self):
@@ -317,77 +1697,36 @@ class Game:
         pg.font.init()
         self.font = pg.font.SysFont('Arial', 24)
         self.font_2 = pg.font.SysFont('Arial', 48)
+        self.text_cache = TextCache()
         # Carrega imagens de contagem regressiva
-        self.countdown_images = [pg.image.load(f'assets/{i}.png') for i in ['3', '2', '1', 'go']]
-        self.countdown_sound = 'assets/ct.mp3'
+        self.countdown_images = [self.assets.image(f'assets/{i}.png') for i in ['3', '2', '1', 'go']]
         # Carrega sprites de caixa e moeda
-        self.box_sprite = pg.transform.scale(pg.image.load('assets/box.png').convert_alpha(), (50, 50))
-        self.coin_sound = pg.mixer.Sound('assets/moeda.mp3')
-        self.coin_sound.set_volume(0.1)
-        self.coin_sprite = pg.image.load('assets/moeda.png').convert_alpha()
-        self.initialize_game_objects()
+        self.box_sprite = self.assets.image('assets/box.png', (50, 50))
+        self.coin_sprite = self.assets.image('assets/moeda.png')
+        # Cache de sprites escalados; comporta todas as alturas das duas imagens de objetos
+        self.sprite_cache = SpriteCache(max_entries=2 * (SpriteCache.MAX_HEIGHT - SpriteCache.MIN_HEIGHT + 1))
+        if PREBUILD_SPRITES:
+            self.sprite_cache.prebuild(self.box_sprite)
+            self.sprite_cache.prebuild(self.coin_sprite)
 
     def initialize_game_objects(self):
-        """Inicializa objetos do jogo como caixas de itens e moedas com suas posições."""
-        self.item_boxes = [
-            {'posx': 26.70, 'posy': 14.90, 'active': True, 'respawn_time': None},
-            {'posx': 27.41, 'posy': 14.90, 'active': True, 'respawn_time': None},
-            {'posx': 28.12, 'posy': 14.90, 'active': True, 'respawn_time': None},
-            {'posx': 11.00, 'posy': 4.80, 'active': True, 'respawn_time': None},
-            {'posx': 11.27, 'posy': 4.06, 'active': True, 'respawn_time': None},
-            {'posx': 11.70, 'posy': 3.32, 'active': True, 'respawn_time': None}
-        ]
-        self.coins = [
-            {'posx': 26.65, 'posy': 13.05},
-            {'posx': 20.29, 'posy': 7.30},
-            {'posx': 16.50, 'posy': 7.44},
-            {'posx': 12.07, 'posy': 3.61},
-            {'posx': 3.00, 'posy': 11.2},
-            {'posx': 3.00, 'posy': 7.01},
-            {'posx': 2.52, 'posy': 17.47},
-            {'posx': 9.02, 'posy': 20.24},
-            {'posx': 13.52, 'posy': 16.98},
-            {'posx': 18.42, 'posy': 21.01},
-            {'posx': 23.46, 'posy': 25.68},
-            {'posx': 27.38, 'posy': 21.79},
-            {'posx': 7.54, 'posy': 19.00},
-            {'posx': 28.01, 'posy': 15.48},
-            {'posx': 2.52, 'posy': 22.65}
-        ]
+        """Inicializa os objetos da corrida e associa cada tipo ao seu sprite."""
+        super().initialize_game_objects()
+        self.object_sprites = {ObjectStore.ITEM_BOX: self.box_sprite, ObjectStore.COIN: self.coin_sprite}
 
     def read_sensor_data(self):
-        """Lê e analisa os dados dos sensores a partir da porta serial."""
-        if self.serial_port:
-            try:
-                line = self.serial_port.readline().decode('utf-8').rstrip()
-                if line:
-                    data_parts = line.split(',')
-                    for part in data_parts:
-                        if part.startswith('ay:'):
-                            value_str = part[3:]
-                            if value_str.strip():
-                                self.sensor_ay = int(value_str)
-                        elif part.startswith('button1:'):
-                            value_str = part[8:]
-                            if value_str.strip():
-                                self.sensor_button1 = int(value_str)
-                        elif part.startswith('button2:'):
-                            value_str = part[8:]
-                            if value_str.strip():
-                                self.sensor_button2 = int(value_str)
-                        elif part.startswith('button3:'):
-                            value_str = part[8:]
-                            if value_str.strip():
-                                self.sensor_button3 = int(value_str)
-                        elif part.startswith('button4:'):
-                            value_str = part[8:]
-                            if value_str.strip():
-                                self.sensor_button4 = int(value_str)
-            except (UnicodeDecodeError, ValueError) as e:
-                print(f"Erro ao analisar os dados seriais: {e}")
-
-    def handle_input(self):
-        """Lida com todas as entradas do jogador a partir do teclado, joystick e sensores."""
+        """Atualiza o estado dos sensores com a amostra mais recente lida pela thread da porta serial."""
+        if self.serial_reader:
+            sample = self.serial_reader.latest()
+            if sample is not None:
+                self.sensor_ay, self.sensor_button1, self.sensor_button2, self.sensor_button3, self.sensor_button4 = (
+                    int(v) for v in sample[1:6])
+            self.sensor_edges = self.serial_reader.pop_rising_edges()
+
+    def read_controls(self):
+        """Lê o teclado, o joystick e os sensores e combina os valores de controle do frame.
+        Retorna:
+         tuple: (turn_value, accelerate_value, brake_value, power_requested)."""
         keys = pg.key.get_pressed()
         # Calcula o valor de curva com base nas teclas de seta ou WASD
         turn_value = (keys[pg.K_RIGHT] or keys[pg.K_d]) - (keys[pg.K_LEFT] or keys[pg.K_a])
@@ -395,9 +1734,6 @@ class Game:
         accelerate_value = keys[pg.K_UP] or keys[pg.K_w]
         brake_value = keys[pg.K_DOWN] or keys[pg.K_s]
         # Trata a entrada do joystick se estiver conectado
-        if (keys[pg.K_r] or self.power_button_pressed) and self.current_power == "Press X / R /BOT4" and not self.power_in_use:
-            self.activate_power()
-        # Trata a entrada do joystick se estiver conectado
         if self.joysticks:
             joystick = self.joysticks[0]
             axis_horizontal = joystick.get_axis(0)
@@ -428,21 +1764,37 @@ class Game:
             accelerate_value += 1
         if self.sensor_button2 == 1:
             brake_value += 1
-        # Detecta borda de subida para o botão de poder
-        if self.sensor_button3 == 1 and self.sensor_button3_prev == 0:
+        # Borda de subida do botão de poder, mesmo que ele já tenha sido solto antes deste frame
+        if self.sensor_edges[2]:
             if not self.paused:
                 self.power_button_pressed = True
-        self.sensor_button3_prev = self.sensor_button3
-        # Detecta borda de subida para o botão de pausa
-        if self.sensor_button4 == 1 and self.sensor_button4_prev == 0:
+        # Borda de subida do botão de pausa
+        if self.sensor_edges[3]:
             self.pause_button_pressed = True
-        self.sensor_button4_prev = self.sensor_button4
+        return turn_value, accelerate_value, brake_value, bool(keys[pg.K_r] or self.power_button_pressed)
 
+    def handle_input(self, turn_value, accelerate_value, brake_value, power_requested):
+        """ Aplica os controles do frame, vindos dos dispositivos ou de uma gravação.
+        Parâmetros:
+         turn_value (float): Valor indicando a direção e magnitude da curva.
+         accelerate_value (float): Valor indicando a entrada de aceleração.
+         brake_value (float): Valor indicando a entrada de freio.
+         power_requested (bool): Se o jogador acionou o poder neste frame."""
+        if power_requested:
+            self.use_power()
         if not self.paused:
-            # Atualiza o movimento do kart com base nas entradas
-            self.kart.handle_movement(turn_value, accelerate_value, brake_value)
+            # Guarda os controles para os passos de simulação deste frame
+            self.controls = (turn_value, accelerate_value, brake_value)
             self.update_current_sprite(turn_value, brake_value)
 
+    def render_pose(self):
+        """Pose do kart (posx, posy, rot) interpolada entre os dois últimos passos de simulação."""
+        alpha = self.sim_accumulator / (1000 / SIM_RATE)
+        current = (self.kart.posx, self.kart.posy, self.kart.rot)
+        if self.previous_pose is None:
+            return current
+        return tuple(p + (c - p) * alpha for p, c in zip(self.previous_pose, current))
+
     def update_current_sprite(self, turn_value, brake_value):
         """Atualiza o sprite atual com base no movimento e ações do kart.
         Parâmetros:
@@ -461,108 +1813,135 @@ class Game:
 
     def countdown(self):
         """Exibe uma contagem regressiva antes do início do jogo."""
-        pg.mixer.music.load(self.countdown_sound)
-        pg.mixer.music.play()
+        self.start_sounds()
+        countdown_sound = self.assets.sound('assets/ct.mp3')
+        channel = countdown_sound.play() if countdown_sound else None
+        # A contagem toca em um canal de efeitos; a música abre enquanto isso e começa assim que ela termina
+        self.sound_manager.load_music()
         for image in self.countdown_images:
             self.render_game_frame()
             # Centraliza a imagem da contagem regressiva na tela
             self.screen.blit(image, image.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)))
             pg.display.update()
             pg.time.wait(1000) # Aguarda 1 segundo entre as etapas da contagem regressiva
-        while pg.mixer.music.get_busy():
-            pg.time.wait(100)
-        self.sound_manager = SoundManager()
+        while channel is not None and channel.get_busy():
+            pg.time.wait(5)
+        self.sound_manager.play_music()
+        # Descarta os segundos da contagem no relógio: o primeiro frame da corrida mede só a si mesmo
+        self.clock.tick()
+        self.sim_accumulator = 0.0
         self.controls_enabled = True
 
-    def check_finish_line(self):
-        """Verifica se o kart cruzou a linha de chegada para incrementar a contagem de voltas."""
-        finish_line_x_min = 26.25
-        finish_line_x_max = 28.7
-        finish_line_y = 17.5
-
-        if finish_line_x_min <= self.kart.posx <= finish_line_x_max and abs(self.kart.posy - finish_line_y) < 0.1:
-            if self.kart.vel > 0 and not self.has_crossed_finish_line:
-                self.lap_count += 1
-                self.has_crossed_finish_line = True
-        else:
-            self.has_crossed_finish_line = False
+    def start_sounds(self):
+        """Prepara os efeitos sonoros, já decodificados pelo gerenciador de assets."""
+        self.sound_manager = SoundManager(self.assets)
+        self.coin_sound = self.assets.sound('assets/moeda.mp3', 0.1)
 
     def render_game_frame(self):
         """Renderiza todos os elementos do frame do jogo, incluindo a cena e a interface do usuário."""
+        self.render_scene()
+        self.hud_rects = self.draw_ui()
+        self.profiler.mark('hud')
+
+    def render_scene(self):
+        """Renderiza a cena (pista, objetos e sprite do kart) na tela, sem o HUD."""
         camera_offset = -1.0
-        # Calcula a posição da câmera com base na posição e rotação do kart
-        camera_x = self.kart.posx + np.cos(self.kart.rot) * camera_offset
-        camera_y = self.kart.posy + np.sin(self.kart.rot) * camera_offset
-        # Renderiza a cena
-        frame_surface = self.renderer.render_frame(camera_x, camera_y, self.kart.rot)
-        self.draw_objects(frame_surface, camera_x, camera_y)
-        # Redimensiona o frame para o tamanho da tela e blita na exibição
-        frame_surface = pg.transform.scale(frame_surface, (SCREEN_WIDTH, SCREEN_HEIGHT))
-        self.screen.blit(frame_surface, (0, 0))
+        # Calcula a posição da câmera com base na pose interpolada do kart
+        posx, posy, rot = self.render_pose()
+        camera_x = posx + np.cos(rot) * camera_offset
+        camera_y = posy + np.sin(rot) * camera_offset
+        # Renderiza a cena medindo o tempo para o controle de resolução dinâmica
+        render_start = time.perf_counter()
+        frame_surface = self.renderer.render_frame(camera_x, camera_y, rot)
+        self.resolution.update((time.perf_counter() - render_start) * 1000)
+        self.profiler.mark('render')
+        self.draw_objects(frame_surface, camera_x, camera_y, rot)
+        self.profiler.mark('objetos')
+        # Amplia o frame direto no buffer da tela
+        self.upscaler.draw(frame_surface)
         # Desenha o sprite atual
         self.screen.blit(self.current_sprite, self.current_sprite.get_rect(center=(400, 600 - 120)))
-        self.draw_ui()
-
-    def draw_objects(self, frame_surface, camera_x, camera_y):
+        self.profiler.mark('escala')
+
+    def render_paused_frame(self):
+        """Renderiza o jogo pausado. A cena fica parada, então ela é desenhada uma vez ao pausar e, nos frames
+        seguintes, só as regiões do HUD e da mensagem de pausa são restauradas, redesenhadas e enviadas à tela."""
+        if self.paused_background is None:
+            # O fundo guardado é só a cena: HUD e mensagem são desenhados por cima a cada frame
+            self.render_scene()
+            self.paused_background = self.screen.copy()
+            self.hud_rects = self.draw_ui()
+            self.pause_message_rect = self.display_pause_message()
+            self.profiler.mark('hud')
+            pg.display.update()
+            return
+        dirty_rects = self.hud_rects + [self.pause_message_rect]
+        for rect in dirty_rects:
+            self.screen.blit(self.paused_background, rect, rect)
+        self.hud_rects = self.draw_ui()
+        self.pause_message_rect = self.display_pause_message()
+        self.profiler.mark('hud')
+        pg.display.update(dirty_rects + self.hud_rects + [self.pause_message_rect])
+        self.profiler.mark('display')
+
+    def draw_objects(self, frame_surface, camera_x, camera_y, camera_rot):
         """Desenha todos os objetos do jogo, como caixas de itens e moedas, no frame.
         Parâmetros:
          frame_surface (pg.Surface): A superfície do frame atual para desenhar.
          camera_x (float): Posição x da câmera.
-         camera_y (float): Posição y da câmera."""
-        # Desenha caixas de itens ativas
-        self.draw_sprites(frame_surface, self.item_boxes, self.box_sprite, camera_x, camera_y, is_active_key='active')
-        # Desenha moedas
-        self.draw_sprites(frame_surface, self.coins, self.coin_sprite, camera_x, camera_y)
-
-    def draw_sprites(self, frame_surface, objects, sprite_image, camera_x, camera_y, is_active_key=None):
-        """Desenha uma lista de sprites (objetos) no frame com base em suas posições relativas à câmera.
-        Parâmetros:
-         frame_surface (pg.Surface): A superfície do frame atual para desenhar.
-         objects (list): Lista de objetos com posições.
-         sprite_image (pg.Surface): A imagem do sprite a ser desenhada.
-         camera_x (float): Posição x da câmera.
          camera_y (float): Posição y da câmera.
-         is_active_key (str, opcional): Chave para verificar se o objeto está ativo."""
-        for obj in objects:
-            if is_active_key and not obj.get(is_active_key, True):
-                continue  # Pula objetos inativos
-            dx = obj['posx'] - camera_x
-            dy = obj['posy'] - camera_y
-            distance = np.hypot(dx, dy)
-            angle_to_obj = np.arctan2(dy, dx)
-            angle_difference = (angle_to_obj - self.kart.rot + np.pi) % (2 * np.pi) - np.pi
-            # Apenas desenha objetos dentro de um campo de visão de 30 graus
-            if abs(angle_difference) < np.deg2rad(30):
-                hres = self.renderer.hres
-                halfvres = self.renderer.halfvres
-                # Calcula a posição horizontal na tela
-                screen_x = (angle_difference / np.deg2rad(30)) * (hres / 2) + (hres / 2)
-                corrected_distance = max(0.1, distance)
-                K = 70
-                # Calcula o tamanho do sprite com base na distância
-                sprite_height = int(K / corrected_distance)
-                sprite_height = np.clip(sprite_height, 5, 200)
-                aspect_ratio = (0.5 * sprite_image.get_width()) / sprite_image.get_height()
-                sprite_width = int(sprite_height * aspect_ratio)
-                # Redimensiona o sprite com base na distância
-                sprite = pg.transform.scale(sprite_image, (sprite_width, sprite_height))
-                screen_ground_y = halfvres + (halfvres / corrected_distance)
-                near_distance = 2
-                max_offset = 50
-                # Aplica deslocamento vertical para objetos mais próximos
-                vertical_offset = max_offset * (1 - (corrected_distance / near_distance)) if corrected_distance < near_distance else 0
-                screen_y = screen_ground_y - sprite_height - vertical_offset
-                # Verifica se o sprite está dentro dos limites da tela antes de desenhar
-                if 0 <= screen_x - sprite_width / 2 <= hres and 0 <= screen_y <= halfvres * 2:
-                    frame_surface.blit(sprite, (screen_x - sprite_width / 2, screen_y))
+         camera_rot (float): Rotação da câmera em radianos."""
+        # Apenas objetos dentro de um campo de visão de 30 graus e da distância de desenho
+        half_fov = np.deg2rad(30)
+        indices, distance, angle_difference = self.objects.visible(camera_x, camera_y, camera_rot, half_fov,
+                                                                   OBJECT_DRAW_DISTANCE)
+        if len(indices) > MAX_DRAWN_OBJECTS:
+            # Com objetos demais, fica com os mais próximos: o custo do frame para de crescer com o número deles
+            nearest = np.argpartition(distance, MAX_DRAWN_OBJECTS)[:MAX_DRAWN_OBJECTS]
+            indices, distance, angle_difference = indices[nearest], distance[nearest], angle_difference[nearest]
+        self.objects_drawn = 0
+        if len(indices) == 0:
+            return
+        hres = self.renderer.hres
+        halfvres = self.renderer.halfvres
+        # Projeção em lote: posição horizontal, altura e base de cada sprite
+        screen_x = (angle_difference / half_fov) * (hres / 2) + (hres / 2)
+        corrected_distance = np.maximum(0.1, distance)
+        # Tamanhos calibrados para halfvres = 100; escalam com a resolução dinâmica
+        scale = halfvres / 100
+        K = 70 * scale
+        sprite_height = np.clip((K / corrected_distance).astype(int), SpriteCache.MIN_HEIGHT, SpriteCache.MAX_HEIGHT)
+        screen_ground_y = halfvres + (halfvres / corrected_distance)
+        near_distance = 2
+        max_offset = 50 * scale
+        # Aplica deslocamento vertical para objetos mais próximos
+        vertical_offset = np.where(corrected_distance < near_distance,
+                                   max_offset * (1 - (corrected_distance / near_distance)), 0)
+        screen_y = screen_ground_y - sprite_height - vertical_offset
+        # Um sprite escalado por par (tipo, altura) presente no frame, não um por objeto
+        keys, sprite_of = np.unique(self.objects.kind[indices].astype(np.int64) * (SpriteCache.MAX_HEIGHT + 1)
+                                    + sprite_height, return_inverse=True)
+        sprites = [self.sprite_cache.get(self.object_sprites[key // (SpriteCache.MAX_HEIGHT + 1)],
+                                         int(key % (SpriteCache.MAX_HEIGHT + 1))) for key in keys]
+        widths = np.array([sprite.get_width() for sprite in sprites])
+        left = screen_x - widths[sprite_of] / 2
+        # Só os sprites dentro dos limites da tela, do mais distante para o mais próximo
+        on_screen = np.flatnonzero((left >= 0) & (left <= hres) & (screen_y >= 0) & (screen_y <= halfvres * 2))
+        order = on_screen[np.argsort(-distance[on_screen])]
+        frame_surface.blits([(sprites[sprite_of[k]], (left[k], screen_y[k])) for k in order.tolist()], doreturn=False)
+        self.objects_drawn = len(order)
 
     def draw_ui(self):
-        """Desenha os elementos da interface do usuário, como posição, voltas, moedas, poder e tempo."""
-        self.draw_text(f'Pos: ({self.kart.posx:.2f}, {self.kart.posy:.2f})', 10, 10)
-        self.draw_text(f'Voltas: {self.lap_count}', 10, 40)
-        self.draw_text(f'Moedas: {self.coin_count}', SCREEN_WIDTH - 10, 10, align_right=True)
+        """Desenha os elementos da interface do usuário, como posição, voltas, moedas, poder e tempo.
+        Retorna:
+         list: Retângulos da tela ocupados pelo HUD."""
+        rects = [
+            self.draw_text(f'Pos: ({self.kart.posx:.2f}, {self.kart.posy:.2f})', 10, 10),
+            self.draw_text(f'Voltas: {self.lap_count}', 10, 40),
+            self.draw_text(f'Moedas: {self.coin_count}', SCREEN_WIDTH - 10, 10, align_right=True),
+        ]
         power_text = 'Poder: Nenhum' if self.current_power is None else f'Poder: {self.current_power}'
-        self.draw_text(power_text, 10, 70)
+        rects.append(self.draw_text(power_text, 10, 70))
 
         if self.start_time is not None:
             # Calcula o tempo decorrido excluindo as durações pausadas
@@ -571,111 +1950,21 @@ class Game:
             minutes = elapsed_seconds // 60
             seconds = elapsed_seconds % 60
             time_str = f'Tempo: {minutes:02}:{seconds:02}'
-            self.draw_text(time_str, SCREEN_WIDTH - 10, 40, align_right=True)
+            rects.append(self.draw_text(time_str, SCREEN_WIDTH - 10, 40, align_right=True))
+        if self.profiler.overlay:
+            rects.append(self.profiler.draw_overlay(self.screen))
+        return rects
 
     def draw_text(self, text, x, y, align_right=False, font=None, color=(255, 255, 255), border_color=(0, 0, 0)):
-        """Renderiza e desenha texto na tela com uma borda opcional para melhor visibilidade."""
-        font = font if font else self.font
-        text_surface = font.render(text, True, color)
-        text_rect = text_surface.get_rect(topright=(x, y)) if align_right else text_surface.get_rect(topleft=(x, y))
-
-        for dx, dy in [(-1, -1), (1, -1), (-1, 1), (1, 1)]:
-            border_surface = font.render(text, True, border_color)
-            border_rect = border_surface.get_rect(center=(text_rect.centerx + dx, text_rect.centery + dy))
-            self.screen.blit(border_surface, border_rect)
-
-        self.screen.blit(text_surface, text_rect)
-
-    def check_collisions(self):
-        """Verifica colisões entre o kart e moedas ou caixas de itens."""
-        self.check_coin_collisions()
-        self.check_item_box_collisions()
-
-    def check_coin_collisions(self):
-        """Detecta e trata colisões entre o kart e moedas."""
-        coins_to_remove = []
-        for coin in self.coins:
-            if self.is_colliding(self.kart, coin):
-                self.coin_sound.play()
-                self.coin_count += 1
-                coins_to_remove.append(coin)
-        # Remove moedas coletadas do jogo
-        for coin in coins_to_remove:
-            self.coins.remove(coin)
-
-    def check_item_box_collisions(self):
-        """Detecta e trata colisões entre o kart e caixas de itens."""
-        if self.current_power is None and not self.power_in_use:
-            for box in self.item_boxes:
-                if box['active'] and self.is_colliding(self.kart, box):
-                    box['active'] = False
-                    box['respawn_time'] = pg.time.get_ticks() + 10000  # Reaparece após 10 segundos
-                    self.sound_manager.item_sound.play()
-                    self.current_power = "Press X / R /BOT4"  # Prompt para o jogador ativar o poder
-                    break
-
-    @staticmethod
-    def is_colliding(obj1, obj2, threshold=0.3):
-        """Determina se dois objetos estão colidindo com base em suas posições.
-        Parâmetros:
-         obj1 (Kart): O primeiro objeto (kart).
-         obj2 (dict): O segundo objeto com 'posx' e 'posy'.
-         threshold (float, opcional): Distância de limiar para colisão.
+        """Renderiza e desenha texto na tela com uma borda opcional para melhor visibilidade.
         Retorna:
-         bool: True se estiverem colidindo, False caso contrário."""
-        dx = obj2['posx'] - obj1.posx
-        dy = obj2['posy'] - obj1.posy
-        distance = np.hypot(dx, dy)
-        return distance < threshold
-
-    def activate_power(self):
-        """Ativa um poder selecionado aleatoriamente a partir dos poderes disponíveis."""
-        self.current_power = random.choice(self.powers)
-        self.power_activation_time = pg.time.get_ticks()
-        self.power_in_use = True
-        # Aplica os efeitos do poder com base no poder selecionado
-        if self.current_power == 'Boost':
-            self.kart.max_speed = self.original_max_speed * 3
-            self.kart.acceleration = self.original_acceleration * 3
-            #self.kart.vel = self.kart.max_speed
-            self.sound_manager.boost_sound.play()
-        elif self.current_power == 'Un-Boost':
-            self.kart.max_speed = self.original_max_speed * 0.2
-            self.kart.acceleration = self.original_acceleration * 0.2
-            self.kart.vel = min(self.kart.vel, self.kart.max_speed)
-            self.sound_manager.unboost_sound.play()
-        elif self.current_power == '+ 1 Moeda :)':
-            self.coin_count += 1
-            self.sound_manager.coin_up_sound.play()
-        elif self.current_power == '- 1 Moeda :(':
-            self.coin_count = max(0, self.coin_count - 1)
-            self.sound_manager.coin_down_sound.play()
-        elif self.current_power == '- 1 Volta :)':
-            self.lap_count = max(0, self.lap_count - 1)
-            self.sound_manager.coin_up_sound.play()
-        elif self.current_power == '+ 1 Volta :(':
-            self.lap_count += 1
-            self.sound_manager.coin_down_sound.play()
-
-    def update_powers(self):
-        """Atualiza o status dos poderes ativos e reverte as mudanças após o término da duração."""
-        if self.power_in_use and pg.time.get_ticks() - self.power_activation_time >= 5000:
-            # Reverte velocidade e aceleração se Boost ou Un-Boost estiver ativo
-            if self.current_power in ['Boost', 'Un-Boost']:
-                self.kart.max_speed = self.original_max_speed
-                self.kart.acceleration = self.original_acceleration
-                self.kart.vel = min(self.kart.vel, self.kart.max_speed)
-            # Limpa o poder atual
-            self.current_power = None
-            self.power_in_use = False
-
-    def respawn_boxes(self):
-        """Reaparece caixas de itens inativas após o tempo de reaparecimento ter decorrido."""
-        current_time = pg.time.get_ticks()
-        for box in self.item_boxes:
-            if not box['active'] and box['respawn_time'] and current_time >= box['respawn_time']:
-                box['active'] = True
-                box['respawn_time'] = None
+         pg.Rect: Área da tela ocupada pelo texto."""
+        font = font if font else self.font
+        surface = self.text_cache.get(text, font, color, border_color)
+        # A superfície em cache tem 1 pixel de margem para a borda ao redor do texto
+        text_rect = surface.get_rect(topright=(x + 1, y - 1)) if align_right else surface.get_rect(topleft=(x - 1, y - 1))
+        self.screen.blit(surface, text_rect)
+        return text_rect
 
     def show_loading_screen(self):
         """Exibe uma tela de carregamento antes do início do jogo."""
@@ -685,10 +1974,30 @@ class Game:
         self.screen.blit(text_surface, text_rect)
         pg.display.update()
 
+    def warm_up_kernels(self):
+        """ Compila (ou carrega do cache em disco) os kernels do renderizador, dos karts e da busca de objetos.
+        Retorna:
+         float: Tempo gasto em segundos."""
+        start = time.perf_counter()
+        self.renderer.warm_up()
+        KartArray.warm_up(self.track)
+        self.objects.query_radius(*(float(v) for v in self.track.spawn[:2]), 0.3, ObjectStore.COIN)
+        return time.perf_counter() - start
+
+    def wait_for_warm_up(self):
+        """Aquece os kernels em uma thread e mantém a tela de carregamento até terminar, junto com a carga dos assets."""
+        result = {}
+        warm_up = threading.Thread(target=lambda: result.update(seconds=self.warm_up_kernels()), daemon=True)
+        warm_up.start()
+        while warm_up.is_alive() or not self.assets.ready():
+            pg.event.pump()  # Mantém a janela responsiva enquanto compila e carrega
+            self.clock.tick(30)
+        if 'seconds' in result:
+            print(f"Renderizador pronto em {result['seconds']:.2f} s")
+
     def show_victory_screen(self):
         """Exibe a tela de vitória com estatísticas do jogo."""
-        background = pg.image.load('assets/fundo.png')
-        self.screen.blit(background, (0, 0))
+        self.screen.blit(self.assets.image('assets/fundo.png'), (0, 0))
         # Calcula o tempo total em segundos
         total_time = (self.game_over_time - self.start_time) / 1000
         minutes = int(total_time // 60)
@@ -713,8 +2022,7 @@ class Game:
 
     def show_lose_screen(self):
         """Exibe a tela de derrota com estatísticas do jogo."""
-        background = pg.image.load('assets/fundo.png')
-        self.screen.blit(background, (0, 0))
+        self.screen.blit(self.assets.image('assets/fundo.png'), (0, 0))
         # Prepara mensagens de derrota
         message_line1 = "Você perdeu!"
         message_line2 = f"Coletou {self.coin_count} moedas."
@@ -727,8 +2035,8 @@ class Game:
 
     def show_end_screen_buttons(self):
         """Exibe os botões de jogar e sair na tela final."""
-        play_button = pg.transform.scale(pg.image.load('assets/play.png'), (200, 80))
-        exit_button = pg.transform.scale(pg.image.load('assets/exit.png'), (200, 80))
+        play_button = self.assets.image('assets/play.png', (200, 80))
+        exit_button = self.assets.image('assets/exit.png', (200, 80))
         # Posiciona os botões na tela
         play_button_rect = play_button.get_rect(center=(SCREEN_WIDTH // 2 - 110, SCREEN_HEIGHT // 2 + 50))
         exit_button_rect = exit_button.get_rect(center=(SCREEN_WIDTH // 2 + 110, SCREEN_HEIGHT // 2 + 50))
@@ -760,102 +2068,139 @@ class Game:
             pg.time.wait(100)
 
     def display_pause_message(self):
-        """Exibe uma mensagem piscante de pausa quando o jogo está pausado."""
+        """Exibe uma mensagem piscante de pausa quando o jogo está pausado.
+        Retorna:
+         pg.Rect: Área da tela ocupada pela mensagem (mesmo quando apagada)."""
         time_now = pg.time.get_ticks()
+        text_surface = self.text_cache.get('Jogo Pausado!', self.font_2, (255, 255, 255), None)
+        text_rect = text_surface.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
         if (time_now // 500) % 2 == 0:
-            text_surface = self.font_2.render('Jogo Pausado!', True, (255, 255, 255))
-            text_rect = text_surface.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
             self.screen.blit(text_surface, text_rect)
+        return text_rect
 
-    def get_elapsed_time(self):
-        """Calcula o tempo total decorrido do jogo excluindo as durações pausadas."""
-        current_time = pg.time.get_ticks()
-        paused_duration = 0
-        if self.paused and self.pause_start_time is not None:
-            paused_duration = current_time - self.pause_start_time
-        elapsed_time_ms = current_time - self.start_time - self.total_paused_time - paused_duration
-        return elapsed_time_ms / 1000
+    def now(self):
+        """Tempo do jogo em ms no frame atual: o relógio do pygame lido no início do frame ou, na reprodução,
+        o tempo gravado. Todas as chamadas de um frame veem o mesmo valor, o mesmo que vai para a gravação."""
+        return self.frame_ticks
+
+    def play_sound(self, name):
+        sound = self.coin_sound if name == 'coin' else getattr(self.sound_manager, f'{name}_sound')
+        if sound:
+            sound.play()
+
+    def handle_events(self):
+        """Trata os eventos de janela, teclado e joystick do frame."""
+        for event in pg.event.get():
+            if event.type == pg.QUIT or (event.type == pg.KEYDOWN and event.key == pg.K_ESCAPE):
+                self.running = False
+            elif event.type == pg.KEYDOWN and event.key == pg.K_F3 and self.profiler.enabled:
+                self.profiler.toggle_overlay()
+            elif self.replay:
+                continue  # Na reprodução os botões vêm da gravação
+            elif event.type == pg.KEYDOWN:
+                if event.key == pg.K_r:
+                    if not self.paused:
+                        self.power_button_pressed = True
+                elif event.key == pg.K_BACKSPACE:
+                    self.pause_button_pressed = True
+            elif event.type == pg.JOYBUTTONDOWN:
+                if event.button == 2:  # Botão "X" no controle de Xbox
+                    if not self.paused:
+                        self.power_button_pressed = True
+                elif event.button == 3:
+                    self.pause_button_pressed = True
+
+    def next_replay_frame(self):
+        """ Avança a reprodução um frame, aplicando o tempo e os botões gravados.
+        Retorna:
+         tuple ou None: (et, controles) do frame, ou None ao fim da gravação."""
+        frame = self.replay.next_frame()
+        if frame is None:
+            return None
+        self.frame_ticks = int(frame['ticks'])
+        self.pause_button_pressed = bool(frame['flags'] & PAUSE)
+        controls = (float(frame['turn']), float(frame['accelerate']), float(frame['brake']), bool(frame['flags'] & POWER))
+        return int(frame['et']), controls
 
     def run(self):
         """Loop principal do jogo que lida com eventos, atualizações e renderização."""
-        self.show_loading_screen()
-        pg.time.wait(2000)  # Aguarda 2 segundos na tela de carregamento
-        self.countdown()
-        # Inicializa variáveis de tempo
-        self.start_time = pg.time.get_ticks()
+        if not self.warmed_up:
+            self.show_loading_screen()
+            self.wait_for_warm_up()
+            self.warmed_up = True
+        if self.replay and self.replay_fast:
+            self.start_sounds()
+            self.sound_manager.load_music()
+            self.sound_manager.play_music()
+            self.controls_enabled = True
+        else:
+            self.countdown()
+        if TELEMETRY_DIR and not self.replay:
+            self.telemetry = TelemetryLogger(session_path(TELEMETRY_DIR, self.seed), self.seed, self.track.name)
+        # Inicializa variáveis de tempo (na reprodução os tempos gravados já são relativos ao início)
+        if not self.replay:
+            self.frame_ticks = pg.time.get_ticks()
+        self.start_time = self.now() if not self.replay else 0
         self.pause_start_time = None
         self.total_paused_time = 0
 
         while self.running:
-            et = self.clock.tick(60)  # Limita a taxa de quadros a 60 FPS
-            for event in pg.event.get():
-                if event.type == pg.QUIT or (event.type == pg.KEYDOWN and event.key == pg.K_ESCAPE):
-                    self.running = False
-                elif event.type == pg.KEYDOWN:
-                    if event.key == pg.K_r:
-                        if not self.paused:
-                            self.power_button_pressed = True
-                    elif event.key == pg.K_BACKSPACE:
-                        self.pause_button_pressed = True
-                elif event.type == pg.JOYBUTTONDOWN:
-                    if event.button == 2:  # Botão "X" no controle de Xbox
-                        if not self.paused:
-                            self.power_button_pressed = True
-                    elif event.button == 3:
-                        self.pause_button_pressed = True
-
-            self.handle_input()
+            frame_start = time.perf_counter()
+            self.profiler.begin_frame()
+            if self.replay:
+                replay_frame = self.next_replay_frame()
+                if replay_frame is None:
+                    break
+                et, controls = replay_frame
+                if not self.replay_fast:
+                    self.clock.tick(60)
+            else:
+                et = self.clock.tick(60)  # Limita a taxa de quadros a 60 FPS
+                self.frame_ticks = pg.time.get_ticks()
+            self.profiler.mark('espera')
+            self.handle_events()
+            self.profiler.mark('eventos')
+            if not self.replay:
+                controls = self.read_controls()
+                if self.recorder:
+                    self.recorder.record(et, self.now() - self.start_time, *controls, self.pause_button_pressed)
+
+            self.handle_input(*controls)
+            self.profiler.mark('entrada')
             # Trata o pressionamento do botão de pausa
             if self.pause_button_pressed:
                 if not self.paused:
                     self.paused = True
-                    self.pause_start_time = pg.time.get_ticks()
+                    self.pause_start_time = self.now()
                 else:
                     self.paused = False
+                    self.paused_background = None
                     if self.pause_start_time is not None:
-                        paused_duration = pg.time.get_ticks() - self.pause_start_time
+                        paused_duration = self.now() - self.pause_start_time
                         self.total_paused_time += paused_duration
                         self.pause_start_time = None
                 self.pause_button_pressed = False
 
             if self.paused:
                 # Renderiza o frame e exibe a mensagem de pausa
-                self.render_game_frame()
-                self.display_pause_message()
-                pg.display.update()
+                self.render_paused_frame()
             else:
                 if self.controls_enabled:
-                    # Ativa poder se o botão for pressionado e as condições forem atendidas
-                    if self.power_button_pressed and self.current_power == "Press X / R" and not self.power_in_use:
-                        self.activate_power()
-                    # Verifica se o kart está na pista e atualiza a posição
-                    on_track = self.renderer.is_on_track(self.kart.posx, self.kart.posy)
-                    self.kart.update(et, on_track, self.renderer.maph, self.renderer.size)
-                    self.check_finish_line()
-                    self.check_collisions()
-                    self.update_powers()
-                    self.respawn_boxes()
-                # Calcula o tempo decorrido
-                elapsed_time = self.get_elapsed_time()
-
-                if not self.game_over:
-                    # Determina se o jogo foi ganho ou perdido com base nas condições
-                    if self.coin_count >= COINS and elapsed_time <= TIME and self.lap_count <= LAPS:
-                        self.game_over = True
-                        self.game_over_time = pg.time.get_ticks()
-                        self.game_result = 'win'
-                        pg.mixer.music.stop()
-                        self.sound_manager.victory_sound.play()
-                    elif elapsed_time > TIME or self.lap_count >= LAPS:
-                        self.game_over = True
-                        self.game_over_time = pg.time.get_ticks()
-                        self.game_result = 'lose'
-                        pg.mixer.music.stop()
-                        self.sound_manager.lose_sound.play()
+                    self.advance_simulation(et)
+                # Determina se o jogo foi ganho ou perdido com base nas condições
+                result = self.check_race_result()
+                if self.controls_enabled and (result or not self.game_over):
+                    self.record_telemetry(et)
+                if result:
+                    pg.mixer.music.stop()
+                    self.play_sound('victory' if result == 'win' else 'lose')
 
                 if self.game_over:
                     # Aguarda 3 segundos antes de mostrar a tela final
-                    if pg.time.get_ticks() - self.game_over_time >= 3000:
+                    if self.now() - self.game_over_time >= 3000:
+                        if self.replay:
+                            self.running = False
+                            break
                         if self.game_result == 'win':
                             self.show_victory_screen()
                         else:
@@ -866,25 +2211,50 @@ class Game:
                 # Renderiza o frame atual do jogo e atualiza a exibição
                 self.render_game_frame()
                 pg.display.update()
+                self.profiler.mark('display')
 
             self.power_button_pressed = False  # Reseta o estado do botão de poder
-        # Fecha a porta serial se estiver aberta
+            self.frame_times.append(time.perf_counter() - frame_start)
+            self.profiler.end_frame()
+        if self.recorder:
+            self.recorder.save()
+        if self.telemetry:
+            self.telemetry.close()
+            self.telemetry = None
+
+    def close(self):
+        """Encerra a thread de leitura, fecha a porta serial e grava o perfil, ao sair do jogo (e não entre partidas)."""
+        if self.profile_path:
+            self.profiler.save(self.profile_path)
+            print(f"Perfil de {len(self.profiler)} frames gravado em {self.profile_path}")
+        if self.serial_reader:
+            self.serial_reader.stop()
         if self.serial_port:
             self.serial_port.close()
 
-def menu():
-    """Exibe o menu principal e lida com as interações do menu."""
+def menu(record_path=None, profile=False, profile_path=None, profile_full=False):
+    """ Exibe o menu principal e lida com as interações do menu.
+    Parâmetros:
+     record_path (str, opcional): Arquivo .npz para gravar as entradas; partidas seguintes recebem sufixo _2, _3...
+     profile (bool): Mede as etapas dos frames (overlay com F3).
+     profile_path (str, opcional): Arquivo do perfil de todas as partidas, gravado ao sair.
+     profile_full (bool): O perfil guarda todos os frames, e não só os mais recentes."""
     pg.init()
     screen = pg.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
     pg.display.set_caption("Menu")
-    # Carrega fundo e botões do menu
-    background = pg.image.load('assets/fundo.png')
-    play_button = pg.transform.scale(pg.image.load('assets/play.png'), (200, 80))
-    exit_button = pg.transform.scale(pg.image.load('assets/exit.png'), (200, 80))
+    # Carrega fundo e botões do menu; o resto dos assets do jogo segue carregando em segundo plano
+    assets = AssetManager()
+    assets.preload(AssetManager.MENU_IMAGES)
+    assets.preload()
+    background = assets.image('assets/fundo.png')
+    play_button = assets.image('assets/play.png', (200, 80))
+    exit_button = assets.image('assets/exit.png', (200, 80))
     # Posiciona os botões na tela
     play_button_rect = play_button.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50))
     exit_button_rect = exit_button.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 50))
 
+    games_played = 0
+    game = None
     running = True
     while running:
         screen.blit(background, (0, 0))
@@ -898,7 +2268,13 @@ def menu():
                 mouse_pos = pg.mouse.get_pos()
                 if play_button_rect.collidepoint(mouse_pos):
                     # Inicia o jogo quando o botão de jogar é clicado
-                    game = Game()
+                    games_played += 1
+                    # A primeira partida cria o jogo; as seguintes reiniciam o mesmo, sem recarregar nada
+                    if game is None:
+                        game = Game(record_path=numbered_path(record_path, games_played), assets=assets,
+                                    profile=profile, profile_path=profile_path, profile_full=profile_full)
+                    else:
+                        game.reset(numbered_path(record_path, games_played))
                     game.run()
                     if game.restart_game:
                         continue  # Reinicia o menu se necessário
@@ -908,7 +2284,53 @@ def menu():
                     running = False
 
         pg.display.update()
+    if game:
+        game.close()
+
+def numbered_path(path, number):
+    """Acrescenta _<number> ao nome do arquivo a partir da segunda partida."""
+    if path is None or number == 1:
+        return path
+    root, ext = os.path.splitext(path)
+    return f'{root}_{number}{ext}'
+
+def replay_session(path, fast=False, profile=False, profile_path=None, profile_full=False):
+    """ Reproduz uma partida gravada e imprime o resultado e os tempos de frame, para comparar builds.
+    Parâmetros:
+     path (str): Arquivo .npz gravado com --record.
+     fast (bool): Reproduz sem contagem regressiva e sem limitar a 60 FPS.
+     profile (bool): Imprime também os percentis de cada etapa do frame.
+     profile_path (str, opcional): Arquivo .json (trace do Chrome) ou .csv com o perfil da reprodução.
+     profile_full (bool): O perfil guarda todos os frames, e não só os mais recentes."""
+    replay = InputReplay(path)
+    game = Game(replay=replay, replay_fast=fast, profile=profile, profile_path=profile_path,
+                profile_full=profile_full)
+    game.run()
+    game.close()
+    frame_ms = np.array(game.frame_times) * 1000
+    print(f"Frames reproduzidos: {replay.index}/{len(replay)}")
+    print(f"Resultado: {game.game_result}, voltas: {game.lap_count}, moedas: {game.coin_count}, "
+          f"posição final: ({game.kart.posx:.4f}, {game.kart.posy:.4f}, {game.kart.rot:.4f})")
+    if len(frame_ms):
+        print(f"Tempo de frame: média {frame_ms.mean():.3f} ms, p50 {np.percentile(frame_ms, 50):.3f} ms, "
+              f"p99 {np.percentile(frame_ms, 99):.3f} ms")
+    if game.profiler.enabled:
+        print('\n'.join(game.profiler.report(last=len(game.profiler))))
+    return game
 
 if __name__ == '__main__':
-    menu()
+    parser = argparse.ArgumentParser(description='Kart com volante.')
+    parser.add_argument('--record', metavar='ARQUIVO', help='grava as entradas da partida em um .npz')
+    parser.add_argument('--replay', metavar='ARQUIVO', help='reproduz uma partida gravada, sem dispositivos')
+    parser.add_argument('--fast', action='store_true', help='na reprodução, pula a contagem e não limita o FPS')
+    parser.add_argument('--profile', action='store_true', help='mede as etapas de cada frame (overlay com F3)')
+    parser.add_argument('--profile-out', metavar='ARQUIVO',
+                        help='grava o perfil ao sair: trace do Chrome (.json) ou CSV (.csv); implica --profile')
+    parser.add_argument('--profile-full', action='store_true',
+                        help='o perfil guarda a sessão inteira, e não só os frames mais recentes')
+    args = parser.parse_args()
+    if args.replay:
+        replay_session(args.replay, args.fast, args.profile, args.profile_out, args.profile_full)
+    else:
+        menu(args.record, args.profile, args.profile_out, args.profile_full)
     pg.quit()
\ No newline at end of file
@@ -0,0 +1,222 @@
+"""Perfil por etapa dos frames do jogo.
+
+O laço do jogo chama mark(etapa) ao fim de cada etapa (espera do clock, eventos, entrada, física, colisões,
+renderização, objetos, ampliação, HUD e envio à tela): o tempo desde a marca anterior é somado à etapa no frame
+atual. Cada frame guarda também a variação de blocos de memória alocados pelo Python (sys.getallocatedblocks) e
+o número de coletas do gc. As últimas window linhas dão os percentis mostrados no overlay, e save exporta o
+histórico como trace do Chrome (.json, aberto em chrome://tracing ou ui.perfetto.dev) ou CSV com uma linha por
+frame. O histórico guarda os últimos history frames (HISTORY_FRAMES por padrão, cerca de um minuto a 60 FPS);
+com history=None (--profile-full) guarda a sessão inteira.
+
+Desligado, o jogo usa NULL_PROFILER, cujos métodos não fazem nada.
+
+Uso:
+ python main.py --profile                  overlay alternado com F3
+ python main.py --profile-out perfil.json  grava o trace ao sair (ou perfil.csv)
+ python main.py --profile-out perfil.csv --profile-full   exporta todos os frames, não só os recentes
+"""
+import csv
+import gc
+from bisect import bisect_left
+import json
+import sys
+import time
+from array import array
+import numpy as np
+import pygame as pg
+
+class NullProfiler:
+    """Perfilador desligado: a mesma interface do FrameProfiler, sem trabalho algum."""
+    enabled = False
+    overlay = False
+
+    def begin_frame(self):
+        pass
+
+    def mark(self, stage):
+        pass
+
+    def end_frame(self):
+        pass
+
+NULL_PROFILER = NullProfiler()
+HISTORY_FRAMES = 3600
+
+class FrameProfiler:
+    """Mede o tempo de cada etapa por frame, com percentis dos últimos frames e exportação do histórico."""
+    enabled = True
+
+    def __init__(self, stages, window=600, refresh=30, history=HISTORY_FRAMES):
+        """ Parâmetros:
+         stages (list): Nomes das etapas, na ordem em que o laço as executa.
+         window (int): Número de frames recentes usados nos percentis.
+         refresh (int): Frames entre atualizações do texto do overlay.
+         history (int ou None): Frames mais recentes guardados para exportação; None guarda todos."""
+        self.stages = list(stages)
+        self.stage_index = {stage: i for i, stage in enumerate(self.stages)}
+        self.window = window
+        self.refresh = refresh
+        self.history = history
+        # Frames já descartados do início do histórico; os índices exportados contam desde o primeiro frame
+        self.dropped = 0
+        self.overlay = False
+        self.overlay_surface = None
+        self.font = None
+        # Histórico em arrays compactos: ms por etapa (len(stages) por frame) e dados do frame
+        self.stage_ms = array('d')
+        self.frame_start = array('d')
+        self.frame_ms = array('d')
+        self.allocated_blocks = array('q')
+        self.collections = array('l')
+        # Cada marca (etapa, início, fim) em segundos, para o trace
+        self.mark_stage = array('b')
+        self.mark_start = array('d')
+        self.mark_end = array('d')
+        self.origin = self.last = time.perf_counter()
+        self.current = [0.0] * len(self.stages)
+        # Coletas contadas pelo próprio gc, sem custo nos frames em que ele não roda
+        self.gc_collections = 0
+        self.blocks = None  # Lido no primeiro begin_frame, para não contar o carregamento no primeiro frame
+        gc.callbacks.append(self.count_collection)
+
+    def count_collection(self, phase, info):
+        if phase == 'start':
+            self.gc_collections += 1
+
+    def __len__(self):
+        """Número de frames no histórico."""
+        return len(self.frame_ms)
+
+    def begin_frame(self):
+        if self.blocks is None:
+            self.blocks = sys.getallocatedblocks()
+        self.current = [0.0] * len(self.stages)
+        self.collections_start = self.gc_collections
+        self.start = self.last = time.perf_counter()
+
+    def mark(self, stage):
+        """Soma à etapa stage o tempo desde a marca anterior (ou do início do frame)."""
+        now = time.perf_counter()
+        index = self.stage_index[stage]
+        self.current[index] += now - self.last
+        self.mark_stage.append(index)
+        self.mark_start.append(self.last - self.origin)
+        self.mark_end.append(now - self.origin)
+        self.last = now
+
+    def end_frame(self):
+        end = time.perf_counter()
+        self.stage_ms.extend([seconds * 1000 for seconds in self.current])
+        self.frame_start.append(self.start - self.origin)
+        self.frame_ms.append((end - self.start) * 1000)
+        # Uma leitura por frame (percorre as arenas do alocador, ~10 us): a variação conta desde o frame anterior
+        blocks = sys.getallocatedblocks()
+        self.allocated_blocks.append(blocks - self.blocks)
+        self.blocks = blocks
+        self.collections.append(self.gc_collections - self.collections_start)
+        if self.overlay and len(self) % self.refresh == 0:
+            self.overlay_surface = None
+        if self.history is not None and len(self) >= 2 * self.history:
+            self.trim()
+
+    def trim(self):
+        """Descarta os frames mais antigos, mantendo os últimos history. Chamado quando o histórico chega ao dobro
+        disso, então o custo de mover os arrays é dividido entre history frames."""
+        drop = len(self) - self.history
+        # As marcas estão em ordem de início: as do primeiro frame mantido em diante ficam
+        marks = bisect_left(self.mark_start, self.frame_start[drop])
+        del self.stage_ms[:drop * len(self.stages)]
+        for values in (self.frame_start, self.frame_ms, self.allocated_blocks, self.collections):
+            del values[:drop]
+        for values in (self.mark_stage, self.mark_start, self.mark_end):
+            del values[:marks]
+        self.dropped += drop
+
+    def stage_table(self):
+        """Tempos por etapa de todos os frames, sem cópia: shape (frames, etapas), em ms."""
+        return np.frombuffer(self.stage_ms, dtype=np.float64).reshape(-1, len(self.stages))
+
+    def percentiles(self, q=(50, 95, 99), last=None):
+        """ Percentis do tempo de cada etapa e do frame inteiro nos últimos frames.
+        Parâmetros:
+         q (tuple): Percentis pedidos.
+         last (int, opcional): Número de frames considerados; None usa window.
+        Retorna:
+         dict: Nome da etapa (e 'frame') -> np.ndarray com um valor por percentil, em ms."""
+        last = last or self.window
+        if len(self) == 0:
+            return {}
+        stages = self.stage_table()[-last:]
+        values = np.percentile(stages, q, axis=0)
+        result = {stage: values[:, i] for i, stage in enumerate(self.stages)}
+        result['frame'] = np.percentile(np.frombuffer(self.frame_ms, dtype=np.float64)[-last:], q)
+        return result
+
+    def report(self, last=None):
+        """ Tabela de percentis e da média de alocações por frame.
+        Retorna:
+         list: Linhas de texto."""
+        lines = [f"{'etapa':<10} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7}"]
+        for stage, (p50, p95, p99) in self.percentiles(last=last).items():
+            lines.append(f"{stage:<10} {p50:>7.2f} {p95:>7.2f} {p99:>7.2f}")
+        if len(self):
+            blocks = np.frombuffer(self.allocated_blocks, dtype=np.int64)[-(last or self.window):]
+            lines.append(f"blocos/frame {blocks.mean():+.0f}, coletas do gc {sum(self.collections)}")
+        return lines
+
+    def toggle_overlay(self):
+        self.overlay = not self.overlay
+        self.overlay_surface = None
+
+    def draw_overlay(self, screen, position=(10, 110)):
+        """ Desenha a tabela de percentis sobre a tela; o texto é refeito a cada refresh frames.
+        Retorna:
+         pg.Rect ou None: Área ocupada, ou None com o overlay escondido."""
+        if not self.overlay:
+            return None
+        if self.overlay_surface is None:
+            if self.font is None:
+                # Fonte monoespaçada para alinhar as colunas da tabela
+                self.font = pg.font.SysFont('consolas,couriernew,dejavusansmono,monospace', 16)
+            lines = [self.font.render(line, True, (255, 255, 0)) for line in self.report()]
+            width = max(line.get_width() for line in lines) + 8
+            height = sum(line.get_height() for line in lines) + 8
+            self.overlay_surface = pg.Surface((width, height))
+            self.overlay_surface.set_alpha(200)
+            y = 4
+            for line in lines:
+                self.overlay_surface.blit(line, (4, y))
+                y += line.get_height()
+        return screen.blit(self.overlay_surface, position)
+
+    def save(self, path):
+        """Grava o histórico como CSV (extensão .csv) ou como trace do Chrome (qualquer outra)."""
+        if path.endswith('.csv'):
+            self.save_csv(path)
+        else:
+            self.save_trace(path)
+
+    def save_csv(self, path):
+        stages = self.stage_table()
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['frame', 'inicio_ms', 'frame_ms'] + [f'{stage}_ms' for stage in self.stages]
+                            + ['blocos', 'coletas_gc'])
+            for i in range(len(self)):
+                writer.writerow([self.dropped + i, f'{self.frame_start[i] * 1000:.3f}', f'{self.frame_ms[i]:.4f}']
+                                + [f'{value:.4f}' for value in stages[i]]
+                                + [self.allocated_blocks[i], self.collections[i]])
+
+    def save_trace(self, path):
+        events = []
+        for i in range(len(self)):
+            start = self.frame_start[i] * 1e6
+            events.append({'name': 'frame', 'ph': 'X', 'pid': 0, 'tid': 0, 'ts': start,
+                           'dur': self.frame_ms[i] * 1000, 'args': {'frame': self.dropped + i}})
+            events.append({'name': 'memória', 'ph': 'C', 'pid': 0, 'tid': 0, 'ts': start,
+                           'args': {'blocos': self.allocated_blocks[i], 'coletas do gc': self.collections[i]}})
+        for stage, start, end in zip(self.mark_stage, self.mark_start, self.mark_end):
+            events.append({'name': self.stages[stage], 'ph': 'X', 'pid': 0, 'tid': 0,
+                           'ts': start * 1e6, 'dur': (end - start) * 1e6})
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
@@ -0,0 +1,155 @@
+"""Pacotes de pista: descrição, máscaras pré-calculadas e carregamento por memory-map.
+
+Um pacote é um diretório com:
+ track.json   Descrição escrita à mão: tamanho do mapa, texturas, imagem e resolução da máscara de pista,
+              paredes, largada (x, y, rot), linha de chegada e checkpoints ([x_min, x_max, y_min, y_max]) e
+              posições dos objetos por tipo ('coin', 'item_box').
+ on_track.npy Máscara de pista em coordenadas do mundo, resolution células por unidade, empacotada com
+              np.packbits ao longo de y (1 bit por célula).
+ walls.npy    Grade de paredes do mapa, size x size, 1 onde há parede.
+ build.json   Versão do formato e hash das fontes usadas na construção.
+
+Os três últimos são gerados por build_track a partir das imagens, uma vez; load_track reconstrói sozinho
+quando a descrição ou as imagens mudam. Para uma pista nova basta um diretório com outro track.json.
+
+Uso:
+ python pista.py build pistas/mario
+ python pista.py info pistas/mario
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+import numpy as np
+import pygame as pg
+from numba import njit
+
+TRACK_FORMAT_VERSION = 1
+DEFAULT_TRACK = 'pistas/mario'
+# Unidades do mundo cobertas por uma repetição da textura do chão (o mesmo período usado pelos kernels)
+FLOOR_PERIOD = 30
+
+@njit(cache=True)
+def on_track_lookup(mask, resolution, posx, posy):
+    """Lê o bit da máscara empacotada na célula de (posx, posy); fora do mapa conta como fora da pista."""
+    # floor e não int: int arredonda para zero e levaria posições pouco abaixo de 0 para a célula 0
+    ix = int(np.floor(posx * resolution))
+    iy = int(np.floor(posy * resolution))
+    if ix < 0 or iy < 0 or ix >= mask.shape[0] or iy >= mask.shape[1] * 8:
+        return False
+    return (mask[ix, iy >> 3] >> (7 - (iy & 7))) & 1 == 1
+
+def read_manifest(path):
+    with open(os.path.join(path, 'track.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+def source_hash(manifest_path, manifest):
+    """Hash da descrição e das imagens das quais as máscaras são derivadas."""
+    digest = hashlib.sha1()
+    sources = [manifest_path, manifest['on_track']['image'], manifest['walls'].get('image')]
+    for source in filter(None, sources):
+        with open(source, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def sample_image(path, size, cells):
+    """ Amostra o canal vermelho de uma imagem nos centros de uma grade cells x cells sobre o mundo,
+    com o mesmo mapeamento do chão (x / FLOOR_PERIOD % 1 na largura, y na altura).
+    Retorna:
+     np.ndarray: Valores do canal vermelho, shape (cells, cells), indexados por [x, y]."""
+    red = pg.surfarray.array3d(pg.image.load(path))[:, :, 0]
+    width, height = red.shape
+    centers = (np.arange(cells) + 0.5) * size / cells
+    xx = (centers / FLOOR_PERIOD % 1 * (width - 1)).astype(int)
+    yy = (centers / FLOOR_PERIOD % 1 * (height - 1)).astype(int)
+    return red[np.ix_(xx, yy)]
+
+def build_track(path):
+    """ Deriva a máscara de pista e a grade de paredes das imagens da descrição e grava o pacote.
+    Parâmetros:
+     path (str): Diretório do pacote (com track.json).
+    Retorna:
+     float: Tempo gasto em segundos."""
+    start = time.perf_counter()
+    manifest = read_manifest(path)
+    size = manifest['size']
+    spec = manifest['on_track']
+    on_track = sample_image(spec['image'], size, size * spec['resolution']) > spec['threshold']
+    walls = np.zeros((size, size), dtype=np.uint8)
+    wall_spec = manifest['walls']
+    if wall_spec.get('image'):
+        # Pixels claros da imagem de paredes, amostrados no centro de cada célula, viram parede
+        walls[sample_image(wall_spec['image'], size, size) > 127] = 1
+    if wall_spec.get('border', True):
+        walls[0, :] = walls[:, 0] = walls[size - 1, :] = walls[:, size - 1] = 1
+    for x, y in wall_spec.get('cells', []):
+        walls[x, y] = 1
+    np.save(os.path.join(path, 'on_track.npy'), np.packbits(on_track, axis=1))
+    np.save(os.path.join(path, 'walls.npy'), walls)
+    with open(os.path.join(path, 'build.json'), 'w', encoding='utf-8') as f:
+        json.dump({'version': TRACK_FORMAT_VERSION,
+                   'source_hash': source_hash(os.path.join(path, 'track.json'), manifest)}, f, indent=4)
+    return time.perf_counter() - start
+
+def is_built(path, manifest):
+    try:
+        with open(os.path.join(path, 'build.json'), encoding='utf-8') as f:
+            build = json.load(f)
+    except FileNotFoundError:
+        return False
+    return (build.get('version') == TRACK_FORMAT_VERSION
+            and build.get('source_hash') == source_hash(os.path.join(path, 'track.json'), manifest))
+
+class Track:
+    """Pista carregada: descrição e máscaras mapeadas em memória (somente leitura)."""
+    def __init__(self, path, manifest):
+        self.path = path
+        self.name = manifest['name']
+        self.size = manifest['size']
+        self.textures = manifest['textures']
+        self.resolution = manifest['on_track']['resolution']
+        self.on_track = np.load(os.path.join(path, 'on_track.npy'), mmap_mode='r')
+        self.walls = np.load(os.path.join(path, 'walls.npy'), mmap_mode='r')
+        self.spawn = tuple(manifest['spawn'])
+        self.finish_line = tuple(manifest['finish_line'])
+        self.checkpoints = [tuple(region) for region in manifest['checkpoints']]
+        self.objects = {kind: [tuple(position) for position in positions]
+                        for kind, positions in manifest['objects'].items()}
+
+    def is_on_track(self, posx, posy):
+        return on_track_lookup(self.on_track, self.resolution, posx, posy)
+
+def load_track(path=DEFAULT_TRACK):
+    """ Carrega um pacote de pista, construindo-o antes se estiver ausente ou desatualizado.
+    Parâmetros:
+     path (str): Diretório do pacote.
+    Retorna:
+     Track: A pista carregada."""
+    manifest = read_manifest(path)
+    if not is_built(path, manifest):
+        print(f"Construindo a pista {path} em {build_track(path):.2f} s")
+    return Track(path, manifest)
+
+def in_region(region, posx, posy):
+    """Indica se (posx, posy) está na região [x_min, x_max, y_min, y_max] (linha de chegada ou checkpoint)."""
+    x_min, x_max, y_min, y_max = region
+    return x_min <= posx <= x_max and y_min < posy < y_max
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['build', 'info'])
+    parser.add_argument('path', nargs='?', default=DEFAULT_TRACK)
+    args = parser.parse_args()
+    if args.command == 'build':
+        print(f"Pista construída em {build_track(args.path):.2f} s")
+    track = load_track(args.path)
+    cells = track.on_track.shape[0]
+    on_track = np.unpackbits(track.on_track, axis=1, count=cells)
+    print(f"{track.name}: mapa {track.size}x{track.size}, máscara {cells}x{cells} "
+          f"({track.on_track.nbytes / 1024:.0f} KiB, {on_track.mean():.1%} de pista), "
+          f"{int(track.walls.sum())} células de parede, "
+          + ', '.join(f"{len(positions)} {kind}" for kind, positions in track.objects.items()))
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
 #include <Wire.h>
 #include <MPU6050.h>
 MPU6050 mpu;
+// Protocolo de saída: 1 = pacotes binários de 11 bytes (ver protocolo.py), 0 = texto "ay:<n>,button1:<b>,..."
+#define BINARY_PROTOCOL 1
 // Definição dos pinos dos botões
 const int buttonPin1 = 4;  // Pino Botão 1
 const int buttonPin2 = 5;  // Pino Botão 2
@@ -12,6 +14,7 @@ int readings[numReadings];  // Armazena as leituras
 int readIndex = 0;          // Índice da leitura atual
 long total = 0;             // Soma das leituras
 int average = 0;            // Média das leituras
+uint8_t sequence = 0;       // Número de sequência do pacote binário
 void setup() {
   Serial.begin(115200);
   Wire.begin();
@@ -62,6 +65,29 @@ void loop() {
   }
   // Calcula a média
   average = total / numReadings;
+#if BINARY_PROTOCOL
+  // Pacote: 0xAA 0x55, seq, timestamp (uint32), ay (int16), botões (bits 0-3), checksum (little-endian)
+  uint8_t packet[11];
+  uint32_t now = millis();
+  int16_t ay_average = average;
+  packet[0] = 0xAA;
+  packet[1] = 0x55;
+  packet[2] = sequence++;
+  packet[3] = now & 0xFF;
+  packet[4] = (now >> 8) & 0xFF;
+  packet[5] = (now >> 16) & 0xFF;
+  packet[6] = (now >> 24) & 0xFF;
+  packet[7] = ay_average & 0xFF;
+  packet[8] = (ay_average >> 8) & 0xFF;
+  packet[9] = buttonState1 | (buttonState2 << 1) | (buttonState3 << 2) | (buttonState4 << 3);
+  // Checksum: soma dos bytes entre a sincronização e o checksum
+  uint8_t checksum = 0;
+  for (int i = 2; i < 10; i++) {
+    checksum += packet[i];
+  }
+  packet[10] = checksum;
+  Serial.write(packet, sizeof(packet));
+#else
   // Formatar a saída serial
   Serial.print("ay:");
   Serial.print(average);
@@ -74,5 +100,6 @@ void loop() {
   Serial.print(",button4:");
   Serial.print(buttonState4);
   Serial.println();
+#endif
   delay(20);
 }
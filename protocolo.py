@@ -0,0 +1,189 @@
+"""Protocolo serial do volante (projeto.ino).
+
+Formato binário, little-endian, 11 bytes por pacote:
+ 0xAA 0x55 | seq (u8) | timestamp em ms (u32) | ay (i16) | botões (u8, bit k = button k+1) | checksum (u8)
+O checksum é a soma, módulo 256, dos 8 bytes entre a sincronização e o próprio checksum.
+
+O formato de texto antigo ('ay:<n>,button1:<b>,...' por linha) continua aceito e é detectado automaticamente.
+"""
+import numpy as np
+
+PACKET_DTYPE = np.dtype([
+    ('sync', '<u2'), ('seq', 'u1'), ('timestamp', '<u4'), ('ay', '<i2'), ('buttons', 'u1'), ('checksum', 'u1')
+])
+PACKET_SIZE = PACKET_DTYPE.itemsize
+# Amostra decodificada, comum aos dois formatos (no formato de texto seq = -1 e timestamp = 0)
+SAMPLE_DTYPE = np.dtype([('seq', 'i2'), ('timestamp', 'u4'), ('ay', 'i2'), ('buttons', 'u1')])
+TEXT_FIELDS = ('ay', 'button1', 'button2', 'button3', 'button4')
+# Posições dos bytes cobertos pelo checksum dentro do pacote
+_BODY = np.arange(2, PACKET_SIZE - 1)
+
+def encode_packets(seq, timestamp, ay, buttons):
+    """ Monta pacotes binários (usado em testes e benchmarks; o sketch faz o mesmo em C).
+    Parâmetros:
+     seq, timestamp, ay, buttons (array-like): Campos de cada pacote.
+    Retorna:
+     bytes: Os pacotes concatenados."""
+    packets = np.zeros(len(np.atleast_1d(ay)), dtype=PACKET_DTYPE)
+    packets['sync'] = 0x55AA
+    packets['seq'] = np.asarray(seq) % 256
+    packets['timestamp'] = timestamp
+    packets['ay'] = ay
+    packets['buttons'] = buttons
+    raw = packets.view(np.uint8).reshape(-1, PACKET_SIZE)
+    packets['checksum'] = raw[:, 2:-1].sum(axis=1) % 256
+    return packets.tobytes()
+
+def encode_text(ay, buttons):
+    """Monta linhas no formato de texto antigo a partir de ay e da máscara de botões."""
+    lines = []
+    for value, mask in zip(np.atleast_1d(ay), np.atleast_1d(buttons)):
+        fields = [f'ay:{value}'] + [f'button{k + 1}:{(mask >> k) & 1}' for k in range(4)]
+        lines.append(','.join(fields) + '\r\n')
+    return ''.join(lines).encode()
+
+def parse_sensor_line(line):
+    """ Analisa uma linha do volante no formato 'ay:<n>,button1:<b>,...'.
+    Parâmetros:
+     line (bytes): Linha recebida, sem o terminador.
+    Retorna:
+     dict: Campos encontrados (nome -> int). Campos vazios são ignorados.
+    Lança:
+     UnicodeDecodeError, ValueError: Se a linha estiver corrompida."""
+    data = {}
+    for part in line.decode('utf-8').rstrip().split(','):
+        key, sep, value = part.partition(':')
+        if sep and value.strip():
+            data[key] = int(value)
+    return data
+
+class PacketDecoder:
+    """Decodifica em lote os pacotes binários de um fluxo de bytes, ressincronizando após corrupção."""
+    def __init__(self):
+        self.pending = b''
+        self.discarded = 0  # Bytes descartados por não pertencerem a um pacote válido
+
+    def feed(self, data):
+        """ Acrescenta bytes ao fluxo e decodifica todos os pacotes completos.
+        Parâmetros:
+         data (bytes): Bytes recebidos.
+        Retorna:
+         np.ndarray: Pacotes válidos (PACKET_DTYPE), em ordem."""
+        buffer = self.pending + data
+        raw = np.frombuffer(buffer, dtype=np.uint8)
+        size = len(raw)
+        if size < PACKET_SIZE:
+            self.pending = buffer
+            return np.empty(0, dtype=PACKET_DTYPE)
+        # Candidatos: posições com os bytes de sincronização e espaço para um pacote inteiro
+        starts = np.flatnonzero((raw[:-1] == 0xAA) & (raw[1:] == 0x55))
+        starts = starts[starts <= size - PACKET_SIZE]
+        checksum = raw[starts[:, None] + _BODY].sum(axis=1) % 256
+        starts = starts[checksum == raw[starts + PACKET_SIZE - 1]]
+        if len(starts) > 1 and np.diff(starts).min() < PACKET_SIZE:
+            # Raro: um falso início dentro de outro pacote; aceita gulosamente os que não se sobrepõem
+            accepted, end = [], 0
+            for start in starts:
+                if start >= end:
+                    accepted.append(start)
+                    end = start + PACKET_SIZE
+            starts = np.array(accepted)
+        end = starts[-1] + PACKET_SIZE if len(starts) else 0
+        keep_from = max(end, size - (PACKET_SIZE - 1))
+        self.discarded += keep_from - len(starts) * PACKET_SIZE
+        self.pending = buffer[keep_from:]
+        if len(starts) and np.all(np.diff(starts) == PACKET_SIZE):
+            # Caso comum: pacotes contíguos, lidos com uma única view
+            return np.frombuffer(buffer, dtype=PACKET_DTYPE, count=len(starts), offset=int(starts[0])).copy()
+        return np.frombuffer(buffer, dtype=np.uint8)[starts[:, None] + np.arange(PACKET_SIZE)].copy().view(
+            PACKET_DTYPE).ravel()
+
+class TextDecoder:
+    """Decodifica o formato de texto antigo, linha a linha. Campos ausentes mantêm o último valor recebido."""
+    def __init__(self):
+        self.pending = b''
+        self.state = dict.fromkeys(TEXT_FIELDS, 0)
+        self.errors = 0
+
+    def feed(self, data):
+        """ Acrescenta bytes ao fluxo e decodifica as linhas completas.
+        Parâmetros:
+         data (bytes): Bytes recebidos.
+        Retorna:
+         np.ndarray: Amostras (SAMPLE_DTYPE) das linhas com dados do volante."""
+        *lines, self.pending = (self.pending + data).split(b'\n')
+        samples = np.zeros(len(lines), dtype=SAMPLE_DTYPE)
+        count = 0
+        for line in lines:
+            try:
+                data = parse_sensor_line(line)
+            except (UnicodeDecodeError, ValueError):
+                self.errors += 1
+                continue
+            if not data:
+                continue  # Mensagens de texto do sketch, como o teste do MPU6050
+            self.state.update((k, v) for k, v in data.items() if k in self.state)
+            buttons = sum((self.state[f'button{k + 1}'] & 1) << k for k in range(4))
+            samples[count] = (-1, 0, self.state['ay'], buttons)
+            count += 1
+        return samples[:count]
+
+class SensorDecoder:
+    """Decodifica o fluxo do volante detectando o formato: binário assim que aparece um pacote válido,
+    texto assim que aparece uma linha com o campo ay. Até a detecção, os bytes são guardados."""
+    DETECT_LIMIT = 4096  # Bytes analisados antes de desistir do que não foi reconhecido
+
+    def __init__(self):
+        self.mode = None
+        self.packets = PacketDecoder()
+        self.text = TextDecoder()
+        self.buffer = b''
+
+    def feed(self, data):
+        """ Acrescenta bytes ao fluxo.
+        Parâmetros:
+         data (bytes): Bytes recebidos.
+        Retorna:
+         np.ndarray: Amostras decodificadas (SAMPLE_DTYPE)."""
+        if self.mode == 'binary':
+            return packets_to_samples(self.packets.feed(data))
+        if self.mode == 'text':
+            return self.text.feed(data)
+        self.buffer += data
+        packets = PacketDecoder().feed(self.buffer)
+        if len(packets):
+            self.mode = 'binary'
+        else:
+            start = self.text_start(self.buffer)
+            if start is not None:
+                # O que vem antes da primeira linha com ay é resto de um pacote ou de uma linha cortada
+                self.mode = 'text'
+                self.buffer = self.buffer[start:]
+        if self.mode is None:
+            self.buffer = self.buffer[-self.DETECT_LIMIT:]
+            return np.empty(0, dtype=SAMPLE_DTYPE)
+        buffer, self.buffer = self.buffer, b''
+        return self.feed(buffer)
+
+    @staticmethod
+    def text_start(buffer):
+        """ Procura a primeira linha completa do formato de texto, reconhecida pelo campo ay.
+        Parâmetros:
+         buffer (bytes): Bytes recebidos até agora.
+        Retorna:
+         int ou None: Posição do início da linha, ou None se nenhuma linha completa tem ay."""
+        start = 0
+        for line in buffer.split(b'\n')[:-1]:
+            try:
+                if 'ay' in parse_sensor_line(line):
+                    return start
+            except (UnicodeDecodeError, ValueError):
+                pass
+            start += len(line) + 1
+        return None
+
+def packets_to_samples(packets):
+    samples = np.empty(len(packets), dtype=SAMPLE_DTYPE)
+    for field in ('seq', 'timestamp', 'ay', 'buttons'):
+        samples[field] = packets[field]
+    return samples
@@ -0,0 +1,183 @@
+"""Simulação da corrida sem janela, som, dispositivos ou relógio real.
+
+Usa as mesmas regras do jogo (main.RaceRules): física em passo fixo do kart, pista, linha de chegada, moedas,
+caixas, poderes e as condições de vitória e derrota com COINS, TIME e LAPS. O relógio é simulado, então uma
+corrida inteira roda em uma fração do tempo real, útil para comparar esquemas de controle e ajustar dificuldade.
+
+Uso:
+ python simulacao.py --races 100 --seed 0
+ python simulacao.py --races 100 --telemetry telemetria/sim   grava a telemetria de cada corrida (telemetria.py)
+
+Em código (com o diretório de trabalho na raiz do projeto, de onde partem os caminhos da pista e dos assets):
+ sim = Simulation(seed=1)
+ observation = sim.reset()
+ while not observation['game_over']:
+     observation = sim.step((turn, accelerate, brake, power))
+"""
+import os
+import argparse
+import random
+import time
+import numpy as np
+from main import Kart, RaceRules, TRACK_PATH
+from pista import load_track
+from telemetria import TelemetryLogger
+
+# Linha central da pista em coordenadas do mundo, no sentido da corrida a partir da largada
+TRACK_WAYPOINTS = [
+    (27.1, 18.48), (27.1, 13.49), (26.39, 11.44), (24.05, 9.68), (17.6, 6.45), (9.97, 2.35), (6.45, 1.47),
+    (3.52, 2.35), (2.35, 4.69), (2.05, 11.73), (1.76, 19.35), (2.64, 21.7), (4.99, 22.29), (9.97, 19.35),
+    (14.08, 16.42), (17.01, 17.01), (18.18, 19.35), (19.94, 24.63), (21.7, 26.98), (24.63, 26.98),
+    (26.69, 25.22), (27.27, 22.29)
+]
+# Resultado de cada corrida de evaluate
+RESULT_DTYPE = np.dtype([
+    ('seed', '<i8'), ('result', 'U4'), ('time', '<f8'), ('laps', '<i4'), ('coins', '<i4'), ('off_track', '<f8')
+])
+
+class Simulation(RaceRules):
+    """Corrida sem interface conduzida por step(action), com relógio simulado."""
+    def __init__(self, seed=0, frame_time=1000 / 60, track=None):
+        """ Parâmetros:
+         seed (int): Semente do sorteio de poderes.
+         frame_time (float): Milissegundos simulados por chamada de step (o jogo roda a 60 FPS).
+         track (Track, opcional): Pista já carregada (pista.load_track), que pode ser compartilhada entre
+          simulações; None carrega a pista do jogo."""
+        self.track = track if track is not None else load_track(TRACK_PATH)
+        self.frame_time = frame_time
+        self.seed = seed
+        self.reset()
+
+    def reset(self, seed=None):
+        """ Recomeça a corrida na largada, já com os controles liberados (sem contagem regressiva).
+        Parâmetros:
+         seed (int, opcional): Nova semente; None mantém a atual.
+        Retorna:
+         dict: A observação inicial."""
+        if seed is not None:
+            self.seed = seed
+        self.rng = random.Random(self.seed)
+        self.ticks = 0.0
+        self.kart = Kart()
+        self.initialize_race()
+        self.start_time = 0
+        self.controls_enabled = True
+        return self.observation()
+
+    def now(self):
+        return self.ticks
+
+    def step(self, action):
+        """ Avança um frame de frame_time ms com os controles dados.
+        Parâmetros:
+         action (tuple): (turn, accelerate, brake, power), como os controles combinados do jogo.
+        Retorna:
+         dict: A observação após o frame."""
+        turn_value, accelerate_value, brake_value, power_requested = action
+        self.ticks += self.frame_time
+        if not self.game_over:
+            if power_requested:
+                self.use_power()
+            self.controls = (turn_value, accelerate_value, brake_value)
+            self.advance_simulation(self.frame_time)
+            self.check_race_result()
+            self.record_telemetry(self.frame_time)
+        return self.observation()
+
+    def observation(self):
+        """ Estado atual da corrida.
+        Retorna:
+         dict: time (s de corrida), posx, posy, rot, vel, on_track, lap_count, coin_count, current_power,
+          power_in_use, game_over e result ('win', 'lose' ou None)."""
+        return {
+            'time': self.get_elapsed_time(),
+            'posx': self.kart.posx, 'posy': self.kart.posy, 'rot': self.kart.rot, 'vel': self.kart.vel,
+            'on_track': self.track.is_on_track(self.kart.posx, self.kart.posy),
+            'lap_count': self.lap_count, 'coin_count': self.coin_count,
+            'current_power': self.current_power, 'power_in_use': self.power_in_use,
+            'game_over': self.game_over, 'result': self.game_result,
+        }
+
+    def run(self, policy, max_time=600):
+        """ Roda a corrida até o fim ou até max_time segundos simulados.
+        Parâmetros:
+         policy (callable): Recebe a observação e devolve a ação do próximo frame.
+        Retorna:
+         tuple: (observação final, segundos fora da pista)."""
+        observation = self.observation()
+        off_track = 0.0
+        while not observation['game_over'] and observation['time'] < max_time:
+            observation = self.step(policy(observation))
+            off_track += (not observation['on_track']) * self.frame_time / 1000
+        return observation, off_track
+
+class WaypointDriver:
+    """Piloto simples: acelera rumo ao próximo ponto da linha central e aciona o poder assim que disponível."""
+    def __init__(self, waypoints=TRACK_WAYPOINTS, reach=1.5, gain=2.0):
+        """ Parâmetros:
+         waypoints (list): Pontos (x, y) da linha central, em ordem.
+         reach (float): Distância em que o ponto é considerado alcançado.
+         gain (float): Ganho do volante sobre o erro de ângulo, em radianos."""
+        self.waypoints = np.asarray(waypoints)
+        self.reach = reach
+        self.gain = gain
+        self.target = 1
+
+    def __call__(self, observation):
+        x, y = self.waypoints[self.target]
+        if np.hypot(x - observation['posx'], y - observation['posy']) < self.reach:
+            self.target = (self.target + 1) % len(self.waypoints)
+            x, y = self.waypoints[self.target]
+        heading = np.arctan2(y - observation['posy'], x - observation['posx'])
+        error = (heading - observation['rot'] + np.pi) % (2 * np.pi) - np.pi
+        turn = float(np.clip(self.gain * error, -1, 1))
+        return turn, 1.0, 0.0, observation['current_power'] is not None and not observation['power_in_use']
+
+def evaluate(races, seed=0, policy=WaypointDriver, max_time=600, frame_time=1000 / 60, telemetry_dir=None):
+    """ Roda races corridas com sementes consecutivas, uma nova política por corrida.
+    Parâmetros:
+     telemetry_dir (str, opcional): Diretório onde gravar a telemetria de cada corrida (sim-<semente>.tel).
+    Retorna:
+     np.ndarray: Um registro RESULT_DTYPE por corrida."""
+    track = load_track(TRACK_PATH)
+    simulation = Simulation(seed, frame_time, track)
+    results = np.zeros(races, dtype=RESULT_DTYPE)
+    for race in range(races):
+        simulation.reset(seed + race)
+        if telemetry_dir:
+            simulation.telemetry = TelemetryLogger(os.path.join(telemetry_dir, f'sim-{seed + race}.tel'),
+                                                   seed + race, track.name)
+        observation, off_track = simulation.run(policy(), max_time)
+        if simulation.telemetry:
+            simulation.telemetry.close()
+            simulation.telemetry = None
+        results[race] = (seed + race, observation['result'] or '-', observation['time'],
+                         observation['lap_count'], observation['coin_count'], off_track)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--races', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0, help='semente da primeira corrida')
+    parser.add_argument('--max-time', type=float, default=600, help='limite de tempo simulado por corrida (s)')
+    parser.add_argument('--frame-time', type=float, default=1000 / 60, help='ms simulados por step')
+    parser.add_argument('--telemetry', metavar='DIRETÓRIO', help='grava a telemetria de cada corrida')
+    args = parser.parse_args()
+    # O diretório da telemetria é relativo ao de chamada; os caminhos dos assets, à raiz do projeto
+    telemetry_dir = os.path.abspath(args.telemetry) if args.telemetry else None
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    start = time.perf_counter()
+    results = evaluate(args.races, args.seed, max_time=args.max_time, frame_time=args.frame_time,
+                       telemetry_dir=telemetry_dir)
+    elapsed = time.perf_counter() - start
+    for result in ('win', 'lose', '-'):
+        done = results[results['result'] == result]
+        if len(done):
+            print(f"{result:>5}: {len(done):>4} corridas, tempo médio {done['time'].mean():.1f} s, "
+                  f"voltas {done['laps'].mean():.1f}, moedas {done['coins'].mean():.1f}, "
+                  f"fora da pista {done['off_track'].mean():.1f} s")
+    simulated = results['time'].sum()
+    print(f"{simulated:.0f} s simulados em {elapsed:.2f} s ({simulated / elapsed:.0f}x o tempo real)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""Telemetria das corridas: um log colunar por sessão, com o estado do kart a cada frame.
+
+Cada sessão é um arquivo .tel: um cabeçalho de 64 bytes (HEADER_DTYPE) seguido dos registros TELEMETRY_DTYPE,
+de tamanho fixo. O jogo preenche blocos de CHUNK_FRAMES registros em memória e uma thread grava cada bloco
+cheio, então o frame só paga a escrita de uma linha em um array. A leitura é um np.memmap sobre os registros:
+nada é decodificado, e um arquivo de uma sessão interrompida ainda é lido até o último registro completo.
+
+Uso:
+ python telemetria.py telemetria/                 resumo de todas as sessões do diretório
+ python telemetria.py telemetria/ --sessions      também uma linha por sessão
+ python simulacao.py --races 100 --telemetry telemetria/sim   gera sessões com a simulação
+"""
+import argparse
+import glob
+import os
+import queue
+import threading
+import time
+import numpy as np
+
+TELEMETRY_FORMAT_VERSION = 2
+MAGIC = b'KART-TEL'
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'), ('version', '<u4'), ('record_size', '<u4'), ('seed', '<u8'), ('created', '<f8'),
+    ('track', 'S32')
+])
+# Um registro por frame; lap_count é o placar de voltas (que os poderes também mudam), finish_crossings conta só
+# as passagens pela linha de chegada; current_power é o índice do poder em RaceRules.powers, -1 sem poder e
+# POWER_PENDING com a caixa pega e o poder ainda não acionado
+TELEMETRY_DTYPE = np.dtype([
+    ('time', '<f4'), ('posx', '<f4'), ('posy', '<f4'), ('rot', '<f4'), ('vel', '<f4'), ('frame_ms', '<f4'),
+    ('lap_count', '<i2'), ('finish_crossings', '<i2'), ('coin_count', '<i2'), ('current_power', 'i1'),
+    ('on_track', 'u1')
+])
+POWER_PENDING = -2
+CHUNK_FRAMES = 1024
+# Faixas do histograma de tempo de frame (ms); o último intervalo acumula tudo acima de 100 ms
+FRAME_TIME_BINS = np.append(np.arange(0, 101, 1.0), np.inf)
+
+def session_path(directory, seed):
+    """Nome de arquivo de uma nova sessão: data, hora e semente."""
+    return os.path.join(directory, f"sessao-{time.strftime('%Y%m%d-%H%M%S')}-{seed}.tel")
+
+class TelemetryLogger:
+    """Acumula os frames de uma sessão em blocos e os grava em uma thread de fundo."""
+    def __init__(self, path, seed=0, track='', chunk_frames=CHUNK_FRAMES):
+        """ Parâmetros:
+         path (str): Arquivo .tel de saída (o diretório é criado se preciso).
+         seed (int): Semente da partida, guardada no cabeçalho.
+         track (str): Nome da pista.
+         chunk_frames (int): Registros por bloco entregue à thread de gravação."""
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.file = open(path, 'wb')
+        header = np.zeros(1, dtype=HEADER_DTYPE)
+        header[0] = (MAGIC, TELEMETRY_FORMAT_VERSION, TELEMETRY_DTYPE.itemsize, seed, time.time(),
+                     track.encode()[:32])
+        header.tofile(self.file)
+        self.chunk_frames = chunk_frames
+        self.chunk = np.zeros(chunk_frames, dtype=TELEMETRY_DTYPE)
+        self.count = 0
+        self.frames = 0
+        self.chunks = queue.Queue()
+        self.writer = threading.Thread(target=self.write_chunks, daemon=True)
+        self.writer.start()
+
+    def record(self, elapsed, posx, posy, rot, vel, on_track, lap_count, finish_crossings, coin_count, current_power,
+               frame_ms):
+        """ Acrescenta o estado de um frame.
+        Parâmetros:
+         elapsed (float): Tempo de corrida em segundos, sem as pausas.
+         posx, posy, rot, vel (float): Pose e velocidade do kart.
+         on_track (bool): Se o kart está na pista.
+         lap_count, coin_count (int): Voltas (placar) e moedas.
+         finish_crossings (int): Passagens válidas pela linha de chegada até o frame.
+         current_power (int): Índice do poder da caixa, -1 sem poder ou POWER_PENDING.
+         frame_ms (float): Duração do frame em ms."""
+        self.chunk[self.count] = (elapsed, posx, posy, rot, vel, frame_ms, lap_count, finish_crossings, coin_count,
+                                  current_power, on_track)
+        self.count += 1
+        if self.count == self.chunk_frames:
+            # O bloco cheio vai para a thread; o frame seguinte escreve em um array novo
+            self.chunks.put(self.chunk)
+            self.chunk = np.zeros(self.chunk_frames, dtype=TELEMETRY_DTYPE)
+            self.frames += self.count
+            self.count = 0
+
+    def write_chunks(self):
+        while True:
+            chunk = self.chunks.get()
+            if chunk is None:
+                break
+            chunk.tofile(self.file)
+
+    def close(self):
+        """Grava o bloco incompleto, espera a thread terminar e fecha o arquivo."""
+        self.chunks.put(self.chunk[:self.count])
+        self.frames += self.count
+        self.count = 0
+        self.chunks.put(None)
+        self.writer.join()
+        self.file.close()
+
+def open_session(path):
+    """ Abre uma sessão por memory-map, sem ler os registros.
+    Retorna:
+     tuple: (cabeçalho (np.void de HEADER_DTYPE), registros (np.memmap de TELEMETRY_DTYPE, somente leitura))."""
+    header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+    if len(header) == 0 or header[0]['magic'] != MAGIC:
+        raise ValueError(f"{path} não é um arquivo de telemetria")
+    header = header[0]
+    if header['version'] != TELEMETRY_FORMAT_VERSION or header['record_size'] != TELEMETRY_DTYPE.itemsize:
+        raise ValueError(f"Versão de telemetria não suportada em {path}: {int(header['version'])}")
+    # Registros completos; um último incompleto (sessão interrompida) é ignorado
+    count = (os.path.getsize(path) - HEADER_DTYPE.itemsize) // TELEMETRY_DTYPE.itemsize
+    if count == 0:
+        return header, np.zeros(0, dtype=TELEMETRY_DTYPE)
+    return header, np.memmap(path, dtype=TELEMETRY_DTYPE, mode='r', offset=HEADER_DTYPE.itemsize, shape=(count,))
+
+def lap_splits(records):
+    """ Tempos de cada volta: intervalos entre passagens consecutivas pela linha de chegada (finish_crossings).
+    Voltas somadas ou tiradas por poderes não contam, e o trecho da largada até a primeira passagem também não:
+    a largada fica antes da linha, então esse trecho não é uma volta.
+    Retorna:
+     np.ndarray: Duração de cada volta em segundos."""
+    crossings = records['finish_crossings']
+    completed = np.flatnonzero(crossings[1:] > crossings[:-1]) + 1
+    return np.diff(records['time'][completed])
+
+def off_track_time(records):
+    """Segundos de corrida com o kart fora da pista (soma dos intervalos entre frames fora da pista)."""
+    intervals = np.diff(records['time'], prepend=0.0)
+    return float(intervals[records['on_track'] == 0].sum())
+
+def analyze(paths):
+    """ Resume várias sessões; cada uma é lida por memory-map e processada com operações vetoriais.
+    Retorna:
+     tuple: (array estruturado com uma linha por sessão, contagens do histograma de tempo de frame)."""
+    summary = np.zeros(len(paths), dtype=[
+        ('path', 'U64'), ('seed', '<u8'), ('frames', '<i8'), ('time', '<f8'), ('laps', '<i4'), ('coins', '<i4'),
+        ('best_lap', '<f8'), ('mean_lap', '<f8'), ('off_track', '<f8')])
+    histogram = np.zeros(len(FRAME_TIME_BINS) - 1, dtype=np.int64)
+    for i, path in enumerate(paths):
+        header, records = open_session(path)
+        splits = lap_splits(records)
+        last = records[-1] if len(records) else np.zeros(1, dtype=TELEMETRY_DTYPE)[0]
+        summary[i] = (os.path.basename(path), header['seed'], len(records), last['time'], last['lap_count'],
+                      last['coin_count'], splits.min() if len(splits) else np.nan,
+                      splits.mean() if len(splits) else np.nan, off_track_time(records))
+        histogram += np.histogram(records['frame_ms'], FRAME_TIME_BINS)[0]
+    return summary, histogram
+
+def histogram_percentile(histogram, q):
+    """Limite superior da faixa do histograma onde está o percentil q."""
+    cumulative = np.cumsum(histogram)
+    return FRAME_TIME_BINS[1:][np.searchsorted(cumulative, cumulative[-1] * q / 100)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+', help='arquivos .tel ou diretórios com eles')
+    parser.add_argument('--sessions', action='store_true', help='mostra uma linha por sessão')
+    args = parser.parse_args()
+    paths = []
+    for path in args.paths:
+        paths += sorted(glob.glob(os.path.join(path, '*.tel'))) if os.path.isdir(path) else [path]
+    if not paths:
+        raise SystemExit("Nenhuma sessão encontrada")
+    start = time.perf_counter()
+    summary, histogram = analyze(paths)
+    elapsed = time.perf_counter() - start
+    if args.sessions:
+        print(f"{'sessão':<40} {'tempo s':>8} {'voltas':>6} {'moedas':>6} {'melhor volta':>12} "
+              f"{'volta média':>11} {'fora s':>7}")
+        for row in summary:
+            print(f"{row['path']:<40} {row['time']:>8.1f} {row['laps']:>6} {row['coins']:>6} "
+                  f"{row['best_lap']:>12.2f} {row['mean_lap']:>11.2f} {row['off_track']:>7.1f}")
+    frames = summary['frames'].sum()
+    print(f"{len(paths)} sessões, {frames} frames ({frames * TELEMETRY_DTYPE.itemsize / 2 ** 20:.1f} MiB) "
+          f"analisados em {elapsed:.2f} s")
+    print(f"tempo médio {summary['time'].mean():.1f} s, voltas {summary['laps'].mean():.1f}, "
+          f"moedas {summary['coins'].mean():.1f}, fora da pista {summary['off_track'].mean():.1f} s por sessão")
+    if np.isfinite(summary['best_lap']).any():
+        print(f"melhor volta {np.nanmin(summary['best_lap']):.2f} s, "
+              f"volta média {np.nanmean(summary['mean_lap']):.2f} s")
+    if frames:
+        print(f"tempo de frame: p50 <= {histogram_percentile(histogram, 50):.0f} ms, "
+              f"p99 <= {histogram_percentile(histogram, 99):.0f} ms")
+        peak = histogram.max()
+        for low, count in zip(FRAME_TIME_BINS[:-1], histogram):
+            if count:
+                print(f"{low:>5.0f} ms {count:>10} {'#' * max(1, int(40 * count / peak))}")
+
+if __name__ == '__main__':
+    main()
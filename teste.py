@@ -1,83 +1,255 @@
+"""Gráfico ao vivo dos dados do volante: ay e os quatro botões.
+
+As amostras vão para um buffer circular NumPy pré-alocado, escrito no lugar, e o gráfico é redesenhado por
+blitting: eixos, grade e rótulos são desenhados uma vez e, a cada quadro, só as linhas são redesenhadas sobre o
+fundo guardado. A cada quadro tudo o que chegou na porta é decodificado em lote (protocolo binário ou texto).
+
+Uso:
+ python teste.py                                   lê a porta COM5
+ python teste.py --window 500 --interval 20        janela de 500 amostras, um quadro a cada 20 ms
+ python teste.py --port loop:// --rate 2000        fonte sintética em loopback a 2000 amostras/s
+"""
+import argparse
+import threading
+import time
+import numpy as np
 import serial
 import matplotlib.pyplot as plt
-import matplotlib.animation as animation
 import matplotlib.ticker as ticker
-from collections import deque
-
-# Abrir porta serial
-try:
-    ser = serial.Serial('COM5', 115200, timeout=1)
-    print("Porta serial COM5 aberta com sucesso.")
-except serial.SerialException:
-    print("Erro: Não foi possível abrir a porta serial COM5")
-    ser = None
-if ser is None:
-    raise SystemExit("Programa encerrado devido à falha na abertura da porta serial.")
-
-# Configuração do gráfico
-fig, ax = plt.subplots()
-ys = deque(maxlen=100)
+from protocolo import PACKET_SIZE, SensorDecoder, encode_packets
+
+SERIAL_PORT = 'COM5'
 Y_MIN = -20000
 Y_MAX = 20000
 Y_TICKS = [-20000, -15600, -15000, -10000, 0, 10000, 15000, 15600, 20000]
-ax.set_ylim([Y_MIN, Y_MAX])
-ax.set_yticks(Y_TICKS)
-# Definindo os minor ticks com múltiplos de 5000
-ax.yaxis.set_minor_locator(ticker.MultipleLocator(5000))
-# Configuração da grade
-ax.grid(which='major', linestyle='-', linewidth='0.75', color='black')
-ax.grid(which='minor', linestyle=':', linewidth='0.5', color='gray')
-# Títulos e rótulos dos eixos
-ax.set_title('Aceleração no Eixo Y', fontsize=14)
-ax.set_xlabel('Amostras', fontsize=12)
-ax.set_ylabel('Valor de ay', fontsize=12)
-# Configuração do eixo X
-ax.set_xlim(0, 99)
-ax.set_xticks(range(0, 100, 10))
-# Estilização dos ticks para melhor visibilidade
-ax.tick_params(axis='both', which='major', labelsize=10)
-# Linha do gráfico
-line, = ax.plot([], [], color='blue')
-def init():
-    """Inicializa a linha do gráfico."""
-    line.set_data([], [])
-    return line,
-def animate(frame):
-    """ Função de animação que atualiza os dados do gráfico. """
-    if ser.in_waiting:
-        try:
-            while ser.in_waiting:
-                line_data = ser.readline()
-                try:
-                    line_data = line_data.decode('utf-8').rstrip()
-                except UnicodeDecodeError:
-                    continue
-                parts = line_data.split(',')
-                data = {}
-                for part in parts:
-                    if ':' in part:
-                        key, value = part.split(':', 1)
-                        data[key] = value
-                if 'ay' in data:
-                    try:
-                        ay_value = int(data['ay'])
-                        ys.append(ay_value)
-                    except ValueError:
-                        continue
-        except Exception as e:
-            print(f"Erro ao ler dados seriais: {e}")
-    ys_list = list(ys)
-    if len(ys_list) < 100:
-        ys_padded = [0]*(100 - len(ys_list)) + ys_list
-    else:
-        ys_padded = ys_list
-    line.set_data(range(len(ys_padded)), ys_padded)
-    return line,
-# Criação da animação
-ani = animation.FuncAnimation(
-    fig, animate, init_func=init,
-    interval=50, blit=True
-)
-plt.show()
-# Fecha a porta serial após o fechamento do gráfico
-ser.close()
\ No newline at end of file
+BUTTONS = 4
+BUTTON_COLORS = ['tab:red', 'tab:green', 'tab:orange', 'tab:purple']
+
+class RingBuffer:
+    """Últimas length amostras de vários canais, em um array pré-alocado escrito no lugar."""
+    def __init__(self, channels, length):
+        self.data = np.zeros((channels, length))
+        # Cópia em ordem cronológica (mais recente à direita), reaproveitada a cada quadro
+        self.ordered = np.zeros_like(self.data)
+        self.length = length
+        self.index = 0  # Próxima posição a escrever
+        self.total = 0
+
+    def extend(self, block):
+        """ Acrescenta amostras.
+        Parâmetros:
+         block (np.ndarray): Shape (canais, n), da mais antiga para a mais recente."""
+        n = block.shape[1]
+        self.total += n
+        if n >= self.length:
+            self.data[:] = block[:, n - self.length:]
+            self.index = 0
+            return
+        first = min(n, self.length - self.index)
+        self.data[:, self.index:self.index + first] = block[:, :first]
+        self.data[:, :n - first] = block[:, first:]
+        self.index = (self.index + n) % self.length
+
+    def latest(self):
+        """ Canais em ordem cronológica.
+        Retorna:
+         np.ndarray: O array self.ordered, sobrescrito a cada chamada."""
+        np.concatenate((self.data[:, self.index:], self.data[:, :self.index]), axis=1, out=self.ordered)
+        return self.ordered
+
+def sample_channels(samples):
+    """Canais do gráfico a partir das amostras (SAMPLE_DTYPE): ay e um canal 0/1 por botão."""
+    bits = (samples['buttons'][np.newaxis, :] >> np.arange(BUTTONS)[:, np.newaxis]) & 1
+    return np.vstack((samples['ay'], bits))
+
+class LoopbackSource:
+    """Volante sintético: escreve pacotes binários em uma porta loop:// à taxa pedida, em uma thread."""
+    def __init__(self, port, rate, chunk_ms=2):
+        """ Parâmetros:
+         port (serial.Serial): Porta aberta com serial_for_url('loop://').
+         rate (float): Amostras por segundo.
+         chunk_ms (float): Intervalo entre escritas, em ms."""
+        self.port = port
+        self.rate = rate
+        self.chunk_ms = chunk_ms
+        self.sent = 0
+        self.running = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.running = True
+        self.start_time = time.perf_counter()
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+
+    def run(self):
+        while self.running:
+            due = int((time.perf_counter() - self.start_time) * self.rate) - self.sent
+            if due > 0:
+                seq = np.arange(self.sent, self.sent + due)
+                # Senoide de 0,5 Hz no ay e os botões contando em binário a cada meio segundo
+                ay = (15600 * np.sin(2 * np.pi * 0.5 * seq / self.rate)).astype(np.int16)
+                buttons = (seq * 2 // self.rate).astype(int) % 16
+                self.port.write(encode_packets(seq, seq * 1000 // self.rate, ay, buttons))
+                self.sent += due
+            time.sleep(self.chunk_ms / 1000)
+
+class LivePlotter:
+    """Gráfico de ay e dos botões redesenhado por blitting a partir de um RingBuffer."""
+    def __init__(self, port, window=100):
+        """ Parâmetros:
+         port (serial.Serial): Porta de onde ler as amostras.
+         window (int): Número de amostras visíveis."""
+        self.port = port
+        self.decoder = SensorDecoder()
+        self.buffer = RingBuffer(1 + BUTTONS, window)
+        # Bytes aguardando na porta a cada leitura e número de quadros desenhados
+        self.backlog = []
+        self.redraws = 0
+        self.background = None
+        self.figure, (self.ay_axis, self.button_axis) = plt.subplots(
+            2, 1, sharex=True, gridspec_kw={'height_ratios': [3, 1]})
+        self.setup_axes(window)
+        x = np.arange(window)
+        data = self.buffer.latest()
+        # animated=True tira as linhas do desenho normal: elas só são desenhadas no blitting
+        self.lines = [self.ay_axis.plot(x, data[0], color='blue', animated=True)[0]]
+        for k in range(BUTTONS):
+            self.lines.append(self.button_axis.plot(x, data[1 + k] * 0.8 + k, color=BUTTON_COLORS[k],
+                                                    animated=True, label=f'button{k + 1}')[0])
+        self.figure.canvas.mpl_connect('draw_event', self.on_draw)
+
+    def setup_axes(self, window):
+        ax = self.ay_axis
+        ax.set_ylim([Y_MIN, Y_MAX])
+        ax.set_yticks(Y_TICKS)
+        # Definindo os minor ticks com múltiplos de 5000
+        ax.yaxis.set_minor_locator(ticker.MultipleLocator(5000))
+        # Configuração da grade
+        ax.grid(which='major', linestyle='-', linewidth='0.75', color='black')
+        ax.grid(which='minor', linestyle=':', linewidth='0.5', color='gray')
+        # Títulos e rótulos dos eixos
+        ax.set_title('Aceleração no Eixo Y e botões', fontsize=14)
+        ax.set_ylabel('Valor de ay', fontsize=12)
+        ax.tick_params(axis='both', which='major', labelsize=10)
+        # Um traço por botão, deslocado verticalmente
+        self.button_axis.set_ylim(-0.2, BUTTONS)
+        self.button_axis.set_yticks(np.arange(BUTTONS) + 0.4, [f'B{k + 1}' for k in range(BUTTONS)])
+        self.button_axis.set_xlabel('Amostras', fontsize=12)
+        self.button_axis.set_xlim(0, window - 1)
+        self.button_axis.xaxis.set_major_locator(ticker.MaxNLocator(10, integer=True))
+
+    def on_draw(self, event):
+        """Guarda o fundo (tudo menos as linhas) após cada desenho completo, por exemplo ao redimensionar."""
+        self.background = self.figure.canvas.copy_from_bbox(self.figure.bbox)
+        self.draw_lines()
+
+    def poll(self):
+        """ Decodifica tudo o que chegou na porta e acrescenta ao buffer.
+        Retorna:
+         int: Bytes que aguardavam na porta."""
+        waiting = self.port.in_waiting
+        if waiting:
+            samples = self.decoder.feed(self.port.read(waiting))
+            if len(samples):
+                self.buffer.extend(sample_channels(samples))
+        self.backlog.append(waiting)
+        return waiting
+
+    def draw_lines(self):
+        data = self.buffer.latest()
+        # Escala e desloca os botões no próprio array ordenado, que é refeito no próximo quadro
+        data[1:] *= 0.8
+        data[1:] += np.arange(BUTTONS)[:, np.newaxis]
+        for line, values in zip(self.lines, data):
+            line.set_ydata(values)
+            self.figure.draw_artist(line)
+
+    def redraw(self):
+        """Lê a porta e redesenha só as linhas sobre o fundo guardado."""
+        self.poll()
+        canvas = self.figure.canvas
+        if self.background is None:
+            canvas.draw()  # Primeiro quadro: desenho completo, que guarda o fundo em on_draw
+        else:
+            canvas.restore_region(self.background)
+            self.draw_lines()
+            canvas.blit(self.figure.bbox)
+        canvas.flush_events()
+        self.redraws += 1
+
+    def run(self, interval=20):
+        """ Mostra a janela e redesenha a cada interval ms até ela ser fechada.
+        Parâmetros:
+         interval (float): Intervalo mínimo entre quadros, em ms."""
+        plt.show(block=False)
+        next_frame = time.perf_counter()
+        while plt.fignum_exists(self.figure.number):
+            self.redraw()
+            next_frame += interval / 1000
+            delay = next_frame - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_frame = time.perf_counter()
+
+def measure(rate, seconds=3.0, window=100, interval=0):
+    """ Mede o plotter com uma fonte sintética em loop://, sem janela (chamada pelo benchmark.py).
+    Parâmetros:
+     rate (float): Amostras por segundo da fonte.
+     seconds (float): Duração da medição.
+     window (int): Amostras visíveis.
+     interval (float): Intervalo entre quadros em ms; 0 redesenha o mais rápido possível.
+    Retorna:
+     dict: Quadros por segundo, amostras na porta a cada leitura (média e máxima, e em ms de atraso)
+      e amostras ainda não plotadas ao fim."""
+    port = serial.serial_for_url('loop://', timeout=0)
+    plotter = LivePlotter(port, window)
+    plotter.redraw()  # Desenho completo inicial, fora da medição
+    plotter.backlog.clear()
+    plotter.redraws = 0
+    source = LoopbackSource(port, rate)
+    source.start()
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        frame_start = time.perf_counter()
+        plotter.redraw()
+        if interval:
+            time.sleep(max(0.0, interval / 1000 - (time.perf_counter() - frame_start)))
+    elapsed = time.perf_counter() - start
+    source.stop()
+    plt.close(plotter.figure)
+    backlog = np.array(plotter.backlog) / PACKET_SIZE
+    port.close()
+    return {'rate': rate, 'fps': plotter.redraws / elapsed, 'backlog_mean': backlog.mean(),
+            'backlog_max': backlog.max(), 'lag_ms': backlog.max() / rate * 1000,
+            'behind': source.sent - plotter.buffer.total}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', default=SERIAL_PORT, help="porta serial ou URL do pyserial (por exemplo loop://)")
+    parser.add_argument('--window', type=int, default=100, help='amostras visíveis')
+    parser.add_argument('--interval', type=float, default=20, help='ms entre quadros')
+    parser.add_argument('--rate', type=float, default=500, help='amostras/s da fonte sintética com --port loop://')
+    args = parser.parse_args()
+    # Abrir porta serial
+    try:
+        port = serial.serial_for_url(args.port, 115200, timeout=0)
+        print(f"Porta serial {args.port} aberta com sucesso.")
+    except serial.SerialException:
+        raise SystemExit(f"Erro: Não foi possível abrir a porta serial {args.port}")
+    source = None
+    if args.port.startswith('loop://'):
+        source = LoopbackSource(port, args.rate)
+        source.start()
+    LivePlotter(port, args.window).run(args.interval)
+    if source:
+        source.stop()
+    # Fecha a porta serial após o fechamento do gráfico
+    port.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,16 @@
+"""Configuração comum dos testes: módulos importados da raiz do projeto, sem janela nem áudio."""
+import os
+import sys
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pytest
+
+@pytest.fixture
+def project_root(monkeypatch):
+    """Diretório de trabalho na raiz do projeto, de onde partem os caminhos da pista e dos assets."""
+    monkeypatch.chdir(ROOT)
+    return ROOT
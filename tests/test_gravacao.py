@@ -0,0 +1,43 @@
+"""Gravação de entradas em .npz e reprodução frame a frame."""
+import numpy as np
+import pytest
+import gravacao
+from gravacao import InputRecorder, InputReplay, PAUSE, POWER
+
+def record_frames(path, count, seed=1234, capacity=4096):
+    rng = np.random.default_rng(0)
+    recorder = InputRecorder(str(path), seed, capacity=capacity)
+    frames = []
+    ticks = 0
+    for _ in range(count):
+        et = int(rng.integers(10, 30))
+        ticks += et
+        frame = (et, ticks, *rng.uniform(-5, 5, 3), bool(rng.integers(2)), bool(rng.integers(2)))
+        recorder.record(*frame)
+        frames.append(frame)
+    recorder.save()
+    return frames
+
+@pytest.mark.parametrize('count, capacity', [(100, 4096), (100, 8), (0, 4)])
+def test_round_trip(tmp_path, count, capacity):
+    path = tmp_path / 'partida.npz'
+    frames = record_frames(path, count, capacity=capacity)
+    replay = InputReplay(str(path))
+    assert replay.seed == 1234
+    assert len(replay) == count
+    for et, ticks, turn, accelerate, brake, power, pause in frames:
+        frame = replay.next_frame()
+        assert (frame['et'], frame['ticks']) == (et, ticks)
+        # Os controles são gravados em float64, sem perda
+        assert (frame['turn'], frame['accelerate'], frame['brake']) == (turn, accelerate, brake)
+        assert bool(frame['flags'] & POWER) == power
+        assert bool(frame['flags'] & PAUSE) == pause
+    assert replay.next_frame() is None
+    assert replay.index == count
+
+def test_unsupported_version(tmp_path):
+    path = tmp_path / 'antiga.npz'
+    np.savez_compressed(path, frames=np.zeros(1, dtype=gravacao.FRAME_DTYPE), seed=0,
+                        version=gravacao.FORMAT_VERSION + 1)
+    with pytest.raises(ValueError):
+        InputReplay(str(path))
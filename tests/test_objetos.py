@@ -0,0 +1,62 @@
+"""ObjectStore: consultas pela grade comparadas com um filtro por distância em todos os objetos."""
+import numpy as np
+import pytest
+from main import ObjectStore, objects_in_radius
+
+def random_store(seed, count=2000, size=32, cell_size=1.0):
+    rng = np.random.default_rng(seed)
+    store = ObjectStore(size, cell_size)
+    store.add(ObjectStore.COIN, rng.uniform(0, size, (count, 2)))
+    store.add(ObjectStore.ITEM_BOX, rng.uniform(0, size, (count // 4, 2)))
+    store.deactivate(rng.choice(len(store), len(store) // 10, replace=False))
+    return store, rng
+
+def brute_force_radius(store, x, y, radius, kind):
+    inside = store.active & (store.kind == kind) & (np.hypot(store.posx - x, store.posy - y) < radius)
+    return np.flatnonzero(inside)
+
+@pytest.mark.parametrize('cell_size', [1.0, 0.5, 3.0])
+def test_query_radius_matches_brute_force(cell_size):
+    store, rng = random_store(0, cell_size=cell_size)
+    for _ in range(200):
+        x, y = rng.uniform(-2, 34, 2)
+        radius = rng.choice([0.3, 1.0, 2.5, 7.0])
+        kind = rng.choice([ObjectStore.COIN, ObjectStore.ITEM_BOX])
+        found = store.query_radius(x, y, radius, kind)
+        assert len(np.unique(found)) == len(found)
+        np.testing.assert_array_equal(np.sort(found), brute_force_radius(store, x, y, radius, kind))
+
+def test_objects_in_radius_kernel_matches_query_radius():
+    store, _ = random_store(1)
+    expected = store.query_radius(16.0, 16.0, 3.0, ObjectStore.COIN)
+    found = objects_in_radius(16.0, 16.0, 3.0, ObjectStore.COIN, store.cell_size, store.cells_per_side,
+                              store.cell_start, store.cell_objects, store.posx, store.posy, store.kind, store.active)
+    np.testing.assert_array_equal(found, expected)
+
+def test_query_radius_after_deactivate_and_respawn():
+    store = ObjectStore(32)
+    store.add(ObjectStore.COIN, [(5.0, 5.0), (5.1, 5.0), (20.0, 20.0)])
+    store.deactivate(0)
+    store.deactivate(1, respawn_time=1000)
+    np.testing.assert_array_equal(store.query_radius(5.0, 5.0, 0.5, ObjectStore.COIN), [])
+    store.respawn(999)
+    np.testing.assert_array_equal(store.query_radius(5.0, 5.0, 0.5, ObjectStore.COIN), [])
+    store.respawn(1000)
+    np.testing.assert_array_equal(store.query_radius(5.0, 5.0, 0.5, ObjectStore.COIN), [1])
+
+@pytest.mark.parametrize('max_distance', [np.inf, 6.0])
+def test_visible_matches_brute_force(max_distance):
+    store, rng = random_store(2)
+    half_fov = np.deg2rad(30)
+    for _ in range(100):
+        x, y = rng.uniform(0, 32, 2)
+        rot = rng.uniform(-2 * np.pi, 2 * np.pi)
+        indices, distance, difference = store.visible(x, y, rot, half_fov, max_distance)
+        dx, dy = store.posx - x, store.posy - y
+        expected_difference = (np.arctan2(dy, dx) - rot + np.pi) % (2 * np.pi) - np.pi
+        expected = np.flatnonzero(store.active & (np.abs(expected_difference) < half_fov)
+                                  & (np.hypot(dx, dy) < max_distance))
+        order = np.argsort(indices)
+        np.testing.assert_array_equal(indices[order], expected)
+        np.testing.assert_allclose(distance[order], np.hypot(dx, dy)[expected])
+        np.testing.assert_allclose(difference[order], expected_difference[expected])
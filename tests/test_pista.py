@@ -0,0 +1,72 @@
+"""Pacotes de pista: construção, carregamento e consulta da máscara empacotada."""
+import json
+import os
+import numpy as np
+import pygame as pg
+import pytest
+import pista
+
+def save_image(path, red):
+    pixels = np.zeros(red.shape + (3,), dtype=np.uint8)
+    pixels[:, :, 0] = red
+    pg.image.save(pg.surfarray.make_surface(pixels), str(path))
+
+def make_package(directory, size, resolution, seed=0):
+    """Pacote com imagens aleatórias de pista e de paredes, em caminhos absolutos."""
+    rng = np.random.default_rng(seed)
+    save_image(directory / 'pista.png', rng.integers(0, 256, (64, 48)))
+    save_image(directory / 'paredes.png', np.where(rng.random((32, 32)) < 0.1, 255, 0))
+    manifest = {
+        'name': 'Teste', 'size': size,
+        'textures': {'floor': 'assets/MarioKart.png', 'sky': 'assets/skybox.jpg'},
+        'on_track': {'image': str(directory / 'pista.png'), 'threshold': 127, 'resolution': resolution},
+        'walls': {'border': True, 'image': str(directory / 'paredes.png'), 'cells': [[2, 3]]},
+        'spawn': [1.5, 2.5, 0.5],
+        'finish_line': [1, 2, 3, 4],
+        'checkpoints': [[0, 1, 0, 1]],
+        'objects': {'coin': [[1.0, 1.0], [2.0, 3.0]], 'item_box': [[3.0, 1.0]]},
+    }
+    with open(directory / 'track.json', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    return manifest
+
+@pytest.mark.parametrize('size, resolution', [(8, 4), (7, 3)])
+def test_build_and_load_round_trip(tmp_path, size, resolution):
+    manifest = make_package(tmp_path, size, resolution)
+    track = pista.load_track(str(tmp_path))
+    assert pista.is_built(str(tmp_path), manifest)
+    cells = size * resolution
+    expected = pista.sample_image(manifest['on_track']['image'], size, cells) > 127
+    np.testing.assert_array_equal(np.unpackbits(track.on_track, axis=1, count=cells), expected)
+    # A consulta compilada lê o mesmo bit que a máscara desempacotada, no centro de cada célula
+    centers = (np.arange(cells) + 0.5) / resolution
+    lookup = np.array([[track.is_on_track(x, y) for y in centers] for x in centers])
+    np.testing.assert_array_equal(lookup, expected)
+    walls = (pista.sample_image(manifest['walls']['image'], size, size) > 127).astype(np.uint8)
+    walls[0, :] = walls[:, 0] = walls[-1, :] = walls[:, -1] = 1
+    walls[2, 3] = 1
+    np.testing.assert_array_equal(track.walls, walls)
+    assert track.spawn == (1.5, 2.5, 0.5)
+    assert track.checkpoints == [(0, 1, 0, 1)]
+    assert track.objects == {'coin': [(1.0, 1.0), (2.0, 3.0)], 'item_box': [(3.0, 1.0)]}
+
+def test_lookup_outside_the_map(tmp_path):
+    make_package(tmp_path, 8, 4)
+    track = pista.load_track(str(tmp_path))
+    for x, y in [(-0.1, 1.0), (1.0, -0.1), (8.0, 1.0), (1.0, 8.0), (100.0, 100.0)]:
+        assert not track.is_on_track(x, y)
+
+def test_rebuilds_when_a_source_changes(tmp_path):
+    manifest = make_package(tmp_path, 8, 4)
+    pista.load_track(str(tmp_path))
+    save_image(tmp_path / 'pista.png', np.full((64, 48), 255))
+    assert not pista.is_built(str(tmp_path), manifest)
+    track = pista.load_track(str(tmp_path))
+    assert np.unpackbits(track.on_track, axis=1, count=32).all()
+    assert pista.is_built(str(tmp_path), manifest)
+
+def test_default_track_spawn_is_on_track(project_root):
+    track = pista.load_track(pista.DEFAULT_TRACK)
+    posx, posy, _ = track.spawn
+    assert track.is_on_track(posx, posy)
+    assert not track.walls[int(posx), int(posy)]
@@ -0,0 +1,79 @@
+"""PacketDecoder, TextDecoder e a detecção de formato do SensorDecoder."""
+import numpy as np
+import pytest
+import protocolo
+from protocolo import PACKET_SIZE, PacketDecoder, SensorDecoder, TextDecoder
+
+def packets(count, start=0):
+    seq = np.arange(start, start + count)
+    return protocolo.encode_packets(seq, seq * 8, seq * 3 - 100, seq % 16)
+
+def test_round_trip_in_one_feed():
+    decoded = PacketDecoder().feed(packets(50))
+    np.testing.assert_array_equal(decoded['seq'], np.arange(50))
+    np.testing.assert_array_equal(decoded['ay'], np.arange(50) * 3 - 100)
+    np.testing.assert_array_equal(decoded['buttons'], np.arange(50) % 16)
+
+@pytest.mark.parametrize('chunk', [1, 3, PACKET_SIZE, 64])
+def test_split_across_feeds(chunk):
+    data = packets(30)
+    decoder = PacketDecoder()
+    decoded = np.concatenate([decoder.feed(data[i:i + chunk]) for i in range(0, len(data), chunk)])
+    np.testing.assert_array_equal(decoded['seq'], np.arange(30))
+    assert decoder.discarded == 0
+
+def test_resync_after_garbage():
+    garbage = bytes([0xAA, 0x55, 0x01, 0xFF, 0xAA, 0x13, 0x37])
+    decoder = PacketDecoder()
+    decoded = decoder.feed(garbage + packets(5) + garbage + packets(5, start=5))
+    np.testing.assert_array_equal(decoded['seq'], np.arange(10))
+    assert decoder.discarded == 2 * len(garbage)
+
+def test_resync_after_truncated_packet():
+    truncated = packets(1, start=99)[:PACKET_SIZE - 4]
+    decoder = PacketDecoder()
+    decoded = np.concatenate([decoder.feed(packets(3)), decoder.feed(truncated), decoder.feed(packets(3, start=3))])
+    np.testing.assert_array_equal(decoded['seq'], np.arange(6))
+
+def test_bad_checksum_is_dropped():
+    data = bytearray(packets(3))
+    data[PACKET_SIZE + 5] ^= 0xFF  # Corrompe o ay do segundo pacote
+    decoded = PacketDecoder().feed(bytes(data))
+    np.testing.assert_array_equal(decoded['seq'], [0, 2])
+
+def test_text_decoder_keeps_missing_fields():
+    decoder = TextDecoder()
+    decoded = decoder.feed(b'ay:10,button1:1\r\nbutton2:1\r\nay:-5\r\nay:x\r\nparcial')
+    np.testing.assert_array_equal(decoded['ay'], [10, 10, -5])
+    np.testing.assert_array_equal(decoded['buttons'], [1, 3, 3])
+    assert decoder.errors == 1
+    assert decoder.pending == b'parcial'
+
+def test_sensor_decoder_detects_binary():
+    decoder = SensorDecoder()
+    decoded = decoder.feed(b'\x07lixo' + packets(4))
+    assert decoder.mode == 'binary'
+    np.testing.assert_array_equal(decoded['seq'], np.arange(4))
+
+def test_sensor_decoder_detects_text_on_a_line_with_ay():
+    decoder = SensorDecoder()
+    decoded = decoder.feed(b'Teste do MPU6050\r\n' + protocolo.encode_text([42], [8]))
+    assert decoder.mode == 'text'
+    np.testing.assert_array_equal(decoded['ay'], [42])
+    np.testing.assert_array_equal(decoded['buttons'], [8])
+
+def test_sensor_decoder_ignores_key_value_lines_without_ay():
+    # A porta aberta no meio de um pacote pode começar com bytes que parecem uma linha de texto
+    decoder = SensorDecoder()
+    assert len(decoder.feed(b'\x01\x02x:5\n')) == 0
+    assert decoder.mode is None
+    decoded = decoder.feed(packets(2))
+    assert decoder.mode == 'binary'
+    np.testing.assert_array_equal(decoded['seq'], [0, 1])
+
+def test_sensor_decoder_waits_for_a_complete_packet():
+    decoder = SensorDecoder()
+    data = packets(2)
+    assert len(decoder.feed(data[:PACKET_SIZE - 1])) == 0
+    assert decoder.mode is None
+    np.testing.assert_array_equal(decoder.feed(data[PACKET_SIZE - 1:])['seq'], [0, 1])
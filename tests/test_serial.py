@@ -0,0 +1,71 @@
+"""SerialReader lendo uma porta loop:// do pyserial, em que o que é escrito volta para a leitura."""
+import time
+import numpy as np
+import pytest
+import serial
+import protocolo
+from main import SerialReader
+
+@pytest.fixture
+def port():
+    port = serial.serial_for_url('loop://', timeout=0.05)
+    yield port
+    port.close()
+
+def wait_for(reader, count, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while reader.count < count:
+        assert time.monotonic() < deadline, f"{reader.count} de {count} amostras recebidas"
+        time.sleep(0.005)
+
+def test_binary_samples_reach_the_ring_buffer(port):
+    reader = SerialReader(port, capacity=16)
+    reader.start()
+    try:
+        count = 40
+        ay = np.arange(count) * 100 - 2000
+        buttons = np.arange(count) % 16
+        port.write(protocolo.encode_packets(np.arange(count), np.arange(count) * 10, ay, buttons))
+        wait_for(reader, count)
+    finally:
+        reader.stop()
+    latest = reader.latest()
+    assert latest[1] == ay[-1]
+    np.testing.assert_array_equal(latest[2:6], [(buttons[-1] >> k) & 1 for k in range(4)])
+    assert (latest[6], latest[7]) == (390, 39)
+    # Só as últimas capacity amostras ficam no buffer, da mais antiga para a mais nova
+    recent = reader.recent(100)
+    assert len(recent) == 16
+    np.testing.assert_array_equal(recent[:, 1], ay[-16:])
+    np.testing.assert_array_equal(recent[:, 7], np.arange(count)[-16:])
+
+def test_rising_edges_are_counted_once(port):
+    reader = SerialReader(port)
+    reader.start()
+    try:
+        # button1 pressionado duas vezes, button3 uma vez e mantido
+        buttons = [0, 1, 1, 0, 1, 4, 4, 4]
+        port.write(protocolo.encode_packets(np.arange(8), np.zeros(8), np.zeros(8), buttons))
+        wait_for(reader, len(buttons))
+    finally:
+        reader.stop()
+    np.testing.assert_array_equal(reader.pop_rising_edges(), [2, 0, 1, 0])
+    np.testing.assert_array_equal(reader.pop_rising_edges(), [0, 0, 0, 0])
+
+def test_text_format_is_detected(port):
+    reader = SerialReader(port)
+    reader.start()
+    try:
+        port.write(b'MPU6050 conectado\r\n' + protocolo.encode_text([-500, 700], [0, 2]))
+        wait_for(reader, 2)
+    finally:
+        reader.stop()
+    assert reader.decoder.mode == 'text'
+    latest = reader.latest()
+    assert latest[1] == 700
+    np.testing.assert_array_equal(latest[2:6], [0, 1, 0, 0])
+
+def test_nothing_received(port):
+    reader = SerialReader(port)
+    assert reader.latest() is None
+    assert len(reader.recent(5)) == 0